@@ -3,7 +3,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
 
+from app.core.cache import cached
 from app.core.database import get_db
+from app.core.instrumentation import query_budget
 from app.core.logging import log_audit
 from app.api.dependencies import get_current_user, check_permission
 from app.models.cemetery import Cemetery
@@ -11,7 +13,8 @@ from app.schemas.cemetery import Cemetery as CemeterySchema, CemeteryCreate, Cem
 
 router = APIRouter()
 
-@router.get("/", response_model=List[CemeterySchema])
+@router.get("/", response_model=List[CemeterySchema], dependencies=[Depends(query_budget(4))])
+@cached("cemeteries", "permissions", principal="current_user")
 async def read_cemeteries(
     skip: int = 0,
     limit: int = 100,
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import Dict, Any
 
+from app.core.cache import cached
 from app.core.database import get_db
 from app.api.dependencies import get_current_user, check_permission
 from app.models.cemetery import Cemetery
@@ -11,6 +12,7 @@ from app.models.burial_plot import BurialPlot
 router = APIRouter()
 
 @router.get("/metrics", response_model=Dict[str, Any])
+@cached("cemeteries", "burial_plots", "permissions", principal="current_user")
 async def get_metrics(
     current_user = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -67,6 +69,7 @@ async def get_metrics(
     }
 
 @router.get("/plots-by-cemetery", response_model=Dict[str, Any])
+@cached("cemeteries", "burial_plots", "permissions", principal="current_user")
 async def get_plots_by_cemetery(
     current_user = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
@@ -4,7 +4,7 @@ from sqlalchemy import select
 from typing import List
 
 from app.core.database import get_db
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.core.logging import log_audit
 from app.api.dependencies import get_current_user, check_permission
 from app.models.user import User
@@ -55,7 +55,7 @@ async def create_user(
     
     db_user = User(
         email=user.email,
-        password_hash=get_password_hash(user.password),
+        password_hash=await get_password_hash_async(user.password),
         full_name=user.full_name,
         sector_id=user.sector_id
     )
@@ -96,7 +96,7 @@ async def update_user(
     
     update_data = user_update.model_dump(exclude_unset=True)
     if "password" in update_data:
-        update_data["password_hash"] = get_password_hash(update_data.pop("password"))
+        update_data["password_hash"] = await get_password_hash_async(update_data.pop("password"))
     
     for field, value in update_data.items():
         setattr(db_user, field, value)
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
+from app.core.instrumentation import instrument_engine
 
 # Create async engine
 database_url = settings.DATABASE_URL
@@ -9,9 +10,10 @@ if database_url.startswith("postgresql://"):
 
 engine = create_async_engine(
     database_url,
-    echo=settings.DEBUG,
+    echo=settings.SQL_ECHO,
     future=True
 )
+instrument_engine(engine.sync_engine)
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
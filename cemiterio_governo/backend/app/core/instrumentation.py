@@ -0,0 +1,156 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+# Per-request SQL instrumentation and N+1 detection
+#
+# SQLAlchemy events time every statement and add it to the `QueryStats` of the
+# current request, kept in a ContextVar. The middleware opens the stats, returns
+# `X-DB-Query-Count` / `X-DB-Time-Ms` when `SQL_STATS_HEADERS` is on and writes a
+# structured log line with the query count, total DB time, slowest statements
+# and repeated statement shapes (N+1 suspects).
+#
+# `query_budget(n)` declares an endpoint's query budget; exceeding it logs a
+# warning. This is a port of saas-IA/backend/app/db/instrumentation.py without
+# its test mode (that project's suite enforces budgets); the backends are
+# deployed separately and share no package, so fixes go to both copies.
+
+logger = logging.getLogger("app.sql")
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# Placeholders for sqlite (?), psycopg2 (%(name)s) and asyncpg ($1::INTEGER)
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|\$\d+(?:::\w+)?)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+
+def statement_shape(statement: str) -> str:
+    """Normalize SQL so equal statements with different parameters group together"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("(?...)", shape)
+
+@dataclass
+class QueryStats:
+    """Queries executed by one request (or measured block)"""
+
+    count: int = 0
+    total_time: float = 0.0
+    budget: Optional[int] = None
+    shapes: Counter = field(default_factory=Counter)
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[settings.SQL_SLOW_STATEMENTS:]
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Shapes executed `threshold` times or more: N+1 suspects"""
+        threshold = threshold or settings.SQL_N_PLUS_ONE_THRESHOLD
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "slowest": [
+                {"ms": round(duration * 1000, 2), "sql": statement_shape(statement)[:300]}
+                for duration, statement in self.slowest
+            ],
+            "n_plus_one": [{"count": count, "sql": shape[:300]} for shape, count in self.repeated()],
+        }
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+def query_budget(max_queries: int):
+    """Dependency declaring the maximum number of queries for an endpoint"""
+
+    async def declare_budget() -> None:
+        stats = current_stats()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return declare_budget
+
+def check_budget(stats: QueryStats, label: str) -> None:
+    """Warn when the budget was exceeded"""
+    if stats.budget is None or stats.count <= stats.budget:
+        return
+    logger.warning(f"{label}: {stats.count} queries, budget {stats.budget}")
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+def instrument_engine(engine: Engine) -> None:
+    """Register the timing events on an engine (use `.sync_engine` for async ones)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+class QueryStatsMiddleware:
+    """ASGI middleware measuring the SQL queries of each HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and settings.SQL_STATS_HEADERS:
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                headers.append((QUERY_TIME_HEADER.lower().encode(), f"{stats.total_time * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            label = f"{scope['method']} {scope['path']}"
+            log_stats(stats, label, time.perf_counter() - start)
+        check_budget(stats, label)
+
+def log_stats(stats: QueryStats, label: str, duration: float) -> None:
+    """JSON log line summarizing the queries; WARNING when N+1 is detected"""
+    if not stats.count:
+        return
+    summary = {"request": label, "duration_ms": round(duration * 1000, 2), **stats.summary()}
+    level = logging.WARNING if summary["n_plus_one"] else logging.INFO
+    logger.log(level, json.dumps(summary, ensure_ascii=False))
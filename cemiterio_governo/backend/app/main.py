@@ -5,8 +5,11 @@ from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.metrics import MetricsMiddleware, metrics_response, runtime_monitor
+from app.core.instrumentation import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QueryStatsMiddleware
 from app.api.v1 import api_router
 from app.core.logging import setup_logging
+from app.core.security import PasswordHasherBusy
 
 # Setup logging
 setup_logging()
@@ -16,9 +19,11 @@ async def lifespan(app: FastAPI):
     # Startup
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    runtime_monitor.add_engine("main", engine)
+    runtime_monitor.start()
     yield
     # Shutdown
-    pass
+    await runtime_monitor.stop()
 
 app = FastAPI(
     title="Sistema de Gerenciamento de Cemitérios e Jazigos",
@@ -34,8 +39,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[QUERY_COUNT_HEADER, QUERY_TIME_HEADER],
 )
 
+# SQL query count, timing and N+1 detection per request
+app.add_middleware(QueryStatsMiddleware)
+
+# Prometheus metrics (per-route latency, in-flight requests)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
@@ -51,6 +63,18 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service overloaded, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     return JSONResponse(
@@ -6,7 +6,7 @@ from sqlmodel import Session, select
 from app.db.session import get_session
 from app.schemas.schemas import UserLogin, UserRegister, Token, UserResponse
 from app.models.models import User, Organization, UserRole
-from app.core.security import verify_password, get_password_hash, create_access_token, create_refresh_token
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token, create_refresh_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -37,7 +37,7 @@ async def register(
     # Create user
     user = User(
         email=user_data.email,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await get_password_hash_async(user_data.password),
         full_name=user_data.full_name,
         role=UserRole.ADMIN if organization else UserRole.CUSTOMER,
         organization_id=organization.id if organization else None
@@ -57,7 +57,7 @@ async def login(
     """Login and get access token"""
     user = session.exec(select(User).where(User.email == credentials.email)).first()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await verify_password_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
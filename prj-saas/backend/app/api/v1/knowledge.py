@@ -4,10 +4,12 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
 from typing import List, Optional
 
+from app.db.instrumentation import query_budget
 from app.db.session import get_session
 from app.api.deps import get_current_user, get_current_agent_or_admin
 from app.schemas.schemas import KnowledgeArticleCreate, KnowledgeArticleUpdate, KnowledgeArticleResponse
 from app.models.models import KnowledgeArticle, User
+from app.services.response_cache import cached, invalidate_committed
 
 router = APIRouter(prefix="/knowledge", tags=["knowledge"])
 
@@ -32,12 +34,14 @@ async def create_article(
     )
     session.add(article)
     session.commit()
+    await invalidate_committed(session)
     session.refresh(article)
     
     return article
 
 
-@router.get("", response_model=List[KnowledgeArticleResponse])
+@router.get("", response_model=List[KnowledgeArticleResponse], dependencies=[Depends(query_budget(2))])
+@cached("knowledge", principal="current_user")
 async def list_articles(
     category: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
@@ -130,6 +134,7 @@ async def update_article(
     
     session.add(article)
     session.commit()
+    await invalidate_committed(session)
     session.refresh(article)
     
     return article
@@ -158,4 +163,5 @@ async def delete_article(
     
     session.delete(article)
     session.commit()
+    await invalidate_committed(session)
 
@@ -1,18 +1,27 @@
 """Tickets routes"""
 
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlmodel import Session, select
 from typing import List, Optional
 
+from app.db.instrumentation import query_budget
 from app.db.session import get_session
 from app.api.deps import get_current_user, get_current_agent_or_admin
-from app.schemas.schemas import TicketCreate, TicketUpdate, TicketResponse, TicketMessageCreate, TicketMessageResponse
+from app.schemas.schemas import (
+    TicketCreate, TicketUpdate, TicketResponse, TicketCreatedResponse, TicketMessageCreate, TicketMessageResponse,
+    DuplicateCluster, DuplicateMatch,
+)
 from app.models.models import Ticket, User, TicketMessage, UserRole, TicketStatus
+from app.services.duplicates import duplicate_clusters, find_duplicates, index_tickets, minhash_signature, ticket_text
 
 router = APIRouter(prefix="/tickets", tags=["tickets"])
 
+# Tickets still being worked on: duplicates only matter among these
+OPEN_STATUSES = [TicketStatus.OPEN, TicketStatus.IN_PROGRESS, TicketStatus.WAITING]
 
-@router.post("", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
+
+@router.post("", response_model=TicketCreatedResponse, status_code=status.HTTP_201_CREATED)
 async def create_ticket(
     ticket_data: TicketCreate,
     current_user: User = Depends(get_current_user),
@@ -31,13 +40,61 @@ async def create_ticket(
         customer_id=current_user.id
     )
     session.add(ticket)
+    session.flush()
+    
+    # Duplicates among the organization's open tickets (customers only see their own), then index
+    signature = minhash_signature(ticket_text(ticket.subject, ticket.description))
+    scope = select(Ticket.id).where(
+        Ticket.organization_id == current_user.organization_id,
+        Ticket.status.in_(OPEN_STATUSES),
+    )
+    if current_user.role == UserRole.CUSTOMER:
+        scope = scope.where(Ticket.customer_id == current_user.id)
+    duplicates = find_duplicates(session, signature, scope, exclude_id=ticket.id)
+    index_tickets(session, {ticket.id: signature})
+    
     session.commit()
     session.refresh(ticket)
     
-    return ticket
+    return TicketCreatedResponse.model_validate(ticket).model_copy(
+        update={"possible_duplicates": [
+            DuplicateMatch(ticket_id=ticket_id, similarity=score) for ticket_id, score in duplicates
+        ]}
+    )
+
 
+@router.get("/duplicates", response_model=List[DuplicateCluster], dependencies=[Depends(query_budget(4))])
+async def list_duplicate_clusters(
+    days: int = Query(7, ge=1, le=90, description="Only tickets created in the last N days"),
+    include_resolved: bool = Query(False, description="Include resolved/closed tickets"),
+    min_similarity: Optional[float] = Query(None, ge=0.1, le=1.0, description="Default: DUPLICATE_MIN_SIMILARITY"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of clusters"),
+    current_user: User = Depends(get_current_agent_or_admin),
+    session: Session = Depends(get_session)
+):
+    """Clusters of near-duplicate tickets, largest first (agents/admins only)"""
+    scope = select(Ticket.id).where(
+        Ticket.organization_id == current_user.organization_id,
+        Ticket.created_at >= datetime.utcnow() - timedelta(days=days),
+    )
+    if not include_resolved:
+        scope = scope.where(Ticket.status.in_(OPEN_STATUSES))
+    clusters = duplicate_clusters(session, scope, min_similarity)[:limit]
+    if not clusters:
+        return []
+    
+    ids = [ticket_id for members in clusters for ticket_id in members]
+    tickets = {ticket.id: ticket for ticket in session.exec(select(Ticket).where(Ticket.id.in_(ids))).all()}
+    return [
+        DuplicateCluster(
+            size=len(members),
+            tickets=[tickets[ticket_id] for ticket_id in members if ticket_id in tickets],
+        )
+        for members in clusters
+    ]
 
-@router.get("", response_model=List[TicketResponse])
+
+@router.get("", response_model=List[TicketResponse], dependencies=[Depends(query_budget(2))])
 async def list_tickets(
     status_filter: Optional[TicketStatus] = Query(None),
     skip: int = 0,
@@ -114,12 +171,15 @@ async def update_ticket(
             detail="Not enough permissions"
         )
     
-    for key, value in ticket_data.model_dump(exclude_unset=True).items():
+    update_data = ticket_data.model_dump(exclude_unset=True)
+    for key, value in update_data.items():
         setattr(ticket, key, value)
     
-    from datetime import datetime
     ticket.updated_at = datetime.utcnow()
     
+    if "subject" in update_data or "description" in update_data:
+        index_tickets(session, {ticket.id: minhash_signature(ticket_text(ticket.subject, ticket.description))})
+    
     if ticket_data.status == TicketStatus.RESOLVED and not ticket.resolved_at:
         ticket.resolved_at = datetime.utcnow()
     elif ticket_data.status == TicketStatus.CLOSED and not ticket.closed_at:
@@ -0,0 +1,168 @@
+"""Prometheus metrics in text exposition format (`GET /metrics`)
+
+Exported series:
+- `http_requests_total` and `http_request_duration_seconds` (histogram), by
+  method, route template (`/api/v1/tickets/{ticket_id}`, not the raw path, to
+  keep cardinality low) and status;
+- `http_requests_in_progress`;
+- `db_pool_checked_out` / `db_pool_overflow` per engine;
+- `event_loop_lag_seconds`, measured by a periodic task;
+- `response_cache_requests_total`: response cache hits and misses, by route.
+
+Series are only updated from the worker's event loop, so the request path never
+contends on a lock. With several uvicorn workers, set `PROMETHEUS_MULTIPROC_DIR`
+(an empty directory, before starting the server): each process writes its
+values to its own files and `/metrics` sums them all.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests in progress", ["method"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Pool connections checked out", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections opened beyond the pool size", ["engine"],
+    multiprocess_mode="livesum",
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "Event loop lag at the last sample",
+    multiprocess_mode="livemax",
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Response cache lookups", ["route", "result"]
+)
+
+
+def _multiprocess_dir() -> Optional[str]:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting and timing HTTP requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            # The FastAPI router stores the matched route in the scope
+            route = scope.get("route")
+            template = getattr(route, "path", UNMATCHED_ROUTE)
+            REQUESTS.labels(method, template, status_code).inc()
+            REQUEST_LATENCY.labels(method, template, status_code).observe(time.perf_counter() - start)
+
+
+class RuntimeMonitor:
+    """Periodically samples event loop lag and connection pool usage"""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._engines: Dict[str, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_engine(self, name: str, engine) -> None:
+        self._engines[name] = engine
+
+    def sample_pools(self) -> None:
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            # NullPool/StaticPool do not track connections
+            if hasattr(pool, "checkedout"):
+                POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+            if hasattr(pool, "overflow"):
+                POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.set(max(loop.time() - start - self.interval, 0.0))
+            try:
+                self.sample_pools()
+            except Exception:
+                logger.exception("Failed to sample connection pools")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if _multiprocess_dir():
+            multiprocess.mark_process_dead(os.getpid())
+
+
+def metrics_response() -> Response:
+    """`/metrics` response, aggregating every worker in multiprocess mode"""
+    runtime_monitor.sample_pools()
+    if _multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+runtime_monitor = RuntimeMonitor(settings.METRICS_SAMPLE_INTERVAL_SECONDS)
@@ -2,8 +2,10 @@
 
 from sqlmodel import SQLModel, create_engine, Session
 from app.core.config import settings
+from app.db.instrumentation import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+engine = create_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO)
+instrument_engine(engine)
 
 
 def init_db():
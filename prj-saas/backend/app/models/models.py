@@ -2,6 +2,7 @@
 
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import BigInteger, Column
 from sqlmodel import Field, SQLModel, Relationship
 from enum import Enum
 
@@ -138,3 +139,19 @@ class KnowledgeArticle(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+
+class TicketSignature(SQLModel, table=True):
+    """MinHash signature of the ticket text (near-duplicate detection)"""
+    __tablename__ = "ticket_signatures"
+    
+    ticket_id: int = Field(foreign_key="tickets.id", primary_key=True)
+    signature: bytes  # one uint32 per permutation
+
+
+class TicketLshBucket(SQLModel, table=True):
+    """LSH bucket: tickets sharing a (band, bucket) are duplicate candidates"""
+    __tablename__ = "ticket_lsh_buckets"
+    
+    band: int = Field(primary_key=True)
+    bucket: int = Field(sa_column=Column(BigInteger, primary_key=True))
+    ticket_id: int = Field(foreign_key="tickets.id", primary_key=True, index=True)
@@ -1,7 +1,7 @@
 """Pydantic schemas for request/response"""
 
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 from app.models.models import UserRole, TicketStatus, TicketPriority, ChannelType
 
@@ -113,6 +113,20 @@ class TicketResponse(TicketBase):
         from_attributes = True
 
 
+class DuplicateMatch(BaseModel):
+    ticket_id: int
+    similarity: float  # Jaccard similarity estimated from the MinHash signatures
+
+
+class TicketCreatedResponse(TicketResponse):
+    possible_duplicates: List[DuplicateMatch] = []  # similar open tickets
+
+
+class DuplicateCluster(BaseModel):
+    size: int
+    tickets: List[TicketResponse]
+
+
 # Message schemas
 class TicketMessageBase(BaseModel):
     content: str
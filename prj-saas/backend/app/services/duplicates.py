@@ -0,0 +1,258 @@
+"""Near-duplicate ticket detection with MinHash + LSH
+
+The ticket text (subject + description, lowercased, accents stripped) becomes
+a set of `DUPLICATE_SHINGLE_SIZE`-character shingles, summarized as a MinHash
+signature of `DUPLICATE_MINHASH_PERMUTATIONS` values: the fraction of equal
+values between two signatures estimates their Jaccard similarity.
+
+The signature is split into `DUPLICATE_LSH_BANDS` bands and each band becomes
+a row in `ticket_lsh_buckets`, keyed by (band, bucket). Finding a ticket's
+candidates is an index lookup instead of a table scan, and only candidates get
+their similarity checked against the stored signature.
+"""
+
+import hashlib
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Select, delete, func, insert, tuple_
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.models import Ticket, TicketLshBucket, TicketSignature
+
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_CHUNK = 1024
+
+
+def _permutation_parameters(count: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Derived from a fixed hash rather than an RNG so every process and NumPy
+    # version agrees: signatures are persisted in the database
+    def parameter(name: str, index: int) -> int:
+        digest = hashlib.blake2b(f"minhash-{name}-{index}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    multipliers = np.array([parameter("a", index) | 1 for index in range(count)], dtype=np.uint64)
+    increments = np.array([parameter("b", index) for index in range(count)], dtype=np.uint64)
+    return multipliers, increments
+
+
+_MULTIPLIERS, _INCREMENTS = _permutation_parameters(settings.DUPLICATE_MINHASH_PERMUTATIONS)
+
+
+def ticket_text(subject: Optional[str], description: Optional[str]) -> str:
+    return f"{subject or ''} {description or ''}"
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(folded.split())
+
+
+def shingles(text: str, size: Optional[int] = None) -> np.ndarray:
+    """uint64 hashes of the character shingles of the normalized text"""
+    size = size or settings.DUPLICATE_SHINGLE_SIZE
+    normalized = _normalize(text)
+    if len(normalized) <= size:
+        pieces = {normalized}
+    else:
+        pieces = {normalized[start:start + size] for start in range(len(normalized) - size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(piece.encode(), digest_size=4).digest(), "little") for piece in pieces),
+        dtype=np.uint64,
+        count=len(pieces),
+    )
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """MinHash signature (one uint32 per permutation) of the text"""
+    hashes = shingles(text)
+    signature = np.full(len(_MULTIPLIERS), _MAX_HASH, dtype=np.uint64)
+    # Chunked so long texts never allocate permutations x shingles at once
+    for start in range(0, len(hashes), _SHINGLE_CHUNK):
+        chunk = hashes[None, start:start + _SHINGLE_CHUNK]
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits
+        permuted = (_MULTIPLIERS[:, None] * chunk + _INCREMENTS[:, None]) >> np.uint64(32)
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One bucket per band, as a signed int64 so it fits a BIGINT"""
+    rows = len(signature) // settings.DUPLICATE_LSH_BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(settings.DUPLICATE_LSH_BANDS)
+    ]
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity between the texts behind two signatures"""
+    return float(np.mean(first == second))
+
+
+def _decode(signature: bytes) -> np.ndarray:
+    return np.frombuffer(signature, dtype=np.uint32)
+
+
+def forget_ticket(session: Session, ticket_id: int) -> None:
+    session.execute(delete(TicketLshBucket).where(TicketLshBucket.ticket_id == ticket_id))
+    session.execute(delete(TicketSignature).where(TicketSignature.ticket_id == ticket_id))
+
+
+def index_tickets(session: Session, signatures: Dict[int, np.ndarray]) -> None:
+    """Store (or replace) the signature and buckets of `{ticket_id: signature}`"""
+    if not signatures:
+        return
+    ids = list(signatures)
+    session.execute(delete(TicketLshBucket).where(TicketLshBucket.ticket_id.in_(ids)))
+    session.execute(delete(TicketSignature).where(TicketSignature.ticket_id.in_(ids)))
+    session.execute(
+        insert(TicketSignature),
+        [{"ticket_id": ticket_id, "signature": signature.tobytes()} for ticket_id, signature in signatures.items()],
+    )
+    session.execute(
+        insert(TicketLshBucket),
+        [
+            {"band": band, "bucket": bucket, "ticket_id": ticket_id}
+            for ticket_id, signature in signatures.items()
+            for band, bucket in enumerate(band_buckets(signature))
+        ],
+    )
+
+
+def find_duplicates(
+    session: Session,
+    signature: np.ndarray,
+    tickets: Select,
+    exclude_id: Optional[int] = None,
+    min_similarity: Optional[float] = None,
+    limit: int = 10,
+) -> List[Tuple[int, float]]:
+    """Tickets among `tickets` (a select of `Ticket.id`) similar to the signature, best first"""
+    threshold = settings.DUPLICATE_MIN_SIMILARITY if min_similarity is None else min_similarity
+    keys = list(enumerate(band_buckets(signature)))
+    candidates = (
+        select(TicketLshBucket.ticket_id)
+        .where(tuple_(TicketLshBucket.band, TicketLshBucket.bucket).in_(keys))
+        .where(TicketLshBucket.ticket_id.in_(tickets))
+        .distinct()
+    )
+    if exclude_id is not None:
+        candidates = candidates.where(TicketLshBucket.ticket_id != exclude_id)
+
+    rows = session.exec(
+        select(TicketSignature.ticket_id, TicketSignature.signature).where(
+            TicketSignature.ticket_id.in_(candidates)
+        )
+    ).all()
+    scored = [(ticket_id, similarity(signature, _decode(stored))) for ticket_id, stored in rows]
+    scored = [item for item in scored if item[1] >= threshold]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
+
+
+def duplicate_clusters(
+    session: Session,
+    tickets: Select,
+    min_similarity: Optional[float] = None,
+) -> List[List[int]]:
+    """Groups of near-identical tickets among `tickets` (a select of `Ticket.id`), largest first
+
+    Only rows of buckets shared by two or more tickets leave the database;
+    inside each bucket every ticket is compared with the first one and
+    confirmed pairs are merged with union-find.
+    """
+    threshold = settings.DUPLICATE_MIN_SIMILARITY if min_similarity is None else min_similarity
+    scoped = TicketLshBucket.ticket_id.in_(tickets)
+    shared = (
+        select(TicketLshBucket.band, TicketLshBucket.bucket)
+        .where(scoped)
+        .group_by(TicketLshBucket.band, TicketLshBucket.bucket)
+        .having(func.count() > 1)
+    )
+    rows = session.exec(
+        select(TicketLshBucket.band, TicketLshBucket.bucket, TicketLshBucket.ticket_id)
+        .where(scoped, tuple_(TicketLshBucket.band, TicketLshBucket.bucket).in_(shared))
+        .order_by(TicketLshBucket.band, TicketLshBucket.bucket, TicketLshBucket.ticket_id)
+    ).all()
+    if not rows:
+        return []
+
+    buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for band, bucket, ticket_id in rows:
+        buckets[(band, bucket)].append(ticket_id)
+    ids = {ticket_id for members in buckets.values() for ticket_id in members}
+    signatures = {
+        ticket_id: _decode(stored)
+        for ticket_id, stored in session.exec(
+            select(TicketSignature.ticket_id, TicketSignature.signature).where(
+                TicketSignature.ticket_id.in_(ids)
+            )
+        ).all()
+    }
+
+    parent = {ticket_id: ticket_id for ticket_id in signatures}
+
+    def root(ticket_id: int) -> int:
+        while parent[ticket_id] != ticket_id:
+            parent[ticket_id] = parent[parent[ticket_id]]
+            ticket_id = parent[ticket_id]
+        return ticket_id
+
+    for members in buckets.values():
+        members = [ticket_id for ticket_id in members if ticket_id in signatures]
+        for other in members[1:]:
+            first = members[0]
+            if root(first) != root(other) and similarity(signatures[first], signatures[other]) >= threshold:
+                parent[root(other)] = root(first)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for ticket_id in sorted(signatures):
+        groups[root(ticket_id)].append(ticket_id)
+    clusters = [members for members in groups.values() if len(members) > 1]
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+    return clusters
+
+
+def rebuild_index(session: Session, batch_size: int = 1000) -> int:
+    """Recompute signatures and buckets of every ticket in id-ordered batches
+
+    Each batch is written and committed before the next one is read, so memory
+    does not grow with the table and the index stays queryable meanwhile.
+    Entries of deleted tickets are removed at the end.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        batch = session.exec(
+            select(Ticket.id, Ticket.subject, Ticket.description)
+            .where(Ticket.id > last_id)
+            .order_by(Ticket.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        index_tickets(
+            session,
+            {
+                ticket_id: minhash_signature(ticket_text(subject, description))
+                for ticket_id, subject, description in batch
+            },
+        )
+        session.commit()
+        processed += len(batch)
+        last_id = batch[-1][0]
+
+    existing = select(Ticket.id)
+    session.execute(delete(TicketLshBucket).where(TicketLshBucket.ticket_id.not_in(existing)))
+    session.execute(delete(TicketSignature).where(TicketSignature.ticket_id.not_in(existing)))
+    session.commit()
+    return processed
@@ -0,0 +1,264 @@
+"""Response cache for GET routes with tag-based invalidation
+
+`@cached("knowledge")` stores the route's already-serialized JSON body under a
+key derived from the path, the query string (in canonical order) and, when
+requested, the authenticated user. Hits return the stored bytes without
+touching the database or validating the `response_model` again.
+
+Tag invalidation: every tag has a version number that is part of the key.
+Invalidating a tag bumps its version, so old entries are no longer found and
+age out through TTL/LRU without scanning keys. ORM writes to models registered
+with `invalidate_on` are collected on the session; write routes await
+`invalidate_committed(session)` right after `session.commit()`. Bulk writes
+outside the ORM call `response_cache.invalidate` directly.
+
+Backends: `memory` (per-worker LRU) or `redis` (shared, `REDIS_URL`). Hits and
+misses per route are exported as `response_cache_requests_total`.
+
+This is a port of saas-IA/backend/app/services/response_cache.py (tested
+there); the backends are deployed separately and share no package, so fixes
+go to every copy. Unlike the original, commits here are synchronous.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import event, inspect as inspect_instance
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import RESPONSE_CACHE_REQUESTS
+from app.models.models import KnowledgeArticle
+
+CACHE_HEADER = "X-Cache"
+
+# Parameter appended to the route signature so FastAPI injects the request
+_REQUEST_PARAM = "response_cache_request"
+
+
+class InMemoryResponseBackend:
+    """Responses in a TTL LRU plus tag versions, in memory (per worker)"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    async def set(self, key: str, body: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def tag_versions(self, tags: Iterable[str]) -> List[int]:
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisResponseBackend:
+    """Responses and tag versions shared across workers through Redis"""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "response:"):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url or settings.REDIS_URL)
+        self._client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, body: bytes, ttl: float) -> None:
+        await self._client.set(self.prefix + key, body, px=int(ttl * 1000))
+
+    async def tag_versions(self, tags: Iterable[str]) -> List[int]:
+        tags = list(tags)
+        if not tags:
+            return []
+        values = await self._client.mget([f"{self.prefix}tag:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self.prefix}tag:{tag}")
+            await pipe.execute()
+
+
+class ResponseCache:
+    """Tag-versioned keys over a response backend"""
+
+    def __init__(self, backend, ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def key(self, request: Request, tags: Iterable[str], identity=None) -> str:
+        tags = sorted(tags)
+        versions = await self.backend.tag_versions(tags)
+        query = urlencode(sorted(request.query_params.multi_items()))
+        raw = json.dumps([request.url.path, query, identity, list(zip(tags, versions))])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, body: bytes, ttl: Optional[float] = None) -> None:
+        await self.backend.set(key, body, self.ttl if ttl is None else ttl)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drop every response stored under any of the tags"""
+        if tags:
+            await self.backend.bump(tags)
+
+
+def create_response_cache(backend: Optional[str] = None) -> ResponseCache:
+    """Build the cache configured in `settings.RESPONSE_CACHE_BACKEND`"""
+    backend = backend or settings.RESPONSE_CACHE_BACKEND
+    if backend == "redis":
+        store = RedisResponseBackend(settings.REDIS_URL)
+    elif backend == "memory":
+        store = InMemoryResponseBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+    else:
+        raise ValueError(f"Unknown response cache backend: {backend}")
+    return ResponseCache(store, ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = create_response_cache()
+
+
+def cached(*tags: str, ttl: Optional[float] = None, principal: Optional[str] = None):
+    """Decorator for GET routes that stores the JSON response under `tags`
+
+    Place it below `@router.get`. `principal` names the route parameter holding
+    the authenticated user, whose `id` then becomes part of the key. Route
+    dependencies (authentication, query budget) still run on hits.
+    """
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        adapter = None
+
+        def serialize(request: Request, result) -> bytes:
+            nonlocal adapter
+            model = getattr(request.scope.get("route"), "response_model", None)
+            if model is None:
+                return json.dumps(jsonable_encoder(result), ensure_ascii=False).encode()
+            if adapter is None:
+                adapter = TypeAdapter(model)
+            return adapter.dump_json(adapter.validate_python(result, from_attributes=True), by_alias=True)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            route = getattr(request.scope.get("route"), "path", request.url.path)
+            identity = getattr(kwargs.get(principal), "id", None) if principal else None
+
+            key = await response_cache.key(request, tags, identity)
+            body = await response_cache.get(key)
+            if body is not None:
+                RESPONSE_CACHE_REQUESTS.labels(route=route, result="hit").inc()
+                return Response(body, media_type="application/json", headers={CACHE_HEADER: "HIT"})
+
+            RESPONSE_CACHE_REQUESTS.labels(route=route, result="miss").inc()
+            result = await endpoint(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            body = serialize(request, result)
+            await response_cache.set(key, body, ttl)
+            return Response(body, media_type="application/json", headers={CACHE_HEADER: "MISS"})
+
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+        return wrapper
+
+    return decorator
+
+
+# ===== Invalidation =====
+# Changed models are recorded on the session; committing moves their tags to
+# the committed set, which the write route invalidates before responding. A
+# concurrent read that started earlier stores under the tag's old version,
+# where nobody looks anymore.
+
+_PENDING_KEY = "response_cache_invalidations"
+_COMMITTED_KEY = "response_cache_committed"
+
+
+def invalidate_on(model, *tags: str, ignore: Iterable[str] = ()) -> None:
+    """Invalidate `tags` when instances of `model` are created, updated or deleted
+
+    Updates touching only the attributes in `ignore` (e.g. counters) do not invalidate.
+    """
+    ignore = set(ignore)
+
+    def mark(session: Optional[Session]) -> None:
+        if session is not None:
+            session.info.setdefault(_PENDING_KEY, set()).update(tags)
+
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_delete")
+    def _changed(mapper, connection, target) -> None:
+        mark(Session.object_session(target))
+
+    @event.listens_for(model, "after_update")
+    def _updated(mapper, connection, target) -> None:
+        state = inspect_instance(target)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        if changed - ignore:
+            mark(Session.object_session(target))
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_after_commit(session: Session) -> None:
+    tags = session.info.pop(_PENDING_KEY, None)
+    if tags:
+        session.info.setdefault(_COMMITTED_KEY, set()).update(tags)
+
+
+async def invalidate_committed(session: Session) -> None:
+    """Invalidate the tags of everything `session` has committed so far
+
+    Sessions are synchronous, so the commit hook cannot await the backend; await
+    this right after `session.commit()`, before the route returns. Sync scripts
+    that never call it rely on the TTL to bound staleness.
+    """
+    tags = session.info.pop(_COMMITTED_KEY, None)
+    if tags:
+        await response_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+invalidate_on(KnowledgeArticle, "knowledge", ignore=("views_count",))
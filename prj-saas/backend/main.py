@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """SaaS de Suporte ao Cliente - Backend FastAPI"""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, metrics_response, runtime_monitor
+from app.core.security import PasswordHasherBusy
 from app.api.v1.router import api_router
-from app.db.session import init_db
+from app.db.instrumentation import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QueryStatsMiddleware
+from app.db.session import engine, init_db
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,8 +23,11 @@ async def lifespan(app: FastAPI):
     """Lifecycle manager"""
     logger.info("Iniciando aplicação...")
     init_db()
+    runtime_monitor.add_engine("main", engine)
+    runtime_monitor.start()
     yield
     logger.info("Encerrando aplicação...")
+    await runtime_monitor.stop()
 
 
 app = FastAPI(
@@ -37,18 +44,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[QUERY_COUNT_HEADER, QUERY_TIME_HEADER],
 )
 
+# SQL query count, timing and N+1 detection per request
+app.add_middleware(QueryStatsMiddleware)
+
+# Prometheus metrics (per-route latency, in-flight requests)
+app.add_middleware(MetricsMiddleware)
+
 # Routes
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """Hashing queue is full: ask the client to retry"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service overloaded, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "service": settings.PROJECT_NAME}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return metrics_response()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
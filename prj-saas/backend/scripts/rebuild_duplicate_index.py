@@ -0,0 +1,41 @@
+"""Rebuild the MinHash/LSH near-duplicate index from the `tickets` table
+
+Walks the tickets in id-ordered batches (memory does not grow with the table),
+recomputes each ticket's signature and buckets, commits batch by batch and
+finally drops entries of deleted tickets. Run it after changing the
+`DUPLICATE_*` settings or to index tickets created before the feature. Safe to
+run while the API is serving.
+
+    cd prj-saas/backend
+    python scripts/rebuild_duplicate_index.py --batch-size 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.models.models import TicketLshBucket, TicketSignature  # noqa: E402
+from app.services.duplicates import rebuild_index  # noqa: E402
+
+
+def rebuild(batch_size: int) -> None:
+    SQLModel.metadata.create_all(engine, tables=[TicketSignature.__table__, TicketLshBucket.__table__])
+
+    start = time.perf_counter()
+    with Session(engine) as session:
+        processed = rebuild_index(session, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed else 0
+    print(f"done: {processed} tickets in {elapsed:.1f}s ({rate:.0f} tickets/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    rebuild(parser.parse_args().batch_size)
@@ -1,20 +1,48 @@
 from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.core.security import decode_access_token
 from app.db.session import get_db
 from app.models.models import User
+from app.services.principal_cache import UserPrincipal, principal_cache
+from app.services.rate_limit import parse_rate, rate_limiter, retry_after_header
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
+async def get_principal_from_token(db: AsyncSession, token: str) -> Optional[UserPrincipal]:
+    """Resolve o usuário do token JWT (com cache); retorna None se inválido."""
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+    
+    principal = await principal_cache.get(email)
+    if principal is not None:
+        return principal
+    
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
+    if user is None:
+        return None
+    
+    principal = UserPrincipal.from_user(user)
+    await principal_cache.set(principal)
+    return principal
+
+
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> UserPrincipal:
     """Obtém usuário atual a partir do token JWT."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,15 +50,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = decode_access_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    email: str = payload.get("sub")
-    if email is None:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_principal_from_token(db, token)
     if user is None:
         raise credentials_exception
     
@@ -38,8 +58,8 @@ async def get_current_user(
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> UserPrincipal:
     """Verifica se o usuário está ativo."""
     if not current_user.is_active:
         raise HTTPException(
@@ -48,3 +68,28 @@ async def get_current_active_user(
         )
     return current_user
 
+
+def rate_limit(name: str, per: str = "ip"):
+    """Dependência que aplica o limite `settings.RATE_LIMITS[name]` por IP (`per="ip"`) ou usuário."""
+    limit = parse_rate(settings.RATE_LIMITS[name])
+    
+    async def check(identity: str) -> None:
+        retry_after = await rate_limiter.hit(name, identity, limit)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas requisições, tente novamente mais tarde",
+                headers={"Retry-After": retry_after_header(retry_after)},
+            )
+    
+    if per == "user":
+        async def limit_user(current_user: UserPrincipal = Depends(get_current_active_user)) -> None:
+            await check(f"user:{current_user.id}")
+        
+        return limit_user
+    
+    # Atrás de proxy, rode o uvicorn com --proxy-headers para request.client ser o IP real
+    async def limit_ip(request: Request) -> None:
+        await check(f"ip:{request.client.host if request.client else 'unknown'}")
+    
+    return limit_ip
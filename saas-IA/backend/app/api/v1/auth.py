@@ -1,10 +1,12 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import rate_limit
 from app.core.config import settings
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import verify_password_async, get_password_hash_async, create_access_token
 from app.db.session import get_db
 from app.models.models import User
 from app.schemas.schemas import UserCreate, UserResponse, Token, LoginRequest
@@ -12,11 +14,17 @@ from app.schemas.schemas import UserCreate, UserResponse, Token, LoginRequest
 router = APIRouter()
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("auth.register"))],
+)
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Registrar novo usuário."""
     # Verificar se email já existe
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    result = await db.execute(select(User).where(User.email == user_data.email))
+    existing_user = result.scalar_one_or_none()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -24,7 +32,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Criar novo usuário
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         full_name=user_data.full_name,
@@ -33,21 +41,22 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("auth.login"))])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login com email e senha."""
-    user = db.query(User).filter(User.email == form_data.username).first()
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalar_one_or_none()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou senha incorretos",
@@ -69,7 +78,7 @@ async def login(
     
     # Atualizar status online
     user.is_online = True
-    db.commit()
+    await db.commit()
     
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -77,12 +86,12 @@ async def login(
 @router.post("/logout")
 async def logout(
     current_user: User = Depends(get_db),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Logout do usuário."""
     # Atualizar status offline
     current_user.is_online = False
-    db.commit()
+    await db.commit()
     
     return {"message": "Logout realizado com sucesso"}
 
@@ -1,11 +1,19 @@
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
-from app.db.session import get_db
+from app.api.deps import get_current_active_user, get_principal_from_token, rate_limit
+from app.db.instrumentation import query_budget
+from app.db.pagination import keyset_paginate, set_next_cursor
+from app.db.session import get_db, AsyncSessionLocal
 from app.models.models import User, ChatSession, Message, ChatStatus
+from app.services.broker import BrokerError, broker, chat_channel
+from app.services.dashboard import chat_keys, track_change
+from app.services.dispatcher import claim_chat, claim_next_chat, waiting_queue
+from app.services.message_sync import MAX_WAIT_SECONDS, messages_after, wait_for_messages
 from app.schemas.schemas import (
     ChatSessionCreate,
     ChatSessionUpdate,
@@ -20,14 +28,16 @@ router = APIRouter()
 @router.post("/", response_model=ChatSessionResponse, status_code=status.HTTP_201_CREATED)
 async def create_chat_session(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Iniciar nova sessão de chat."""
     # Verificar se já existe sessão ativa
-    existing_session = db.query(ChatSession)\
-        .filter(ChatSession.customer_id == current_user.id)\
-        .filter(ChatSession.status == ChatStatus.ACTIVE.value)\
-        .first()
+    result = await db.execute(
+        select(ChatSession)
+        .where(ChatSession.customer_id == current_user.id)
+        .where(ChatSession.status == ChatStatus.ACTIVE.value)
+    )
+    existing_session = result.scalars().first()
     
     if existing_session:
         return existing_session
@@ -39,39 +49,45 @@ async def create_chat_session(
     )
     
     db.add(chat_session)
-    db.commit()
-    db.refresh(chat_session)
+    await track_change(db, None, chat_keys(chat_session))
+    await db.commit()
+    await db.refresh(chat_session)
     
     return chat_session
 
 
-@router.get("/", response_model=List[ChatSessionResponse])
+@router.get("/", response_model=List[ChatSessionResponse], dependencies=[Depends(query_budget(2))])
 async def list_chat_sessions(
+    response: Response,
     status_filter: Optional[str] = Query(None, description="Filtrar por status"),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    skip: int = Query(0, ge=0, description="Paginação por offset (legado; ignorado com cursor)"),
     limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Listar sessões de chat."""
-    query = db.query(ChatSession)
+    query = select(ChatSession)
     
     # Clientes só veem suas próprias sessões
     if current_user.role == "customer":
-        query = query.filter(ChatSession.customer_id == current_user.id)
+        query = query.where(ChatSession.customer_id == current_user.id)
     
     # Filtro de status
     if status_filter:
-        query = query.filter(ChatSession.status == status_filter)
+        query = query.where(ChatSession.status == status_filter)
     
-    sessions = query.order_by(ChatSession.started_at.desc()).offset(skip).limit(limit).all()
+    sessions, next_cursor = await keyset_paginate(
+        db, query, ChatSession.started_at, ChatSession.id, cursor, limit, skip=skip
+    )
+    set_next_cursor(response, next_cursor)
     return sessions
 
 
 @router.get("/waiting", response_model=List[ChatSessionResponse])
 async def get_waiting_chats(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obter chats aguardando atendimento (para agentes)."""
     if current_user.role not in ["agent", "admin"]:
@@ -80,22 +96,40 @@ async def get_waiting_chats(
             detail="Sem permissão para visualizar fila de atendimento"
         )
     
-    sessions = db.query(ChatSession)\
-        .filter(ChatSession.status == ChatStatus.WAITING.value)\
-        .order_by(ChatSession.started_at.asc())\
-        .all()
+    result = await db.execute(waiting_queue())
+    sessions = result.scalars().all()
     
     return sessions
 
 
+@router.post("/next", response_model=ChatSessionResponse, responses={204: {"description": "Fila vazia"}})
+async def claim_next_waiting_chat(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Agente reservar o próximo chat da fila (o que aguarda há mais tempo)."""
+    if current_user.role not in ["agent", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para aceitar chats"
+        )
+    
+    session = await claim_next_chat(db, current_user.id)
+    if session is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    
+    return session
+
+
 @router.get("/{session_id}", response_model=ChatSessionResponse)
 async def get_chat_session(
     session_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obter detalhes de uma sessão de chat."""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
@@ -118,10 +152,12 @@ async def update_chat_session(
     session_id: int,
     session_data: ChatSessionUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Atualizar sessão de chat."""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    # Trava a linha: o estado anterior usado nos contadores do painel é o atual
+    result = await db.execute(select(ChatSession).where(ChatSession.id == session_id).with_for_update())
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
@@ -143,11 +179,13 @@ async def update_chat_session(
     if "status" in update_data and update_data["status"] == ChatStatus.ENDED.value:
         update_data["ended_at"] = datetime.utcnow()
     
+    before = chat_keys(session)
     for field, value in update_data.items():
         setattr(session, field, value)
+    await track_change(db, before, chat_keys(session))
     
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     
     return session
 
@@ -156,7 +194,7 @@ async def update_chat_session(
 async def accept_chat(
     session_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Agente aceitar atendimento de chat."""
     if current_user.role not in ["agent", "admin"]:
@@ -165,7 +203,9 @@ async def accept_chat(
             detail="Sem permissão para aceitar chats"
         )
     
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    # Reserva condicional: só um agente consegue tirar o chat do estado WAITING
+    claimed = await claim_chat(db, session_id, current_user.id)
+    session = await db.get(ChatSession, session_id, populate_existing=True)
     
     if not session:
         raise HTTPException(
@@ -173,30 +213,30 @@ async def accept_chat(
             detail="Sessão não encontrada"
         )
     
-    if session.status != ChatStatus.WAITING.value:
+    if not claimed:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Chat não está aguardando atendimento"
         )
     
-    session.agent_id = current_user.id
-    session.status = ChatStatus.ACTIVE.value
-    
-    db.commit()
-    db.refresh(session)
-    
     return session
 
 
-@router.post("/{session_id}/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{session_id}/messages",
+    response_model=MessageResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("chats.message", per="user"))],
+)
 async def create_chat_message(
     session_id: int,
     message_data: MessageCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Enviar mensagem no chat."""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
@@ -224,8 +264,14 @@ async def create_chat_message(
     )
     
     db.add(message)
-    db.commit()
-    db.refresh(message)
+    await db.commit()
+    await db.refresh(message)
+    
+    # Notificar assinantes do WebSocket da sessão
+    await broker.publish(chat_channel(session_id), {
+        "event": "message.created",
+        "data": MessageResponse.model_validate(message).model_dump(mode="json"),
+    })
     
     return message
 
@@ -233,11 +279,18 @@ async def create_chat_message(
 @router.get("/{session_id}/messages", response_model=List[MessageResponse])
 async def get_chat_messages(
     session_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    limit: int = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None, description="Retorna apenas mensagens com id maior"),
+    since: Optional[datetime] = Query(None, description="Retorna apenas mensagens criadas depois do instante"),
+    wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS, description="Long-poll: segundos aguardando mensagens novas"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obter mensagens de um chat."""
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
+    session = result.scalar_one_or_none()
     
     if not session:
         raise HTTPException(
@@ -252,10 +305,62 @@ async def get_chat_messages(
             detail="Sem permissão para acessar mensagens desta sessão"
         )
     
-    messages = db.query(Message)\
-        .filter(Message.chat_session_id == session_id)\
-        .order_by(Message.created_at.asc())\
-        .all()
+    query = select(Message).where(Message.chat_session_id == session_id)
+    # Sincronização incremental: só mensagens novas, com long-poll opcional
+    if after_id is not None or since is not None or wait:
+        query = messages_after(query, after_id, since, limit)
+        return await wait_for_messages(db, query, chat_channel(session_id), wait)
     
+    messages, next_cursor = await keyset_paginate(
+        db, query, Message.created_at, Message.id, cursor, limit, descending=False
+    )
+    set_next_cursor(response, next_cursor)
     return messages
 
+
+
+@router.websocket("/{session_id}/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: int,
+    token: str = Query(..., description="Token JWT de acesso")
+):
+    """Receber em tempo real as novas mensagens de um chat."""
+    # Sessão de banco curta: não manter conexão aberta durante o WebSocket
+    async with AsyncSessionLocal() as db:
+        user = await get_principal_from_token(db, token)
+        result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
+        session = result.scalar_one_or_none()
+        allowed = (
+            user is not None
+            and user.is_active
+            and session is not None
+            and (user.role != "customer" or session.customer_id == user.id)
+        )
+    
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # Assina antes de aceitar: nada publicado depois da conexão aberta se perde
+    async with broker.subscribe(chat_channel(session_id)) as subscription:
+        await websocket.accept()
+        async with anyio.create_task_group() as task_group:
+            async def forward():
+                try:
+                    async for event in subscription:
+                        await websocket.send_json(event)
+                except BrokerError:
+                    # Broker caiu: fecha para o cliente reconectar em vez de esperar para sempre
+                    await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+                    task_group.cancel_scope.cancel()
+            
+            task_group.start_soon(forward)
+            
+            # Mensagens do cliente são ignoradas; só detectamos a desconexão
+            try:
+                while True:
+                    await websocket.receive_text()
+            except WebSocketDisconnect:
+                pass
+            task_group.cancel_scope.cancel()
@@ -1,17 +1,31 @@
+import asyncio
 from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Header, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_active_user
+from app.core.config import settings
+from app.db.instrumentation import query_budget
 from app.db.session import get_db
 from app.models.models import User, KnowledgeArticle
 from app.schemas.schemas import (
     KnowledgeArticleCreate,
     KnowledgeArticleUpdate,
-    KnowledgeArticleResponse
+    KnowledgeArticleResponse,
+    KnowledgeSearchResult,
+    ArticleImportReport,
+    TagCount
 )
+from app.services.article_import import detect_format, import_file
+from app.services.counters import article_counters
+from app.services.etag import KNOWLEDGE, conditional, etag_matches, make_etag, not_modified
+from app.services.response_cache import cached, response_cache
+from app.services.search import search_articles
+from app.services.single_flight import coalesced
+from app.services.suggestions import ensure_suggestion_index, index_article, suggest_articles, unindex_article
+from app.services.tags import filter_by_tags, parse_tags, set_article_tags, tag_cloud_query
 
 router = APIRouter()
 
@@ -20,7 +34,7 @@ router = APIRouter()
 async def create_article(
     article_data: KnowledgeArticleCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Criar artigo da base de conhecimento (agente/admin)."""
     if current_user.role not in ["agent", "admin"]:
@@ -35,54 +49,173 @@ async def create_article(
     )
     
     db.add(article)
-    db.commit()
-    db.refresh(article)
+    await db.flush()
+    await db.run_sync(set_article_tags, article.id, article.tags)
+    await db.commit()
+    await db.refresh(article)
+    await index_article(article)
     
     return article
 
 
-@router.get("/", response_model=List[KnowledgeArticleResponse])
+@router.post("/import", response_model=ArticleImportReport)
+async def import_articles(
+    file: UploadFile = File(..., description="CSV, JSONL ou .zip/.tar.gz com arquivos Markdown"),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl|markdown)$", description="Padrão: pela extensão do arquivo"),
+    publish: bool = Query(False, description="Publicar as linhas sem is_published"),
+    skip_existing: bool = Query(False, description="Ignorar artigos com título já existente"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Importar artigos em lote, com relatório de erros por linha (agente/admin)."""
+    if current_user.role not in ["agent", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para importar artigos"
+        )
+    
+    import_format = format or detect_format(file.filename)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato não reconhecido: informe format=csv, jsonl ou markdown"
+        )
+    
+    # Leitura, validação e gravação são síncronas: rodam fora do event loop
+    report = await asyncio.to_thread(
+        import_file,
+        file.file,
+        import_format,
+        current_user.id,
+        filename=file.filename,
+        publish=publish,
+        skip_existing=skip_existing,
+    )
+    await ensure_suggestion_index()
+    # Inserção em lote fora do ORM: invalidar as listagens explicitamente
+    await response_cache.invalidate("knowledge")
+    
+    return ArticleImportReport.model_validate(report)
+
+
+@router.get("/", response_model=List[KnowledgeArticleResponse], dependencies=[Depends(query_budget(3))])
+# Contadores não mudam a versão da coleção: o ETag vence junto com o cache
+@conditional(KNOWLEDGE, window=settings.RESPONSE_CACHE_TTL_SECONDS)
+@cached("knowledge")
 async def list_articles(
     search: Optional[str] = Query(None, description="Buscar em título e conteúdo"),
     category: Optional[str] = Query(None, description="Filtrar por categoria"),
+    tags: Optional[str] = Query(None, description="Filtrar por tags separadas por vírgula"),
+    tag_match: str = Query("all", pattern="^(all|any)$", description="all: todas as tags; any: qualquer uma"),
     published_only: bool = Query(True, description="Apenas artigos publicados"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Listar artigos da base de conhecimento."""
-    query = db.query(KnowledgeArticle)
+    tag_names = parse_tags(tags)
+    
+    # Busca textual: ordenada por relevância
+    if search:
+        results = await search_articles(
+            db, search,
+            published_only=published_only,
+            category=category,
+            skip=skip,
+            limit=limit,
+            tags=tag_names,
+            match_all_tags=tag_match == "all",
+        )
+        return [article for article, _, _ in results]
+    
+    query = select(KnowledgeArticle)
     
     # Filtro de publicação
     if published_only:
-        query = query.filter(KnowledgeArticle.is_published == True)
+        query = query.where(KnowledgeArticle.is_published == True)
     
     # Filtro de categoria
     if category:
-        query = query.filter(KnowledgeArticle.category == category)
+        query = query.where(KnowledgeArticle.category == category)
     
-    # Busca textual
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                KnowledgeArticle.title.ilike(search_term),
-                KnowledgeArticle.content.ilike(search_term),
-                KnowledgeArticle.tags.ilike(search_term)
-            )
-        )
+    # Filtro por tags (índice normalizado, sem LIKE)
+    if tag_names:
+        query = filter_by_tags(query, tag_names, match_all=tag_match == "all")
     
-    articles = query.order_by(KnowledgeArticle.view_count.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(
+        query.order_by(KnowledgeArticle.view_count.desc()).offset(skip).limit(limit)
+    )
+    articles = result.scalars().all()
     return articles
 
 
+@router.get("/search", response_model=List[KnowledgeSearchResult], dependencies=[Depends(query_budget(2))])
+@coalesced()
+async def search_knowledge(
+    q: str = Query(..., min_length=1, description="Termos de busca"),
+    category: Optional[str] = Query(None, description="Filtrar por categoria"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """Buscar artigos publicados por relevância, com trechos destacados."""
+    results = await search_articles(db, q, category=category, skip=skip, limit=limit)
+    return [
+        KnowledgeSearchResult(
+            **KnowledgeArticleResponse.model_validate(article).model_dump(),
+            score=score,
+            snippet=snippet,
+        )
+        for article, score, snippet in results
+    ]
+
+
+@router.get("/suggest", response_model=List[KnowledgeSearchResult], dependencies=[Depends(query_budget(1))])
+@coalesced()
+async def suggest_knowledge(
+    q: str = Query(..., min_length=3, max_length=5000, description="Texto do problema (ex.: título e descrição do ticket)"),
+    limit: int = Query(5, ge=1, le=20),
+    db: AsyncSession = Depends(get_db)
+):
+    """Sugerir artigos publicados parecidos com o texto, por similaridade de cosseno."""
+    results = await suggest_articles(db, q, limit=limit)
+    return [
+        KnowledgeSearchResult(
+            **KnowledgeArticleResponse.model_validate(article).model_dump(),
+            score=score,
+        )
+        for article, score in results
+    ]
+
+
+@router.get("/tags", response_model=List[TagCount])
+@conditional(KNOWLEDGE)
+@cached("knowledge")
+async def tag_cloud(
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """Nuvem de tags: tags dos artigos publicados com a quantidade de artigos."""
+    result = await db.execute(tag_cloud_query(published_only=True, limit=limit))
+    return [TagCount(name=name, count=count) for name, count in result.all()]
+
+
 @router.get("/{article_id}", response_model=KnowledgeArticleResponse)
 async def get_article(
     article_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obter artigo por ID."""
-    article = db.query(KnowledgeArticle).filter(KnowledgeArticle.id == article_id).first()
+    """Obter artigo por ID (304 se o ETag de `If-None-Match` ainda vale)."""
+    # Com If-None-Match, confere a versão antes de carregar a linha inteira
+    columns = (
+        (KnowledgeArticle.id, KnowledgeArticle.is_published, KnowledgeArticle.updated_at)
+        if if_none_match else (KnowledgeArticle,)
+    )
+    result = await db.execute(select(*columns).where(KnowledgeArticle.id == article_id))
+    article = result.first()
+    if article is not None and not if_none_match:
+        article = article[0]
     
     if not article:
         raise HTTPException(
@@ -96,11 +229,20 @@ async def get_article(
             detail="Artigo não disponível"
         )
     
-    # Incrementar contador de visualizações
-    article.view_count += 1
-    db.commit()
+    # Incrementar contador de visualizações (gravado em lote)
+    article_counters.increment(article.id, "view_count")
     
-    return article
+    # Fraco: os contadores pendentes em memória mudam o corpo sem mudar o ETag
+    etag = make_etag(article.id, article.updated_at, weak=True)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if if_none_match:
+        article = await db.get(KnowledgeArticle, article_id)
+    
+    response.headers["ETag"] = etag
+    return KnowledgeArticleResponse.model_validate(article).model_copy(
+        update=article_counters.with_pending(article)
+    )
 
 
 @router.patch("/{article_id}", response_model=KnowledgeArticleResponse)
@@ -108,7 +250,7 @@ async def update_article(
     article_id: int,
     article_data: KnowledgeArticleUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Atualizar artigo (agente/admin)."""
     if current_user.role not in ["agent", "admin"]:
@@ -117,7 +259,8 @@ async def update_article(
             detail="Sem permissão para atualizar artigos"
         )
     
-    article = db.query(KnowledgeArticle).filter(KnowledgeArticle.id == article_id).first()
+    result = await db.execute(select(KnowledgeArticle).where(KnowledgeArticle.id == article_id))
+    article = result.scalar_one_or_none()
     
     if not article:
         raise HTTPException(
@@ -135,8 +278,12 @@ async def update_article(
     for field, value in update_data.items():
         setattr(article, field, value)
     
-    db.commit()
-    db.refresh(article)
+    if "tags" in update_data:
+        await db.run_sync(set_article_tags, article.id, article.tags)
+    
+    await db.commit()
+    await db.refresh(article)
+    await index_article(article)
     
     return article
 
@@ -145,7 +292,7 @@ async def update_article(
 async def delete_article(
     article_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Deletar artigo (admin)."""
     if current_user.role != "admin":
@@ -154,7 +301,8 @@ async def delete_article(
             detail="Sem permissão para deletar artigos"
         )
     
-    article = db.query(KnowledgeArticle).filter(KnowledgeArticle.id == article_id).first()
+    result = await db.execute(select(KnowledgeArticle).where(KnowledgeArticle.id == article_id))
+    article = result.scalar_one_or_none()
     
     if not article:
         raise HTTPException(
@@ -162,8 +310,9 @@ async def delete_article(
             detail="Artigo não encontrado"
         )
     
-    db.delete(article)
-    db.commit()
+    await db.delete(article)
+    await db.commit()
+    await unindex_article(article_id)
     
     return None
 
@@ -171,10 +320,11 @@ async def delete_article(
 @router.post("/{article_id}/helpful", response_model=KnowledgeArticleResponse)
 async def mark_helpful(
     article_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Marcar artigo como útil."""
-    article = db.query(KnowledgeArticle).filter(KnowledgeArticle.id == article_id).first()
+    result = await db.execute(select(KnowledgeArticle).where(KnowledgeArticle.id == article_id))
+    article = result.scalar_one_or_none()
     
     if not article:
         raise HTTPException(
@@ -182,21 +332,25 @@ async def mark_helpful(
             detail="Artigo não encontrado"
         )
     
-    article.helpful_count += 1
-    db.commit()
-    db.refresh(article)
+    article_counters.increment(article.id, "helpful_count")
     
-    return article
+    return KnowledgeArticleResponse.model_validate(article).model_copy(
+        update=article_counters.with_pending(article)
+    )
 
 
 @router.get("/categories/list", response_model=List[str])
-async def list_categories(db: Session = Depends(get_db)):
+@conditional(KNOWLEDGE)
+@cached("knowledge")
+async def list_categories(db: AsyncSession = Depends(get_db)):
     """Listar todas as categorias disponíveis."""
-    categories = db.query(KnowledgeArticle.category)\
-        .filter(KnowledgeArticle.category.isnot(None))\
-        .filter(KnowledgeArticle.is_published == True)\
-        .distinct()\
-        .all()
+    result = await db.execute(
+        select(KnowledgeArticle.category)
+        .where(KnowledgeArticle.category.isnot(None))
+        .where(KnowledgeArticle.is_published == True)
+        .distinct()
+    )
+    categories = result.all()
     
     return [cat[0] for cat in categories if cat[0]]
 
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import auth, tickets, knowledge, chats
+from . import auth, tickets, knowledge, chats, stats
 
 api_router = APIRouter()
 
@@ -8,4 +8,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(tickets.router, prefix="/tickets", tags=["Tickets"])
 api_router.include_router(knowledge.router, prefix="/knowledge", tags=["Knowledge Base"])
 api_router.include_router(chats.router, prefix="/chats", tags=["Live Chat"])
-
+api_router.include_router(stats.router, prefix="/stats", tags=["Dashboard"])
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_active_user
+from app.db.instrumentation import query_budget
+from app.db.session import get_db
+from app.models.models import User, TicketStatus, TicketPriority, ChatStatus
+from app.services.dashboard import CHAT_STATUS, TICKET_CATEGORY, TICKET_PRIORITY, TICKET_STATUS, stats_query
+from app.schemas.schemas import DashboardStats, TicketStats, ChatStats
+
+router = APIRouter()
+
+
+@router.get("/", response_model=DashboardStats, dependencies=[Depends(query_budget(2))])
+async def dashboard_stats(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Contagens do painel: tickets por status/prioridade/categoria e chats por status (agente/admin)."""
+    if current_user.role not in ["agent", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para ver estatísticas"
+        )
+    
+    # Contadores mantidos a cada alteração (app/services/dashboard.py), sem varrer as tabelas
+    counts = {
+        TICKET_STATUS: {member.value: 0 for member in TicketStatus},
+        TICKET_PRIORITY: {member.value: 0 for member in TicketPriority},
+        TICKET_CATEGORY: {},
+        CHAT_STATUS: {member.value: 0 for member in ChatStatus},
+    }
+    result = await db.execute(stats_query())
+    for dimension, key, total in result.all():
+        counts.setdefault(dimension, {})[key] = total
+    
+    categories = counts[TICKET_CATEGORY]
+    uncategorized = categories.pop("", 0)
+    return DashboardStats(
+        tickets=TicketStats(
+            total=sum(counts[TICKET_STATUS].values()),
+            by_status=counts[TICKET_STATUS],
+            by_priority=counts[TICKET_PRIORITY],
+            by_category=dict(sorted(categories.items(), key=lambda item: (-item[1], item[0]))),
+            uncategorized=uncategorized,
+        ),
+        chats=ChatStats(
+            total=sum(counts[CHAT_STATUS].values()),
+            by_status=counts[CHAT_STATUS],
+        ),
+    )
@@ -1,27 +1,68 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, rate_limit
+from app.db.instrumentation import query_budget
+from app.db.pagination import keyset_paginate, set_next_cursor
 from app.db.session import get_db
 from app.models.models import User, Ticket, Message, TicketStatus
+from app.services.broker import broker, ticket_channel
+from app.services.dashboard import TICKET_PRIORITY, TICKET_STATUS, ticket_keys, track_change
+from app.services.etag import TICKETS, conditional, etag_matches, make_etag, not_modified
+from app.services.duplicates import (
+    duplicate_clusters,
+    find_duplicates,
+    forget_ticket,
+    index_tickets,
+    minhash_signature,
+    ticket_text,
+)
+from app.services.export import (
+    EXPORT_FORMATS,
+    accepts_gzip,
+    csv_lines,
+    encode_chunks,
+    export_query,
+    ndjson_lines,
+)
+from app.services.message_sync import MAX_WAIT_SECONDS, messages_after, wait_for_messages
+from app.services.sla import drop_sla, sla_scheduler, start_sla, update_sla
+from app.services.suggestions import suggest_articles
+from app.services.triage import apply_triage, ticket_triage
 from app.schemas.schemas import (
     TicketCreate,
+    TicketDraft,
     TicketUpdate,
     TicketResponse,
+    TicketCreatedResponse,
+    DuplicateMatch,
+    DuplicateCluster,
     MessageCreate,
-    MessageResponse
+    MessageResponse,
+    KnowledgeArticleResponse,
+    KnowledgeSearchResult
 )
 
 router = APIRouter()
 
+# Tickets ainda em atendimento: é entre eles que duplicados importam
+OPEN_STATUSES = [TicketStatus.OPEN, TicketStatus.IN_PROGRESS, TicketStatus.WAITING]
+
 
-@router.post("/", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=TicketCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("tickets.create", per="user"))],
+)
 async def create_ticket(
     ticket_data: TicketCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Criar novo ticket de suporte."""
     ticket = Ticket(
@@ -29,47 +70,174 @@ async def create_ticket(
         customer_id=current_user.id
     )
     
+    # Triagem automática do que o cliente não informou
+    apply_triage(
+        ticket,
+        ticket_triage.predict(ticket.title, ticket.description),
+        set_priority="priority" not in ticket_data.model_fields_set,
+        set_category=not ticket_data.category,
+    )
+    
     db.add(ticket)
-    db.commit()
-    db.refresh(ticket)
+    await db.flush()
+    await track_change(db, None, ticket_keys(ticket))
+    sla_due_at = await start_sla(db, ticket)
     
-    return ticket
+    # Duplicados entre os tickets abertos (clientes só veem os próprios) e indexação
+    signature = minhash_signature(ticket_text(ticket.title, ticket.description))
+    scope = select(Ticket.id).where(Ticket.status.in_(OPEN_STATUSES))
+    if current_user.role == "customer":
+        scope = scope.where(Ticket.customer_id == current_user.id)
+    duplicates = await db.run_sync(find_duplicates, signature, exclude_id=ticket.id, tickets=scope)
+    await db.run_sync(index_tickets, {ticket.id: signature})
+    
+    await db.commit()
+    sla_scheduler.schedule(ticket.id, sla_due_at)
+    await db.refresh(ticket)
+    
+    return TicketCreatedResponse.model_validate(ticket).model_copy(
+        update={"possible_duplicates": [
+            DuplicateMatch(ticket_id=ticket_id, similarity=score) for ticket_id, score in duplicates
+        ]}
+    )
 
 
-@router.get("/", response_model=List[TicketResponse])
+@router.get("/duplicates", response_model=List[DuplicateCluster], dependencies=[Depends(query_budget(4))])
+async def list_duplicate_clusters(
+    days: int = Query(7, ge=1, le=90, description="Considerar tickets criados nos últimos N dias"),
+    include_resolved: bool = Query(False, description="Incluir tickets resolvidos/fechados"),
+    min_similarity: Optional[float] = Query(None, ge=0.1, le=1.0, description="Padrão: DUPLICATE_MIN_SIMILARITY"),
+    limit: int = Query(20, ge=1, le=100, description="Máximo de grupos"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Grupos de tickets quase duplicados, maiores primeiro (agente/admin)."""
+    if current_user.role not in ["agent", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para ver duplicados"
+        )
+    
+    scope = select(Ticket.id).where(Ticket.created_at >= datetime.utcnow() - timedelta(days=days))
+    if not include_resolved:
+        scope = scope.where(Ticket.status.in_(OPEN_STATUSES))
+    clusters = (await db.run_sync(duplicate_clusters, scope, min_similarity))[:limit]
+    if not clusters:
+        return []
+    
+    result = await db.execute(
+        select(Ticket).where(Ticket.id.in_([ticket_id for members in clusters for ticket_id in members]))
+    )
+    tickets = {ticket.id: ticket for ticket in result.scalars()}
+    return [
+        DuplicateCluster(
+            size=len(members),
+            tickets=[tickets[ticket_id] for ticket_id in members if ticket_id in tickets],
+        )
+        for members in clusters
+    ]
+
+
+@router.get("/export")
+async def export_tickets(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (um ticket por linha) ou csv (uma mensagem por linha)"),
+    status_filter: Optional[List[TicketStatus]] = Query(None, description="Filtrar por status (pode repetir)"),
+    created_from: Optional[datetime] = Query(None, description="Tickets criados a partir do instante"),
+    created_to: Optional[datetime] = Query(None, description="Tickets criados antes do instante"),
+    accept_encoding: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Exportar tickets com suas mensagens em streaming (agente/admin)."""
+    if current_user.role not in ["agent", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para exportar tickets"
+        )
+    
+    query = export_query(status_filter, created_from, created_to)
+    lines = ndjson_lines(query) if format == "ndjson" else csv_lines(query)
+    compress = accepts_gzip(accept_encoding)
+    headers = {
+        "Content-Disposition": f'attachment; filename="tickets.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        encode_chunks(lines, compress=compress),
+        media_type=EXPORT_FORMATS[format],
+        headers=headers,
+    )
+
+
+@router.post("/suggestions", response_model=List[KnowledgeSearchResult], dependencies=[Depends(query_budget(2))])
+async def suggest_for_ticket(
+    draft: TicketDraft,
+    limit: int = Query(3, ge=1, le=10),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Artigos que podem resolver o problema antes de abrir o ticket (chamar enquanto o formulário é preenchido)."""
+    text = f"{draft.title}\n{draft.description}".strip()
+    if len(text) < 3:
+        return []
+    results = await suggest_articles(db, text, limit=limit)
+    return [
+        KnowledgeSearchResult(
+            **KnowledgeArticleResponse.model_validate(article).model_dump(),
+            score=score,
+        )
+        for article, score in results
+    ]
+
+
+@router.get("/", response_model=List[TicketResponse], dependencies=[Depends(query_budget(3))])
+@conditional(TICKETS, principal="current_user")
 async def list_tickets(
+    response: Response,
     status_filter: Optional[str] = Query(None, description="Filtrar por status"),
     priority: Optional[str] = Query(None, description="Filtrar por prioridade"),
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    skip: int = Query(0, ge=0, description="Paginação por offset (legado; ignorado com cursor)"),
     limit: int = Query(50, ge=1, le=100),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Listar tickets do usuário ou todos (se agente/admin)."""
-    query = db.query(Ticket)
+    query = select(Ticket)
     
     # Clientes só veem seus próprios tickets
     if current_user.role == "customer":
-        query = query.filter(Ticket.customer_id == current_user.id)
+        query = query.where(Ticket.customer_id == current_user.id)
     
     # Filtros
     if status_filter:
-        query = query.filter(Ticket.status == status_filter)
+        query = query.where(Ticket.status == status_filter)
     if priority:
-        query = query.filter(Ticket.priority == priority)
+        query = query.where(Ticket.priority == priority)
     
-    tickets = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
+    tickets, next_cursor = await keyset_paginate(
+        db, query, Ticket.created_at, Ticket.id, cursor, limit, skip=skip
+    )
+    set_next_cursor(response, next_cursor)
     return tickets
 
 
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obter detalhes de um ticket."""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    """Obter detalhes de um ticket (304 se o ETag de `If-None-Match` ainda vale)."""
+    # Com If-None-Match, confere a versão antes de carregar a linha inteira
+    columns = (Ticket.id, Ticket.customer_id, Ticket.updated_at) if if_none_match else (Ticket,)
+    result = await db.execute(select(*columns).where(Ticket.id == ticket_id))
+    ticket = result.first()
+    if ticket is not None and not if_none_match:
+        ticket = ticket[0]
     
     if not ticket:
         raise HTTPException(
@@ -84,6 +252,13 @@ async def get_ticket(
             detail="Sem permissão para acessar este ticket"
         )
     
+    etag = make_etag(ticket.id, ticket.updated_at)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if if_none_match:
+        ticket = await db.get(Ticket, ticket_id)
+    
+    response.headers["ETag"] = etag
     return ticket
 
 
@@ -92,10 +267,12 @@ async def update_ticket(
     ticket_id: int,
     ticket_data: TicketUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Atualizar ticket."""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    # Trava a linha: o estado anterior usado nos contadores do painel é o atual
+    result = await db.execute(select(Ticket).where(Ticket.id == ticket_id).with_for_update())
+    ticket = result.scalar_one_or_none()
     
     if not ticket:
         raise HTTPException(
@@ -120,11 +297,26 @@ async def update_ticket(
         elif update_data["status"] == TicketStatus.CLOSED.value:
             update_data["closed_at"] = datetime.utcnow()
     
+    before = ticket_keys(ticket)
     for field, value in update_data.items():
         setattr(ticket, field, value)
+    after = ticket_keys(ticket)
+    await track_change(db, before, after)
     
-    db.commit()
-    db.refresh(ticket)
+    # Nova prioridade refaz os prazos; resolver/fechar/reabrir muda o prazo pendente
+    priority_changed = before[TICKET_PRIORITY] != after[TICKET_PRIORITY]
+    sla_changed = priority_changed or before[TICKET_STATUS] != after[TICKET_STATUS]
+    if sla_changed:
+        sla_due_at = await update_sla(db, ticket, priority_changed=priority_changed)
+    
+    if "title" in update_data or "description" in update_data:
+        signature = minhash_signature(ticket_text(ticket.title, ticket.description))
+        await db.run_sync(index_tickets, {ticket.id: signature})
+    
+    await db.commit()
+    if sla_changed:
+        sla_scheduler.schedule(ticket.id, sla_due_at)
+    await db.refresh(ticket)
     
     return ticket
 
@@ -133,7 +325,7 @@ async def update_ticket(
 async def delete_ticket(
     ticket_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Deletar ticket (apenas admin)."""
     if current_user.role not in ["admin"]:
@@ -142,7 +334,8 @@ async def delete_ticket(
             detail="Sem permissão para deletar tickets"
         )
     
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
+    ticket = result.scalar_one_or_none()
     
     if not ticket:
         raise HTTPException(
@@ -150,21 +343,31 @@ async def delete_ticket(
             detail="Ticket não encontrado"
         )
     
-    db.delete(ticket)
-    db.commit()
+    await db.run_sync(forget_ticket, ticket.id)
+    await track_change(db, ticket_keys(ticket), None)
+    await drop_sla(db, ticket.id)
+    await db.delete(ticket)
+    await db.commit()
+    sla_scheduler.schedule(ticket_id, None)
     
     return None
 
 
-@router.post("/{ticket_id}/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{ticket_id}/messages",
+    response_model=MessageResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("tickets.message", per="user"))],
+)
 async def create_message(
     ticket_id: int,
     message_data: MessageCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Adicionar mensagem a um ticket."""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
+    ticket = result.scalar_one_or_none()
     
     if not ticket:
         raise HTTPException(
@@ -189,11 +392,28 @@ async def create_message(
     db.add(message)
     
     # Atualizar status do ticket se estava resolvido
-    if ticket.status == TicketStatus.RESOLVED.value:
+    reopened = ticket.status == TicketStatus.RESOLVED.value
+    if reopened:
+        before = ticket_keys(ticket)
         ticket.status = TicketStatus.OPEN.value
+        await track_change(db, before, ticket_keys(ticket))
     
-    db.commit()
-    db.refresh(message)
+    # Resposta visível ao cliente de um agente cumpre o prazo de primeira resposta
+    responded = current_user.role in ["agent", "admin"] and not message_data.is_internal
+    sla_changed = reopened or responded
+    if sla_changed:
+        sla_due_at = await update_sla(db, ticket, responded=responded)
+    
+    await db.commit()
+    if sla_changed:
+        sla_scheduler.schedule(ticket_id, sla_due_at)
+    await db.refresh(message)
+    
+    # Acordar clientes em long-poll de mensagens do ticket
+    await broker.publish(ticket_channel(ticket_id), {
+        "event": "message.created",
+        "data": MessageResponse.model_validate(message).model_dump(mode="json"),
+    })
     
     return message
 
@@ -201,11 +421,18 @@ async def create_message(
 @router.get("/{ticket_id}/messages", response_model=List[MessageResponse])
 async def get_ticket_messages(
     ticket_id: int,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    limit: int = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None, description="Retorna apenas mensagens com id maior"),
+    since: Optional[datetime] = Query(None, description="Retorna apenas mensagens criadas depois do instante"),
+    wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS, description="Long-poll: segundos aguardando mensagens novas"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Obter mensagens de um ticket."""
-    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    result = await db.execute(select(Ticket).where(Ticket.id == ticket_id))
+    ticket = result.scalar_one_or_none()
     
     if not ticket:
         raise HTTPException(
@@ -220,12 +447,20 @@ async def get_ticket_messages(
             detail="Sem permissão para acessar mensagens deste ticket"
         )
     
-    query = db.query(Message).filter(Message.ticket_id == ticket_id)
+    query = select(Message).where(Message.ticket_id == ticket_id)
     
     # Clientes não veem mensagens internas
     if current_user.role == "customer":
-        query = query.filter(Message.is_internal == False)
+        query = query.where(Message.is_internal == False)
     
-    messages = query.order_by(Message.created_at.asc()).all()
+    # Sincronização incremental: só mensagens novas, com long-poll opcional
+    if after_id is not None or since is not None or wait:
+        query = messages_after(query, after_id, since, limit)
+        return await wait_for_messages(db, query, ticket_channel(ticket_id), wait)
+    
+    messages, next_cursor = await keyset_paginate(
+        db, query, Message.created_at, Message.id, cursor, limit, descending=False
+    )
+    set_next_cursor(response, next_cursor)
     return messages
 
@@ -2,6 +2,9 @@ from .config import settings
 from .security import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    PasswordHasherBusy,
     create_access_token,
     decode_access_token,
 )
@@ -10,6 +13,9 @@ __all__ = [
     "settings",
     "verify_password",
     "get_password_hash",
+    "verify_password_async",
+    "get_password_hash_async",
+    "PasswordHasherBusy",
     "create_access_token",
     "decode_access_token",
 ]
@@ -0,0 +1,185 @@
+"""Métricas no formato de exposição do Prometheus (`GET /metrics`).
+
+Séries exportadas:
+- `http_requests_total` e `http_request_duration_seconds` (histograma), por
+  método, template da rota (`/api/v1/tickets/{ticket_id}`, não o caminho real,
+  para manter a cardinalidade baixa) e status;
+- `http_requests_in_progress`;
+- `db_pool_checked_out` / `db_pool_overflow` por engine;
+- `event_loop_lag_seconds`: atraso do event loop medido por uma tarefa periódica;
+- `sla_breaches_total`: prazos de SLA violados, por tipo e prioridade;
+- `rate_limited_total`: requisições recusadas pelo limite de taxa, por limite;
+- `rate_limit_fail_open_total`: requisições aceitas sem verificar o limite
+  porque o backend (Redis) falhou, por limite;
+- `response_cache_requests_total`: acertos e faltas do cache de respostas, por rota;
+- `single_flight_requests_total`: leituras que executaram a rota (`leader`) ou
+  aguardaram uma execução idêntica em andamento (`coalesced`), por rota.
+
+As séries só são alteradas no event loop do worker, então não há disputa de
+lock no caminho da requisição. Com vários workers do uvicorn, defina
+`PROMETHEUS_MULTIPROC_DIR` (diretório vazio, antes de iniciar o servidor): cada
+processo grava seus valores em arquivos próprios e `/metrics` soma todos.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.responses import Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total", "Requisições HTTP atendidas", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições HTTP",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requisições HTTP em andamento", ["method"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Conexões do pool em uso", ["engine"],
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Conexões abertas além do tamanho do pool", ["engine"],
+    multiprocess_mode="livesum",
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds", "Atraso do event loop na última amostra",
+    multiprocess_mode="livemax",
+)
+SLA_BREACHES = Counter(
+    "sla_breaches_total", "Prazos de SLA de tickets violados", ["kind", "priority"]
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requisições recusadas pelo limite de taxa", ["limit"]
+)
+RATE_LIMIT_FAIL_OPEN = Counter(
+    "rate_limit_fail_open_total", "Requisições aceitas com o limitador de taxa indisponível", ["limit"]
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total", "Consultas ao cache de respostas", ["route", "result"]
+)
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "single_flight_requests_total", "Leituras executadas ou agrupadas pelo single-flight", ["route", "result"]
+)
+
+
+def _multiprocess_dir() -> Optional[str]:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que conta e cronometra as requisições HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            # O roteador do FastAPI grava a rota encontrada no próprio scope
+            route = scope.get("route")
+            template = getattr(route, "path", UNMATCHED_ROUTE)
+            REQUESTS.labels(method, template, status_code).inc()
+            REQUEST_LATENCY.labels(method, template, status_code).observe(time.perf_counter() - start)
+
+
+class RuntimeMonitor:
+    """Amostra periodicamente o atraso do event loop e o uso dos pools de conexão."""
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._engines: Dict[str, object] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_engine(self, name: str, engine) -> None:
+        self._engines[name] = engine
+
+    def sample_pools(self) -> None:
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            # NullPool/StaticPool não contam conexões
+            if hasattr(pool, "checkedout"):
+                POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+            if hasattr(pool, "overflow"):
+                POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.set(max(loop.time() - start - self.interval, 0.0))
+            try:
+                self.sample_pools()
+            except Exception:
+                logger.exception("Falha ao amostrar pools de conexão")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if _multiprocess_dir():
+            multiprocess.mark_process_dead(os.getpid())
+
+
+def metrics_response() -> Response:
+    """Resposta de `/metrics`, agregando todos os workers no modo multiprocesso."""
+    runtime_monitor.sample_pools()
+    if _multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+runtime_monitor = RuntimeMonitor(settings.METRICS_SAMPLE_INTERVAL_SECONDS)
@@ -1,4 +1,13 @@
-from .session import engine, SessionLocal, get_db
-
-__all__ = ["engine", "SessionLocal", "get_db"]
+from .session import engine, SessionLocal, async_engine, AsyncSessionLocal, get_db
+from .instrumentation import QueryStatsMiddleware, capture_queries, query_budget
 
+__all__ = [
+    "engine",
+    "SessionLocal",
+    "async_engine",
+    "AsyncSessionLocal",
+    "get_db",
+    "QueryStatsMiddleware",
+    "capture_queries",
+    "query_budget",
+]
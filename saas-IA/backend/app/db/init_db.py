@@ -0,0 +1,52 @@
+"""Preparação do banco na inicialização da aplicação (lifespan).
+
+Nada aqui roda na importação: importar `main` (workers, testes, `--reload`) não
+abre conexão. O esquema é das migrations (`alembic upgrade head`); com
+`DB_CREATE_TABLES` ligado (padrão, para desenvolvimento) as tabelas que faltam
+também são criadas aqui. Em seguida, idempotentes: estruturas de busca textual
+e preenchimento inicial dos contadores do painel.
+
+Se o banco ainda não aceita conexões (contêineres subindo juntos), tenta de
+novo `DB_STARTUP_RETRIES` vezes antes de desistir.
+"""
+import asyncio
+import logging
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import async_engine
+from app.models.models import Base
+from app.services.dashboard import ensure_dashboard_counters
+from app.services.search import ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+
+def _prepare(connection: Connection) -> None:
+    if settings.DB_CREATE_TABLES:
+        Base.metadata.create_all(connection)
+    ensure_search_index(connection)
+    # Contadores do painel: preenchidos a partir das tabelas na primeira execução
+    with Session(bind=connection) as session:
+        ensure_dashboard_counters(session)
+
+
+async def init_db() -> None:
+    """Prepara o banco; repete enquanto ele estiver indisponível."""
+    for attempt in range(1, settings.DB_STARTUP_RETRIES + 1):
+        try:
+            async with async_engine.begin() as connection:
+                await connection.run_sync(_prepare)
+            return
+        # OSError: conexão recusada antes de o driver responder
+        except (OperationalError, OSError) as exc:
+            if attempt == settings.DB_STARTUP_RETRIES:
+                raise
+            logger.warning(
+                "Banco indisponível na inicialização (tentativa %d/%d): %s",
+                attempt, settings.DB_STARTUP_RETRIES, exc,
+            )
+            await asyncio.sleep(settings.DB_STARTUP_RETRY_SECONDS)
@@ -0,0 +1,185 @@
+"""Instrumentação de SQL por requisição e detector de N+1.
+
+Eventos do SQLAlchemy medem cada comando executado e acumulam o resultado no
+`QueryStats` da requisição corrente (guardado em uma ContextVar). O middleware
+abre as estatísticas, devolve `X-DB-Query-Count`/`X-DB-Time-Ms` quando
+`SQL_STATS_HEADERS` está ligado e escreve uma linha de log estruturada com
+contagem, tempo total, comandos mais lentos e formatos repetidos (N+1).
+
+Em testes, `capture_queries()` mede um trecho de código e `query_budget(n)`
+declara o orçamento de consultas de um endpoint; com
+`SQL_ENFORCE_QUERY_BUDGETS` ligado, estourar o orçamento gera erro.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.sql")
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+# Placeholders de sqlite (?), psycopg2 (%(nome)s) e asyncpg ($1::INTEGER)
+_PLACEHOLDER = r"(?:\?|%\(\w+\)s|\$\d+(?:::\w+)?)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Endpoint executou mais consultas do que o orçamento declarado."""
+
+
+def statement_shape(statement: str) -> str:
+    """Normaliza o SQL para agrupar comandos iguais com parâmetros diferentes."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("(?...)", shape)
+
+
+@dataclass
+class QueryStats:
+    """Consultas executadas em uma requisição (ou trecho medido)."""
+
+    count: int = 0
+    total_time: float = 0.0
+    budget: Optional[int] = None
+    shapes: Counter = field(default_factory=Counter)
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[settings.SQL_SLOW_STATEMENTS:]
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Formatos executados `threshold` vezes ou mais: suspeitos de N+1."""
+        threshold = threshold or settings.SQL_N_PLUS_ONE_THRESHOLD
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "slowest": [
+                {"ms": round(duration * 1000, 2), "sql": statement_shape(statement)[:300]}
+                for duration, statement in self.slowest
+            ],
+            "n_plus_one": [{"count": count, "sql": shape[:300]} for shape, count in self.repeated()],
+        }
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Mede as consultas executadas dentro do bloco."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def query_budget(max_queries: int):
+    """Dependência que declara o número máximo de consultas de um endpoint."""
+
+    async def declare_budget() -> None:
+        stats = current_stats()
+        if stats is not None:
+            stats.budget = max_queries
+
+    return declare_budget
+
+
+def check_budget(stats: QueryStats, label: str) -> None:
+    """Avisa (ou falha, em modo de teste) se o orçamento foi ultrapassado."""
+    if stats.budget is None or stats.count <= stats.budget:
+        return
+    message = f"{label}: {stats.count} consultas, orçamento {stats.budget}"
+    if settings.SQL_ENFORCE_QUERY_BUDGETS:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra os eventos de medição em uma engine (use `.sync_engine` nas assíncronas)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Middleware ASGI que mede as consultas SQL de cada requisição HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and settings.SQL_STATS_HEADERS:
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()))
+                headers.append((QUERY_TIME_HEADER.lower().encode(), f"{stats.total_time * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            label = f"{scope['method']} {scope['path']}"
+            log_stats(stats, label, time.perf_counter() - start)
+        check_budget(stats, label)
+
+
+def log_stats(stats: QueryStats, label: str, duration: float) -> None:
+    """Linha de log JSON com o resumo das consultas; WARNING quando há N+1."""
+    if not stats.count:
+        return
+    summary = {"request": label, "duration_ms": round(duration * 1000, 2), **stats.summary()}
+    level = logging.WARNING if summary["n_plus_one"] else logging.INFO
+    logger.log(level, json.dumps(summary, ensure_ascii=False))
@@ -0,0 +1,79 @@
+"""Paginação por cursor (keyset) sobre colunas `(timestamp, id)`."""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Gera token opaco a partir da chave `(created_at, id)`."""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica token de cursor; HTTP 400 se for inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+
+async def keyset_paginate(
+    db: AsyncSession,
+    query: Select,
+    created_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+    skip: int = 0,
+) -> Tuple[List, Optional[str]]:
+    """Aplica ordenação e filtro keyset; retorna `(itens, next_cursor)`.
+
+    `next_cursor` é None na última página. `skip` mantém a paginação por offset
+    legada e é ignorado com cursor.
+    """
+    key = tuple_(created_column, id_column)
+    
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.where(key < (created_at, id) if descending else key > (created_at, id))
+    
+    if descending:
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_column.asc(), id_column.asc())
+    
+    if skip and not cursor:
+        query = query.offset(skip)
+    
+    # Busca um item a mais para saber se existe próxima página
+    result = await db.execute(query.limit(limit + 1))
+    items = result.scalars().all()
+    if len(items) <= limit:
+        return items, None
+    
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(
+        getattr(last, created_column.key),
+        getattr(last, id_column.key),
+    )
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expõe o cursor da próxima página no header da resposta."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -1,4 +1,29 @@
-from .models import User, Ticket, Message, KnowledgeArticle, ChatSession
-
-__all__ = ["User", "Ticket", "Message", "KnowledgeArticle", "ChatSession"]
+from .models import (
+    User,
+    Ticket,
+    Message,
+    KnowledgeArticle,
+    ChatSession,
+    Tag,
+    TicketSignature,
+    TicketSLA,
+    collection_versions,
+    dashboard_counters,
+    knowledge_article_tags,
+    ticket_lsh_buckets,
+)
 
+__all__ = [
+    "User",
+    "Ticket",
+    "Message",
+    "KnowledgeArticle",
+    "ChatSession",
+    "Tag",
+    "TicketSignature",
+    "TicketSLA",
+    "collection_versions",
+    "dashboard_counters",
+    "knowledge_article_tags",
+    "ticket_lsh_buckets",
+]
@@ -1,5 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import (
+    Column, Integer, BigInteger, SmallInteger, String, Text, DateTime, ForeignKey, Enum, Boolean,
+    Index, LargeBinary, Table, text,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 import enum
@@ -34,6 +37,11 @@ class ChatStatus(str, enum.Enum):
     ENDED = "ended"
 
 
+# Predicado da fila de atendimento, usado pelo índice parcial e pelas consultas
+# que devem aproveitá-lo (o Enum grava o nome do membro, não o valor)
+CHAT_WAITING_PREDICATE = "status = 'WAITING'"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -52,7 +60,7 @@ class User(Base):
     tickets_created = relationship("Ticket", back_populates="customer", foreign_keys="Ticket.customer_id")
     tickets_assigned = relationship("Ticket", back_populates="assigned_agent", foreign_keys="Ticket.assigned_to")
     messages = relationship("Message", back_populates="sender")
-    chat_sessions = relationship("ChatSession", back_populates="customer")
+    chat_sessions = relationship("ChatSession", back_populates="customer", foreign_keys="ChatSession.customer_id")
     articles_created = relationship("KnowledgeArticle", back_populates="author")
 
 
@@ -62,14 +70,14 @@ class Ticket(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
     description = Column(Text, nullable=False)
-    status = Column(Enum(TicketStatus), default=TicketStatus.OPEN, nullable=False, index=True)
+    status = Column(Enum(TicketStatus), default=TicketStatus.OPEN, nullable=False)
     priority = Column(Enum(TicketPriority), default=TicketPriority.MEDIUM, nullable=False)
     category = Column(String, nullable=True, index=True)
     
     customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = Column(DateTime, nullable=True)
     closed_at = Column(DateTime, nullable=True)
@@ -79,6 +87,14 @@ class Ticket(Base):
     assigned_agent = relationship("User", back_populates="tickets_assigned", foreign_keys=[assigned_to])
     messages = relationship("Message", back_populates="ticket", cascade="all, delete-orphan")
 
+    # Índices para paginação keyset por (created_at, id), sozinha ou após o filtro
+    # por cliente ou status (cobrem também as consultas só por status)
+    __table_args__ = (
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+        Index("ix_tickets_customer_id_created_at_id", "customer_id", "created_at", "id"),
+        Index("ix_tickets_status_created_at_id", "status", "created_at", "id"),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -99,12 +115,18 @@ class Message(Base):
     chat_session = relationship("ChatSession", back_populates="messages")
     sender = relationship("User", back_populates="messages")
 
+    # Índices para paginação keyset do histórico por (created_at, id)
+    __table_args__ = (
+        Index("ix_messages_ticket_id_created_at_id", "ticket_id", "created_at", "id"),
+        Index("ix_messages_chat_session_id_created_at_id", "chat_session_id", "created_at", "id"),
+    )
+
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
 
     id = Column(Integer, primary_key=True, index=True)
-    status = Column(Enum(ChatStatus), default=ChatStatus.WAITING, nullable=False, index=True)
+    status = Column(Enum(ChatStatus), default=ChatStatus.WAITING, nullable=False)
     
     customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     agent_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -118,6 +140,21 @@ class ChatSession(Base):
     customer = relationship("User", back_populates="chat_sessions", foreign_keys=[customer_id])
     messages = relationship("Message", back_populates="chat_session", cascade="all, delete-orphan")
 
+    # Índices para paginação keyset por (started_at, id) e índice parcial da fila
+    # de atendimento, que cobre apenas as sessões aguardando agente
+    __table_args__ = (
+        Index("ix_chat_sessions_started_at_id", "started_at", "id"),
+        Index("ix_chat_sessions_customer_id_started_at_id", "customer_id", "started_at", "id"),
+        Index("ix_chat_sessions_status_started_at_id", "status", "started_at", "id"),
+        Index(
+            "ix_chat_sessions_waiting_queue",
+            "started_at",
+            "id",
+            postgresql_where=text(CHAT_WAITING_PREDICATE),
+            sqlite_where=text(CHAT_WAITING_PREDICATE),
+        ),
+    )
+
 
 class KnowledgeArticle(Base):
     __tablename__ = "knowledge_articles"
@@ -126,7 +163,7 @@ class KnowledgeArticle(Base):
     title = Column(String, nullable=False, index=True)
     content = Column(Text, nullable=False)
     category = Column(String, nullable=True, index=True)
-    tags = Column(String, nullable=True)  # Comma-separated tags
+    tags = Column(String, nullable=True)  # Comma-separated tags (normalizadas em `tag_list`)
     
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
@@ -140,4 +177,100 @@ class KnowledgeArticle(Base):
 
     # Relacionamentos
     author = relationship("User", back_populates="articles_created")
+    tag_list = relationship("Tag", secondary="knowledge_article_tags", back_populates="articles")
+
+    # Índices parciais das listagens do portal (só artigos publicados), na ordem
+    # por visualizações, com e sem filtro de categoria
+    __table_args__ = (
+        Index(
+            "ix_knowledge_articles_published_view_count",
+            "view_count",
+            "id",
+            postgresql_where=is_published == True,
+            sqlite_where=is_published == True,
+        ),
+        Index(
+            "ix_knowledge_articles_published_category_view_count",
+            "category",
+            "view_count",
+            postgresql_where=is_published == True,
+            sqlite_where=is_published == True,
+        ),
+    )
+
+
+# Associação artigo <-> tag; o índice (tag_id, article_id) atende o filtro por tag
+knowledge_article_tags = Table(
+    "knowledge_article_tags",
+    Base.metadata,
+    Column("article_id", Integer, ForeignKey("knowledge_articles.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_knowledge_article_tags_tag_id_article_id", "tag_id", "article_id"),
+)
+
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)  # normalizada: minúsculas, sem espaços extras
+
+    # Relacionamentos
+    articles = relationship("KnowledgeArticle", secondary=knowledge_article_tags, back_populates="tag_list")
+
+
+class TicketSignature(Base):
+    """Assinatura MinHash do texto do ticket (detecção de duplicados)."""
+    __tablename__ = "ticket_signatures"
+
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)  # uint32 por permutação
+
+
+# Buckets LSH: tickets com o mesmo (band, bucket) são candidatos a duplicados
+ticket_lsh_buckets = Table(
+    "ticket_lsh_buckets",
+    Base.metadata,
+    Column("band", SmallInteger, primary_key=True),
+    Column("bucket", BigInteger, primary_key=True),
+    Column("ticket_id", Integer, ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_ticket_lsh_buckets_ticket_id", "ticket_id"),
+)
+
+
+# Contadores do painel (tickets por status/prioridade/categoria, chats por status).
+# Cada contador tem várias linhas (`shard`) somadas na leitura, para que
+# transações concorrentes raramente atualizem a mesma linha
+dashboard_counters = Table(
+    "dashboard_counters",
+    Base.metadata,
+    Column("dimension", String(32), primary_key=True),  # ex.: "ticket_status"
+    Column("key", String, primary_key=True),  # valor contado; "" = sem categoria
+    Column("shard", SmallInteger, primary_key=True),
+    Column("count", Integer, nullable=False, server_default=text("0")),
+)
+
+
+# Versão de cada coleção (tickets, artigos), incrementada a cada escrita: base
+# dos ETags das listagens. Também dividida em `shard`s, somados na leitura
+collection_versions = Table(
+    "collection_versions",
+    Base.metadata,
+    Column("name", String(32), primary_key=True),
+    Column("shard", SmallInteger, primary_key=True),
+    Column("version", BigInteger, nullable=False, server_default=text("0")),
+)
+
+
+class TicketSLA(Base):
+    """Prazos de SLA do ticket (primeira resposta e resolução), pela prioridade."""
+    __tablename__ = "ticket_slas"
 
+    ticket_id = Column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), primary_key=True)
+    first_response_due_at = Column(DateTime, nullable=True)
+    first_response_at = Column(DateTime, nullable=True)  # primeira resposta pública de agente
+    first_response_breached_at = Column(DateTime, nullable=True)
+    resolution_due_at = Column(DateTime, nullable=True)
+    resolution_breached_at = Column(DateTime, nullable=True)
+    # Próximo prazo ainda pendente (nulo se não houver): é o que o agendador carrega
+    due_at = Column(DateTime, nullable=True, index=True)
@@ -3,15 +3,27 @@ from .schemas import (
     UserUpdate,
     UserResponse,
     TicketCreate,
+    TicketDraft,
     TicketUpdate,
     TicketResponse,
+    TicketCreatedResponse,
+    DuplicateMatch,
+    DuplicateCluster,
     MessageCreate,
     MessageResponse,
     ChatSessionCreate,
     ChatSessionResponse,
     KnowledgeArticleCreate,
+    KnowledgeArticleImport,
     KnowledgeArticleUpdate,
     KnowledgeArticleResponse,
+    KnowledgeSearchResult,
+    ArticleImportError,
+    ArticleImportReport,
+    TagCount,
+    TicketStats,
+    ChatStats,
+    DashboardStats,
     Token,
     TokenData,
 )
@@ -21,15 +33,27 @@ __all__ = [
     "UserUpdate",
     "UserResponse",
     "TicketCreate",
+    "TicketDraft",
     "TicketUpdate",
     "TicketResponse",
+    "TicketCreatedResponse",
+    "DuplicateMatch",
+    "DuplicateCluster",
     "MessageCreate",
     "MessageResponse",
     "ChatSessionCreate",
     "ChatSessionResponse",
     "KnowledgeArticleCreate",
+    "KnowledgeArticleImport",
     "KnowledgeArticleUpdate",
     "KnowledgeArticleResponse",
+    "KnowledgeSearchResult",
+    "ArticleImportError",
+    "ArticleImportReport",
+    "TagCount",
+    "TicketStats",
+    "ChatStats",
+    "DashboardStats",
     "Token",
     "TokenData",
 ]
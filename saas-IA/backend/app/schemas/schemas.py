@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -52,6 +52,12 @@ class TicketUpdate(BaseModel):
     assigned_to: Optional[int] = None
 
 
+class TicketDraft(BaseModel):
+    """Formulário de ticket ainda em preenchimento (para sugerir artigos)."""
+    title: str = Field("", max_length=200)
+    description: str = Field("", max_length=5000)
+
+
 class TicketResponse(TicketBase):
     id: int
     status: str
@@ -66,6 +72,20 @@ class TicketResponse(TicketBase):
         from_attributes = True
 
 
+class DuplicateMatch(BaseModel):
+    ticket_id: int
+    similarity: float  # Jaccard estimado pela assinatura MinHash
+
+
+class TicketCreatedResponse(TicketResponse):
+    possible_duplicates: List[DuplicateMatch] = []  # tickets abertos parecidos
+
+
+class DuplicateCluster(BaseModel):
+    size: int
+    tickets: List[TicketResponse]
+
+
 # ===== Message Schemas =====
 class MessageBase(BaseModel):
     content: str = Field(..., min_length=1)
@@ -131,6 +151,10 @@ class KnowledgeArticleCreate(KnowledgeArticleBase):
     pass
 
 
+class KnowledgeArticleImport(KnowledgeArticleCreate):
+    is_published: Optional[bool] = None  # None: usa o padrão da importação
+
+
 class KnowledgeArticleUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=5, max_length=200)
     content: Optional[str] = Field(None, min_length=20)
@@ -153,6 +177,52 @@ class KnowledgeArticleResponse(KnowledgeArticleBase):
         from_attributes = True
 
 
+class KnowledgeSearchResult(KnowledgeArticleResponse):
+    score: float
+    snippet: Optional[str] = None  # Trecho do conteúdo com termos em <mark>
+
+
+class ArticleImportError(BaseModel):
+    row: str  # ex.: "linha 12" ou "faq/login.md"
+    error: str
+
+
+class ArticleImportReport(BaseModel):
+    total: int
+    imported: int
+    skipped: int  # já existentes (skip_existing)
+    failed: int
+    errors: List[ArticleImportError]  # limitado a IMPORT_MAX_REPORTED_ERRORS
+    article_ids: List[int]
+
+    class Config:
+        from_attributes = True
+
+
+class TagCount(BaseModel):
+    name: str
+    count: int  # artigos com a tag
+
+
+# ===== Dashboard Schemas =====
+class TicketStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_category: Dict[str, int]
+    uncategorized: int
+
+
+class ChatStats(BaseModel):
+    total: int
+    by_status: Dict[str, int]
+
+
+class DashboardStats(BaseModel):
+    tickets: TicketStats
+    chats: ChatStats
+
+
 # ===== Authentication Schemas =====
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,18 @@
+from .broker import Broker, BrokerError, InMemoryBroker, RedisBroker, broker, chat_channel, ticket_channel
+from .counters import ArticleCounterBuffer, article_counters
+from .dispatcher import claim_chat, claim_next_chat, waiting_queue
+
+__all__ = [
+    "Broker",
+    "BrokerError",
+    "InMemoryBroker",
+    "RedisBroker",
+    "broker",
+    "chat_channel",
+    "ticket_channel",
+    "ArticleCounterBuffer",
+    "article_counters",
+    "claim_chat",
+    "claim_next_chat",
+    "waiting_queue",
+]
@@ -0,0 +1,423 @@
+"""Importação em lote de artigos da base de conhecimento (CSV, JSONL ou Markdown).
+
+As linhas são lidas do arquivo em streaming e processadas em lotes de
+`IMPORT_BATCH_SIZE`: cada lote é validado com as regras de `POST /knowledge`,
+gravado de uma vez (`COPY` no PostgreSQL com psycopg2, `executemany` nos demais
+bancos), recebe as tags numa única passada e é confirmado. Linhas inválidas não
+interrompem a importação: entram no relatório com o motivo. Se o banco rejeitar
+um lote, ele é regravado linha a linha para identificar quais falharam.
+
+A busca textual é mantida pelo próprio banco; o índice de sugestões recebe os
+artigos publicados uma vez por lote.
+
+Síncrona (usa a engine dos scripts): na rota, chame `import_file` com
+`asyncio.to_thread`.
+"""
+import csv
+import io
+import json
+import os
+import tarfile
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import KnowledgeArticle
+from app.schemas.schemas import KnowledgeArticleImport
+from app.services.etag import KNOWLEDGE, bump_versions
+from app.services.suggestions import article_fields, suggestion_index
+from app.services.tags import add_articles_tags
+
+IMPORT_FORMATS = ("csv", "jsonl", "markdown")
+
+_MARKDOWN_EXTENSIONS = (".md", ".markdown")
+_ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+_MAX_MARKDOWN_BYTES = 1024 * 1024
+
+# Ordem das colunas no COPY e nos registros gravados
+_COLUMNS = [
+    "title", "content", "category", "tags", "author_id", "is_published",
+    "view_count", "helpful_count", "created_at", "updated_at", "published_at",
+]
+
+
+class SourceRow(NamedTuple):
+    """Linha lida do arquivo: `data` com os campos, ou `error` se não foi possível ler."""
+
+    source: str  # ex.: "linha 12" ou "faq/login.md"
+    data: Optional[dict]
+    error: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+    article_ids: List[int] = field(default_factory=list)
+
+    def fail(self, source: str, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": source, "error": error})
+
+
+# ----- leitura -----
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Formato pela extensão do arquivo; None se não for reconhecida."""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if name.endswith(_MARKDOWN_EXTENSIONS + _ARCHIVE_EXTENSIONS):
+        return "markdown"
+    return None
+
+
+def read_csv(stream: BinaryIO) -> Iterator[SourceRow]:
+    """Uma linha por artigo; a primeira linha nomeia as colunas (title, content, category, tags, is_published)."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    try:
+        for record in reader:
+            yield SourceRow(f"linha {reader.line_num}", record)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        yield SourceRow(f"linha {reader.line_num + 1}", None, f"arquivo ilegível, importação interrompida: {exc}")
+    finally:
+        text.detach()
+
+
+def read_jsonl(stream: BinaryIO) -> Iterator[SourceRow]:
+    """Um objeto JSON por linha, com os mesmos campos do CSV (`tags` também como lista)."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    number = 0
+    try:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                yield SourceRow(f"linha {number}", None, f"JSON inválido: {exc}")
+                continue
+            if not isinstance(data, dict):
+                yield SourceRow(f"linha {number}", None, "esperado um objeto JSON")
+                continue
+            yield SourceRow(f"linha {number}", data)
+    except UnicodeDecodeError as exc:
+        yield SourceRow(f"linha {number + 1}", None, f"arquivo ilegível, importação interrompida: {exc}")
+    finally:
+        text.detach()
+
+
+def _front_matter(text: str) -> Tuple[dict, str]:
+    # Cabeçalho simples `chave: valor` entre linhas `---` (sem depender de YAML)
+    if not text.startswith("---"):
+        return {}, text
+    header, separator, rest = text[3:].partition("\n---")
+    if not separator:
+        return {}, text
+    data = {}
+    for line in header.splitlines():
+        key, colon, value = line.partition(":")
+        if colon and key.strip():
+            data[key.strip().lower()] = value.strip().strip("\"'")
+    return data, rest.partition("\n")[2]
+
+
+def markdown_article(name: str, raw: bytes) -> SourceRow:
+    """Artigo de um arquivo Markdown.
+
+    Título: `title` do cabeçalho, senão o primeiro `# título` (retirado do
+    conteúdo), senão o nome do arquivo. `category`, `tags` e `published` vêm do
+    cabeçalho.
+    """
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return SourceRow(name, None, "arquivo não está em UTF-8")
+    data, body = _front_matter(text.replace("\r\n", "\n"))
+    if "published" in data:
+        data["is_published"] = data.pop("published")
+    if "tags" in data:
+        data["tags"] = data["tags"].strip("[]")
+    if not data.get("title"):
+        lines = body.split("\n")
+        heading = next((index for index, line in enumerate(lines) if line.strip()), None)
+        if heading is not None and lines[heading].startswith("# "):
+            data["title"] = lines[heading][2:].strip()
+            body = "\n".join(lines[heading + 1:])
+        else:
+            stem = os.path.splitext(os.path.basename(name))[0]
+            data["title"] = stem.replace("_", " ").replace("-", " ").strip()
+    data["content"] = body.strip()
+    return SourceRow(name, data)
+
+
+def _is_markdown(name: str) -> bool:
+    base = os.path.basename(name)
+    return name.lower().endswith(_MARKDOWN_EXTENSIONS) and not base.startswith(".") and "__MACOSX" not in name
+
+
+def read_markdown(stream: BinaryIO, filename: Optional[str] = None) -> Iterator[SourceRow]:
+    """Um artigo por arquivo `.md` de um .zip/.tar(.gz), ou um único arquivo `.md`."""
+    if (filename or "").lower().endswith(_MARKDOWN_EXTENSIONS):
+        raw = stream.read(_MAX_MARKDOWN_BYTES + 1)
+        if len(raw) > _MAX_MARKDOWN_BYTES:
+            yield SourceRow(filename, None, "arquivo maior que 1 MiB")
+        else:
+            yield markdown_article(filename, raw)
+        return
+    if zipfile.is_zipfile(stream):
+        stream.seek(0)
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_markdown(info.filename):
+                    continue
+                if info.file_size > _MAX_MARKDOWN_BYTES:
+                    yield SourceRow(info.filename, None, "arquivo maior que 1 MiB")
+                    continue
+                yield markdown_article(info.filename, archive.read(info))
+        return
+    stream.seek(0)
+    try:
+        # Modo "r|*": lê o tar (comprimido ou não) sequencialmente, sem índice
+        archive = tarfile.open(fileobj=stream, mode="r|*")
+    except tarfile.TarError:
+        yield SourceRow("arquivo", None, "esperado .md, .zip ou .tar(.gz) com arquivos Markdown")
+        return
+    with archive:
+        for member in archive:
+            if not member.isfile() or not _is_markdown(member.name):
+                continue
+            if member.size > _MAX_MARKDOWN_BYTES:
+                yield SourceRow(member.name, None, "arquivo maior que 1 MiB")
+                continue
+            yield markdown_article(member.name, archive.extractfile(member).read())
+
+
+def read_rows(stream: BinaryIO, import_format: str, filename: Optional[str] = None) -> Iterator[SourceRow]:
+    if import_format == "csv":
+        return read_csv(stream)
+    if import_format == "jsonl":
+        return read_jsonl(stream)
+    if import_format == "markdown":
+        return read_markdown(stream, filename)
+    raise ValueError(f"Formato de importação desconhecido: {import_format}")
+
+
+# ----- validação -----
+
+def _clean(data: dict) -> dict:
+    cleaned = {}
+    for key, value in data.items():
+        if key is None:  # colunas a mais numa linha do CSV
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ("", None):
+            continue
+        cleaned[key.strip().lower()] = value
+    if isinstance(cleaned.get("tags"), list):
+        cleaned["tags"] = ", ".join(str(tag) for tag in cleaned["tags"])
+    if "published" in cleaned and "is_published" not in cleaned:
+        cleaned["is_published"] = cleaned.pop("published")
+    return cleaned
+
+
+def validate_row(row: SourceRow) -> Tuple[Optional[KnowledgeArticleImport], Optional[str]]:
+    """Artigo validado com as regras de `POST /knowledge`, ou a mensagem de erro."""
+    if row.error:
+        return None, row.error
+    try:
+        return KnowledgeArticleImport.model_validate(_clean(row.data)), None
+    except ValidationError as exc:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+        )
+
+
+# ----- gravação -----
+
+def _uses_copy(session: Session) -> bool:
+    dialect = session.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def _copy_articles(session: Session, records: List[dict]) -> List[int]:
+    # COPY não devolve os ids: reserva-os antes na sequência da tabela
+    sequence = func.pg_get_serial_sequence(KnowledgeArticle.__tablename__, "id")
+    ids = session.execute(
+        select(func.nextval(sequence)).select_from(func.generate_series(1, len(records)))
+    ).scalars().all()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for article_id, record in zip(ids, records):
+        # No CSV do COPY, campo vazio sem aspas é NULL
+        writer.writerow([article_id] + [record[column] for column in _COLUMNS])
+    buffer.seek(0)
+    columns = ", ".join(["id"] + _COLUMNS)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {KnowledgeArticle.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+    return list(ids)
+
+
+def _insert_articles(session: Session, records: List[dict]) -> List[int]:
+    if _uses_copy(session):
+        return _copy_articles(session, records)
+    table = KnowledgeArticle.__table__
+    if session.get_bind().dialect.name == "sqlite":
+        # Com sort_by_parameter_order o SQLite faria um INSERT por linha; num INSERT
+        # de várias linhas ele atribui ids crescentes na ordem dos VALUES
+        return sorted(session.scalars(insert(table).returning(table.c.id), records))
+    return list(session.scalars(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        records,
+    ))
+
+
+def _database_error(exc: DBAPIError) -> str:
+    return str(exc.orig).strip().splitlines()[0]
+
+
+def _import_batch(
+    session: Session,
+    articles: List[Tuple[str, KnowledgeArticleImport]],
+    author_id: int,
+    publish: bool,
+    report: ImportReport,
+) -> None:
+    now = datetime.utcnow()
+    records = []
+    for _, article in articles:
+        is_published = publish if article.is_published is None else article.is_published
+        records.append({
+            **article.model_dump(include={"title", "content", "category", "tags"}),
+            "author_id": author_id,
+            "is_published": is_published,
+            "view_count": 0,
+            "helpful_count": 0,
+            "created_at": now,
+            "updated_at": now,
+            "published_at": now if is_published else None,
+        })
+
+    try:
+        with session.begin_nested():
+            ids = _insert_articles(session, records)
+        inserted = list(zip(ids, records))
+    except DBAPIError:
+        # Lote rejeitado pelo banco: grava linha a linha para saber quais falham
+        inserted = []
+        for (source, _), record in zip(articles, records):
+            try:
+                with session.begin_nested():
+                    article_id = session.execute(
+                        insert(KnowledgeArticle).values(**record).returning(KnowledgeArticle.id)
+                    ).scalar_one()
+            except DBAPIError as exc:
+                report.fail(source, _database_error(exc))
+                continue
+            inserted.append((article_id, record))
+
+    add_articles_tags(session, {article_id: record["tags"] for article_id, record in inserted})
+    if inserted:
+        bump_versions(session, [KNOWLEDGE])
+    session.commit()
+
+    suggestion_index.upsert_many(
+        (article_id, article_fields(record["title"], record["tags"], record["content"]))
+        for article_id, record in inserted
+        if record["is_published"]
+    )
+    report.imported += len(inserted)
+    report.article_ids.extend(article_id for article_id, _ in inserted)
+
+
+def _batches(rows: Iterable[SourceRow], size: int) -> Iterator[List[SourceRow]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def import_articles(
+    session: Session,
+    rows: Iterable[SourceRow],
+    author_id: int,
+    publish: bool = False,
+    skip_existing: bool = False,
+    batch_size: Optional[int] = None,
+) -> ImportReport:
+    """Valida e grava `rows` em lotes, confirmando cada lote.
+
+    `publish` é o padrão para linhas sem `is_published`. Com `skip_existing`,
+    linhas cujo título já existe na base (ou num lote anterior) são ignoradas,
+    o que permite repetir uma importação interrompida.
+    """
+    report = ImportReport()
+    for batch in _batches(rows, batch_size or settings.IMPORT_BATCH_SIZE):
+        articles: List[Tuple[str, KnowledgeArticleImport]] = []
+        for row in batch:
+            report.total += 1
+            article, error = validate_row(row)
+            if error:
+                report.fail(row.source, error)
+            else:
+                articles.append((row.source, article))
+
+        if skip_existing and articles:
+            existing = set(session.execute(
+                select(KnowledgeArticle.title).where(
+                    KnowledgeArticle.title.in_({article.title for _, article in articles})
+                )
+            ).scalars())
+            unique: Dict[str, Tuple[str, KnowledgeArticleImport]] = {}
+            for source, article in articles:
+                if article.title in existing or article.title in unique:
+                    report.skipped += 1
+                else:
+                    unique[article.title] = (source, article)
+            articles = list(unique.values())
+
+        if articles:
+            _import_batch(session, articles, author_id, publish, report)
+    return report
+
+
+def import_file(
+    stream: BinaryIO,
+    import_format: str,
+    author_id: int,
+    filename: Optional[str] = None,
+    publish: bool = False,
+    skip_existing: bool = False,
+    batch_size: Optional[int] = None,
+) -> ImportReport:
+    """Importa um arquivo aberto em modo binário, numa sessão própria."""
+    with SessionLocal() as session:
+        return import_articles(
+            session,
+            read_rows(stream, import_format, filename),
+            author_id,
+            publish=publish,
+            skip_existing=skip_existing,
+            batch_size=batch_size,
+        )
@@ -0,0 +1,170 @@
+"""Broker de publicação/assinatura para eventos em tempo real (chat)."""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerError(Exception):
+    """A assinatura deixou de receber eventos (ex.: conexão com o Redis perdida)."""
+
+
+class Subscription:
+    """Assinatura de um canal; iterável de forma assíncrona.
+
+    Se o broker falhar, a iteração levanta `BrokerError` (e continua
+    levantando) em vez de ficar esperando eventos que não virão.
+    """
+
+    def __init__(self, queue: asyncio.Queue):
+        self._queue = queue
+        self._error: Optional[BrokerError] = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._error is not None:
+            raise self._error
+        item = await self._queue.get()
+        if isinstance(item, BrokerError):
+            self._error = item
+            raise item
+        return item
+
+
+class Broker(ABC):
+    """Interface comum dos brokers de eventos."""
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str):
+        """Retorna um context manager assíncrono que produz uma `Subscription`."""
+
+    async def close(self) -> None:
+        pass
+
+
+class InMemoryBroker(Broker):
+    """Broker em processo baseado em filas asyncio (um único worker)."""
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._channels: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, message: dict) -> None:
+        for queue in list(self._channels.get(channel, ())):
+            # Assinante lento: descarta a mensagem mais antiga em vez de bloquear
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._channels.setdefault(channel, set()).add(queue)
+        try:
+            yield Subscription(queue)
+        finally:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._channels.get(channel, ()))
+
+
+class RedisBroker(Broker):
+    """Broker baseado em Redis Pub/Sub, para múltiplos workers."""
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+        self._client = client
+
+    async def publish(self, channel: str, message: dict) -> None:
+        await self._client.publish(channel, json.dumps(message))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        pubsub = self._client.pubsub()
+        await pubsub.subscribe(channel)
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def reader():
+            try:
+                async for item in pubsub.listen():
+                    if item.get("type") == "message":
+                        await queue.put(json.loads(item["data"]))
+            except Exception as exc:
+                error = BrokerError(f"Assinatura de {channel} interrompida: {exc}")
+                error.__cause__ = exc
+            else:
+                error = BrokerError(f"Assinatura de {channel} encerrada pelo Redis")
+            # Entrega a falha ao consumidor: sem isso ele esperaria para sempre
+            await queue.put(error)
+
+        task = asyncio.create_task(reader())
+        try:
+            yield Subscription(queue)
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            try:
+                await pubsub.unsubscribe(channel)
+            except Exception:
+                # A conexão pode já ter caído (é o que encerrou a assinatura)
+                logger.debug("Falha ao cancelar a assinatura de %s", channel, exc_info=True)
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_broker(backend: Optional[str] = None) -> Broker:
+    """Cria o broker configurado em `settings.CHAT_BROKER`."""
+    backend = backend or settings.CHAT_BROKER
+    if backend == "redis":
+        return RedisBroker(settings.REDIS_URL)
+    if backend == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Broker desconhecido: {backend}")
+
+
+def chat_channel(session_id: int) -> str:
+    """Nome do canal de eventos de uma sessão de chat."""
+    return f"chat:{session_id}"
+
+
+def ticket_channel(ticket_id: int) -> str:
+    """Nome do canal de eventos de um ticket."""
+    return f"ticket:{ticket_id}"
+
+
+def sla_channel() -> str:
+    """Nome do canal de eventos de violação de SLA (todos os tickets)."""
+    return "sla"
+
+
+def sla_schedule_channel() -> str:
+    """Nome do canal de prazos de SLA recalculados fora da API (ex.: scripts)."""
+    return "sla:schedule"
+
+
+broker: Broker = create_broker()
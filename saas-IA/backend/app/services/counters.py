@@ -0,0 +1,107 @@
+"""Buffer write-behind para contadores de artigos (visualizações e "útil").
+
+Os incrementos são acumulados em memória por artigo e gravados periodicamente
+em um único UPDATE, evitando um UPDATE + commit com lock de linha por leitura.
+
+A gravação não invalida ETags nem o cache de respostas: não altera
+`updated_at` (base do ETag fraco de cada artigo) nem a versão da coleção, e os
+contadores estão em `ignore` de `invalidate_on`. As listagens mostram
+contadores com defasagem limitada a `RESPONSE_CACHE_TTL_SECONDS`; um artigo
+revalidado com `If-None-Match` só muda de ETag quando é editado.
+"""
+import asyncio
+import logging
+from collections import Counter
+from typing import Dict, Optional
+
+from sqlalchemy import case, update
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import KnowledgeArticle
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("view_count", "helpful_count")
+
+
+class ArticleCounterBuffer:
+    """Acumula incrementos por artigo e os grava em lote."""
+
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Counter] = {field: Counter() for field in COUNTER_FIELDS}
+        self._task: Optional[asyncio.Task] = None
+
+    def increment(self, article_id: int, field: str, delta: int = 1) -> None:
+        self._pending[field][article_id] += delta
+
+    def pending(self, article_id: int, field: str) -> int:
+        """Incrementos ainda não gravados no banco."""
+        return self._pending[field].get(article_id, 0)
+
+    def with_pending(self, article: KnowledgeArticle) -> dict:
+        """Contadores do artigo somados aos incrementos pendentes."""
+        return {
+            field: (getattr(article, field) or 0) + self.pending(article.id, field)
+            for field in COUNTER_FIELDS
+        }
+
+    async def flush(self) -> int:
+        """Grava os incrementos acumulados; retorna o número de artigos afetados."""
+        # Troca os buffers antes de qualquer await: novos incrementos vão para o próximo lote
+        batch, self._pending = self._pending, {field: Counter() for field in COUNTER_FIELDS}
+        article_ids = set().union(*batch.values())
+        if not article_ids:
+            return 0
+        
+        # Sem isso o `onupdate` de `updated_at` dispara: visualizar não é editar
+        values = {"updated_at": KnowledgeArticle.updated_at}
+        for field, deltas in batch.items():
+            if deltas:
+                column = getattr(KnowledgeArticle, field)
+                values[field] = column + case(deltas, value=KnowledgeArticle.id, else_=0)
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(KnowledgeArticle)
+                    .where(KnowledgeArticle.id.in_(article_ids))
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception:
+            # Devolve o lote ao buffer para a próxima tentativa
+            for field, deltas in batch.items():
+                self._pending[field].update(deltas)
+            raise
+        
+        return len(article_ids)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Falha ao gravar contadores de artigos")
+
+    def start(self) -> None:
+        """Inicia a gravação periódica em segundo plano."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Interrompe a gravação periódica e grava o que estiver pendente."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+article_counters = ArticleCounterBuffer(flush_interval=settings.COUNTER_FLUSH_INTERVAL_SECONDS)
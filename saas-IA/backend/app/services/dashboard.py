@@ -0,0 +1,178 @@
+"""Contadores do painel de atendimento, mantidos a cada alteração.
+
+Tickets por status, prioridade e categoria e chats por status ficam na tabela
+`dashboard_counters`, atualizada pelas rotas que criam, alteram ou apagam
+tickets e chats, na mesma transação da alteração. O `/stats` lê algumas dezenas
+de linhas em vez de `COUNT(*) GROUP BY` sobre `tickets` e `chat_sessions`.
+
+Cada contador é dividido em `DASHBOARD_COUNTER_SHARDS` linhas e cada alteração
+soma numa delas, sorteada: tickets abertos ao mesmo tempo raramente disputam a
+trava da mesma linha. A leitura soma as linhas.
+
+`reconcile` recalcula tudo a partir das tabelas e informa a diferença
+encontrada (scripts/reconcile_dashboard.py).
+
+As funções que gravam são síncronas para servir também aos scripts; nas rotas
+use `track_change`.
+"""
+import enum
+import random
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Select, delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import (
+    ChatSession,
+    ChatStatus,
+    Ticket,
+    TicketPriority,
+    TicketStatus,
+    dashboard_counters,
+)
+
+TICKET_STATUS = "ticket_status"
+TICKET_PRIORITY = "ticket_priority"
+TICKET_CATEGORY = "ticket_category"
+CHAT_STATUS = "chat_status"
+
+Keys = Dict[str, str]
+
+
+class CounterDrift(NamedTuple):
+    dimension: str
+    key: str
+    stored: int
+    actual: int
+
+
+def _value(value) -> str:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def ticket_keys(ticket) -> Keys:
+    """Chaves contadas de um ticket (ou linha com status, priority e category)."""
+    return {
+        TICKET_STATUS: TicketStatus(_value(ticket.status)).value,
+        TICKET_PRIORITY: TicketPriority(_value(ticket.priority)).value,
+        TICKET_CATEGORY: ticket.category or "",
+    }
+
+
+def chat_keys(session) -> Keys:
+    return {CHAT_STATUS: ChatStatus(_value(session.status)).value}
+
+
+def counter_deltas(before: Optional[Keys], after: Optional[Keys]) -> Dict[Tuple[str, str], int]:
+    """Variação de cada contador ao passar de `before` para `after` (None: não existia/foi apagado)."""
+    deltas = Counter()
+    for dimension, key in (before or {}).items():
+        deltas[(dimension, key)] -= 1
+    for dimension, key in (after or {}).items():
+        deltas[(dimension, key)] += 1
+    return {counter: delta for counter, delta in deltas.items() if delta}
+
+
+def apply_deltas(session: Session, deltas: Dict[Tuple[str, str], int]) -> None:
+    """Soma as variações nos contadores, na transação corrente da sessão."""
+    if not deltas:
+        return
+    dialect = session.get_bind().dialect.name
+    upsert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(dashboard_counters)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["dimension", "key", "shard"],
+        set_={"count": dashboard_counters.c.count + upsert.excluded.count},
+    )
+    # Ordem fixa das linhas: transações concorrentes travam na mesma ordem (sem deadlock)
+    session.execute(upsert, [
+        {
+            "dimension": dimension,
+            "key": key,
+            "shard": random.randrange(settings.DASHBOARD_COUNTER_SHARDS),
+            "count": delta,
+        }
+        for (dimension, key), delta in sorted(deltas.items())
+    ])
+
+
+async def track_change(db: AsyncSession, before: Optional[Keys], after: Optional[Keys]) -> None:
+    """Registra a alteração de um ticket/chat; chame antes do commit da própria alteração."""
+    deltas = counter_deltas(before, after)
+    if deltas:
+        await db.run_sync(apply_deltas, deltas)
+
+
+def stats_query() -> Select:
+    """`(dimension, key, total)` de todos os contadores."""
+    total = func.sum(dashboard_counters.c.count)
+    return (
+        select(dashboard_counters.c.dimension, dashboard_counters.c.key, total.label("total"))
+        .group_by(dashboard_counters.c.dimension, dashboard_counters.c.key)
+        .having(total != 0)
+    )
+
+
+def actual_counts(session: Session) -> Dict[Tuple[str, str], int]:
+    """Contagens calculadas diretamente das tabelas (`COUNT(*) GROUP BY`)."""
+    counts = {}
+    category = func.coalesce(Ticket.category, "")
+    for dimension, column in (
+        (TICKET_STATUS, Ticket.status),
+        (TICKET_PRIORITY, Ticket.priority),
+        (TICKET_CATEGORY, category),
+        (CHAT_STATUS, ChatSession.status),
+    ):
+        for key, count in session.execute(select(column, func.count()).group_by(column)).all():
+            counts[(dimension, _value(key))] = count
+    return counts
+
+
+def reconcile(session: Session, apply: bool = True) -> List[CounterDrift]:
+    """Compara os contadores com as tabelas e, com `apply`, regrava-os do zero.
+
+    No PostgreSQL a tabela de contadores fica travada contra escrita durante a
+    comparação: alterações concorrentes esperam e são contadas depois, sem se
+    perder nem contar duas vezes. Retorna os contadores que divergiam.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("LOCK TABLE dashboard_counters IN EXCLUSIVE MODE"))
+
+    stored = Counter()
+    if apply:
+        rows = session.execute(
+            delete(dashboard_counters).returning(
+                dashboard_counters.c.dimension, dashboard_counters.c.key, dashboard_counters.c.count
+            )
+        )
+    else:
+        rows = session.execute(stats_query())
+    for dimension, key, count in rows:
+        stored[(dimension, key)] += count
+
+    actual = actual_counts(session)
+    drift = [
+        CounterDrift(dimension, key, stored.get((dimension, key), 0), actual.get((dimension, key), 0))
+        for dimension, key in sorted(set(stored) | set(actual))
+        if stored.get((dimension, key), 0) != actual.get((dimension, key), 0)
+    ]
+
+    if apply:
+        if actual:
+            session.execute(insert(dashboard_counters), [
+                {"dimension": dimension, "key": key, "shard": 0, "count": count}
+                for (dimension, key), count in actual.items()
+            ])
+        session.commit()
+    else:
+        session.rollback()
+    return drift
+
+
+def ensure_dashboard_counters(session: Session) -> None:
+    """Preenche os contadores na primeira execução (tabela vazia)."""
+    if session.execute(select(dashboard_counters.c.dimension).limit(1)).first() is None:
+        reconcile(session)
@@ -0,0 +1,82 @@
+"""Fila de atendimento: reserva atômica de sessões de chat aguardando agente.
+
+Em PostgreSQL a sessão mais antiga é travada com `SELECT ... FOR UPDATE SKIP
+LOCKED`, de modo que agentes concorrentes recebem sessões diferentes sem
+esperar uns pelos outros. SQLite não tem travas por linha, mas serializa as
+escritas; lá a reserva é um único `UPDATE ... WHERE status = 'WAITING'` sobre a
+sessão mais antiga, que só uma transação consegue aplicar.
+
+As consultas usam o mesmo predicado literal do índice parcial
+`ix_chat_sessions_waiting_queue` para que o planejador possa usá-lo.
+"""
+from typing import Optional
+
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.models import CHAT_WAITING_PREDICATE, ChatSession, ChatStatus
+from app.services.dashboard import CHAT_STATUS, track_change
+
+# Transição feita pela reserva, para os contadores do painel
+_WAITING = {CHAT_STATUS: ChatStatus.WAITING.value}
+_ACTIVE = {CHAT_STATUS: ChatStatus.ACTIVE.value}
+
+
+def waiting_queue(entity=ChatSession):
+    """Sessões aguardando, da mais antiga para a mais nova."""
+    return (
+        select(entity)
+        .where(text(CHAT_WAITING_PREDICATE))
+        .order_by(entity.started_at.asc(), entity.id.asc())
+    )
+
+
+def _claim(agent_id: int):
+    return (
+        update(ChatSession)
+        .values(agent_id=agent_id, status=ChatStatus.ACTIVE.value)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def claim_next_chat(db: AsyncSession, agent_id: int) -> Optional[ChatSession]:
+    """Reservar para o agente a sessão aguardando há mais tempo, se houver."""
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(
+            waiting_queue().with_only_columns(ChatSession.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        session_id = result.scalar_one_or_none()
+        if session_id is not None:
+            await db.execute(_claim(agent_id).where(ChatSession.id == session_id))
+    else:
+        queued = aliased(ChatSession)
+        oldest = waiting_queue(queued).with_only_columns(queued.id).limit(1).scalar_subquery()
+        result = await db.execute(
+            _claim(agent_id)
+            .where(ChatSession.id == oldest, text(CHAT_WAITING_PREDICATE))
+            .returning(ChatSession.id)
+        )
+        session_id = result.scalar_one_or_none()
+
+    if session_id is None:
+        await db.rollback()
+        return None
+
+    await track_change(db, _WAITING, _ACTIVE)
+    await db.commit()
+    return await db.get(ChatSession, session_id, populate_existing=True)
+
+
+async def claim_chat(db: AsyncSession, session_id: int, agent_id: int) -> bool:
+    """Reservar uma sessão específica; falso se ela já não estiver aguardando."""
+    result = await db.execute(
+        _claim(agent_id).where(ChatSession.id == session_id, text(CHAT_WAITING_PREDICATE))
+    )
+    claimed = result.rowcount == 1
+    if claimed:
+        await track_change(db, _WAITING, _ACTIVE)
+    await db.commit()
+    return claimed
@@ -0,0 +1,258 @@
+"""Detecção de tickets quase duplicados com MinHash + LSH.
+
+O texto do ticket (título + descrição, minúsculas e sem acentos) vira um
+conjunto de shingles de `DUPLICATE_SHINGLE_SIZE` caracteres, resumido numa
+assinatura MinHash de `DUPLICATE_MINHASH_PERMUTATIONS` valores: a fração de
+valores iguais entre duas assinaturas estima a similaridade de Jaccard.
+
+A assinatura é dividida em `DUPLICATE_LSH_BANDS` faixas; cada faixa vira um
+bucket na tabela `ticket_lsh_buckets`, indexada por (band, bucket). Buscar os
+candidatos de um ticket é uma consulta pelo índice, sem varrer a tabela, e só
+os candidatos têm a similaridade conferida pela assinatura.
+
+As funções são síncronas para servir também ao script de reconstrução; nas
+rotas use `db.run_sync(...)`.
+"""
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Select, delete, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Ticket, TicketSignature, ticket_lsh_buckets
+from app.services.text_features import fold
+
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_CHUNK = 1024
+
+
+def _permutation_parameters(count: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Derivados de um hash fixo (e não de um gerador aleatório) para serem iguais
+    # em todos os processos e versões do NumPy: as assinaturas ficam no banco
+    def parameter(name: str, index: int) -> int:
+        digest = hashlib.blake2b(f"minhash-{name}-{index}".encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    multipliers = np.array([parameter("a", index) | 1 for index in range(count)], dtype=np.uint64)
+    increments = np.array([parameter("b", index) for index in range(count)], dtype=np.uint64)
+    return multipliers, increments
+
+
+_MULTIPLIERS, _INCREMENTS = _permutation_parameters(settings.DUPLICATE_MINHASH_PERMUTATIONS)
+
+
+def ticket_text(title: Optional[str], description: Optional[str]) -> str:
+    return f"{title or ''} {description or ''}"
+
+
+def shingles(text: str, size: Optional[int] = None) -> np.ndarray:
+    """Hashes (uint64) dos shingles de caracteres do texto normalizado."""
+    size = size or settings.DUPLICATE_SHINGLE_SIZE
+    normalized = " ".join(fold(text).split())
+    if len(normalized) <= size:
+        pieces = {normalized}
+    else:
+        pieces = {normalized[start:start + size] for start in range(len(normalized) - size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(piece.encode(), digest_size=4).digest(), "little") for piece in pieces),
+        dtype=np.uint64,
+        count=len(pieces),
+    )
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Assinatura MinHash (uint32 por permutação) do texto."""
+    hashes = shingles(text)
+    signature = np.full(len(_MULTIPLIERS), _MAX_HASH, dtype=np.uint64)
+    # Em blocos: textos longos não alocam permutações x shingles de uma vez
+    for start in range(0, len(hashes), _SHINGLE_CHUNK):
+        chunk = hashes[None, start:start + _SHINGLE_CHUNK]
+        # Hashing multiply-shift: (a * x + b) mod 2^64, 32 bits mais altos
+        permuted = (_MULTIPLIERS[:, None] * chunk + _INCREMENTS[:, None]) >> np.uint64(32)
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Um bucket (int64 com sinal, cabe em BIGINT) por faixa da assinatura."""
+    rows = len(signature) // settings.DUPLICATE_LSH_BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True,
+        )
+        for band in range(settings.DUPLICATE_LSH_BANDS)
+    ]
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimativa da similaridade de Jaccard entre os textos das duas assinaturas."""
+    return float(np.mean(first == second))
+
+
+def _decode(signature: bytes) -> np.ndarray:
+    return np.frombuffer(signature, dtype=np.uint32)
+
+
+def forget_ticket(session: Session, ticket_id: int) -> None:
+    session.execute(delete(ticket_lsh_buckets).where(ticket_lsh_buckets.c.ticket_id == ticket_id))
+    session.execute(delete(TicketSignature).where(TicketSignature.ticket_id == ticket_id))
+
+
+def index_tickets(session: Session, signatures: Dict[int, np.ndarray]) -> None:
+    """Grava (ou substitui) assinatura e buckets dos tickets `{id: assinatura}`."""
+    if not signatures:
+        return
+    ids = list(signatures)
+    session.execute(delete(ticket_lsh_buckets).where(ticket_lsh_buckets.c.ticket_id.in_(ids)))
+    session.execute(delete(TicketSignature).where(TicketSignature.ticket_id.in_(ids)))
+    session.execute(
+        insert(TicketSignature),
+        [{"ticket_id": ticket_id, "signature": signature.tobytes()} for ticket_id, signature in signatures.items()],
+    )
+    session.execute(
+        insert(ticket_lsh_buckets),
+        [
+            {"band": band, "bucket": bucket, "ticket_id": ticket_id}
+            for ticket_id, signature in signatures.items()
+            for band, bucket in enumerate(band_buckets(signature))
+        ],
+    )
+
+
+def find_duplicates(
+    session: Session,
+    signature: np.ndarray,
+    exclude_id: Optional[int] = None,
+    tickets: Optional[Select] = None,
+    min_similarity: Optional[float] = None,
+    limit: int = 10,
+) -> List[Tuple[int, float]]:
+    """Tickets parecidos com a assinatura: `[(ticket_id, similaridade)]`, mais parecidos primeiro.
+
+    `tickets` (um select de `Ticket.id`) restringe a busca, ex.: só tickets abertos.
+    """
+    threshold = settings.DUPLICATE_MIN_SIMILARITY if min_similarity is None else min_similarity
+    keys = list(enumerate(band_buckets(signature)))
+    candidates = (
+        select(ticket_lsh_buckets.c.ticket_id)
+        .where(tuple_(ticket_lsh_buckets.c.band, ticket_lsh_buckets.c.bucket).in_(keys))
+        .distinct()
+    )
+    if exclude_id is not None:
+        candidates = candidates.where(ticket_lsh_buckets.c.ticket_id != exclude_id)
+    if tickets is not None:
+        candidates = candidates.where(ticket_lsh_buckets.c.ticket_id.in_(tickets))
+
+    rows = session.execute(
+        select(TicketSignature.ticket_id, TicketSignature.signature).where(
+            TicketSignature.ticket_id.in_(candidates)
+        )
+    ).all()
+    scored = [(ticket_id, similarity(signature, _decode(stored))) for ticket_id, stored in rows]
+    scored = [item for item in scored if item[1] >= threshold]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
+
+
+def duplicate_clusters(
+    session: Session,
+    tickets: Select,
+    min_similarity: Optional[float] = None,
+) -> List[List[int]]:
+    """Grupos de tickets quase iguais entre os de `tickets` (um select de `Ticket.id`).
+
+    Só as linhas de buckets compartilhados por dois ou mais tickets saem do banco;
+    dentro de cada bucket, cada ticket é comparado com o primeiro e os pares
+    confirmados são unidos (union-find). Grupos maiores primeiro.
+    """
+    threshold = settings.DUPLICATE_MIN_SIMILARITY if min_similarity is None else min_similarity
+    scoped = ticket_lsh_buckets.c.ticket_id.in_(tickets)
+    shared = (
+        select(ticket_lsh_buckets.c.band, ticket_lsh_buckets.c.bucket)
+        .where(scoped)
+        .group_by(ticket_lsh_buckets.c.band, ticket_lsh_buckets.c.bucket)
+        .having(func.count() > 1)
+    )
+    rows = session.execute(
+        select(ticket_lsh_buckets.c.band, ticket_lsh_buckets.c.bucket, ticket_lsh_buckets.c.ticket_id)
+        .where(scoped, tuple_(ticket_lsh_buckets.c.band, ticket_lsh_buckets.c.bucket).in_(shared))
+        .order_by(ticket_lsh_buckets.c.band, ticket_lsh_buckets.c.bucket, ticket_lsh_buckets.c.ticket_id)
+    ).all()
+    if not rows:
+        return []
+
+    buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for band, bucket, ticket_id in rows:
+        buckets[(band, bucket)].append(ticket_id)
+    ids = {ticket_id for members in buckets.values() for ticket_id in members}
+    signatures = {
+        ticket_id: _decode(stored)
+        for ticket_id, stored in session.execute(
+            select(TicketSignature.ticket_id, TicketSignature.signature).where(
+                TicketSignature.ticket_id.in_(ids)
+            )
+        ).all()
+    }
+
+    parent = {ticket_id: ticket_id for ticket_id in signatures}
+
+    def root(ticket_id: int) -> int:
+        while parent[ticket_id] != ticket_id:
+            parent[ticket_id] = parent[parent[ticket_id]]
+            ticket_id = parent[ticket_id]
+        return ticket_id
+
+    for members in buckets.values():
+        members = [ticket_id for ticket_id in members if ticket_id in signatures]
+        for other in members[1:]:
+            first = members[0]
+            if root(first) != root(other) and similarity(signatures[first], signatures[other]) >= threshold:
+                parent[root(other)] = root(first)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for ticket_id in sorted(signatures):
+        groups[root(ticket_id)].append(ticket_id)
+    clusters = [members for members in groups.values() if len(members) > 1]
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+    return clusters
+
+
+def rebuild_index(session: Session, batch_size: int = 1000) -> int:
+    """Recalcula assinaturas e buckets de todos os tickets, em lotes por id.
+
+    Cada lote é gravado e confirmado antes do próximo, então a memória usada não
+    depende do tamanho da tabela e o índice continua consultável durante a
+    reconstrução. No fim remove entradas de tickets que não existem mais.
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        batch = session.execute(
+            select(Ticket.id, Ticket.title, Ticket.description)
+            .where(Ticket.id > last_id)
+            .order_by(Ticket.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        index_tickets(
+            session,
+            {
+                ticket_id: minhash_signature(ticket_text(title, description))
+                for ticket_id, title, description in batch
+            },
+        )
+        session.commit()
+        processed += len(batch)
+        last_id = batch[-1].id
+
+    existing = select(Ticket.id)
+    session.execute(delete(ticket_lsh_buckets).where(ticket_lsh_buckets.c.ticket_id.not_in(existing)))
+    session.execute(delete(TicketSignature).where(TicketSignature.ticket_id.not_in(existing)))
+    session.commit()
+    return processed
@@ -0,0 +1,165 @@
+"""ETags e GET condicional (`If-None-Match` → 304) para tickets e artigos.
+
+Itens: o ETag vem de `id` + `updated_at`, lidos numa consulta estreita antes
+de carregar a linha inteira; com `If-None-Match` igual a resposta é 304 sem
+carregar nem serializar o registro.
+
+Listagens: cada coleção tem um número de versão em `collection_versions`,
+incrementado na mesma transação de qualquer escrita pelo ORM nos modelos
+registrados com `version_on` (escritas em lote chamam `bump_versions`). O ETag
+de uma página combina caminho, query, usuário e a versão, então só custa a
+leitura da versão e páginas sem alteração voltam 304 com `@conditional`.
+Dados gravados sem incrementar a versão (contadores de artigos) são cobertos
+por `window`: o ETag muda a cada janela, o que limita a defasagem.
+
+Como os contadores do painel, a versão tem `COLLECTION_VERSION_SHARDS` linhas
+por coleção, somadas na leitura, e cada escrita incrementa uma delas.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import random
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import KnowledgeArticle, Ticket, collection_versions
+
+TICKETS = "tickets"
+KNOWLEDGE = "knowledge"
+
+# Parâmetros acrescentados à assinatura da rota para o FastAPI injetar
+_REQUEST_PARAM = "etag_request"
+_RESPONSE_PARAM = "etag_response"
+
+_tracked = {}
+
+
+def make_etag(*parts, weak: bool = False) -> str:
+    """ETag opaco a partir de valores serializáveis em JSON (datas em ISO)."""
+    raw = json.dumps(parts, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+    tag = f'"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+    return f"W/{tag}" if weak else tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca do `If-None-Match` (RFC 9110), como exigido para GET."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+async def collection_version(db: AsyncSession, name: str) -> int:
+    result = await db.execute(
+        select(func.coalesce(func.sum(collection_versions.c.version), 0))
+        .where(collection_versions.c.name == name)
+    )
+    return result.scalar_one()
+
+
+def bump_versions(session: Session, names: Iterable[str]) -> None:
+    """Incrementa a versão das coleções, na transação corrente da sessão."""
+    names = sorted(set(names))
+    if not names:
+        return
+    connection = session.connection()
+    upsert = (postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert)(collection_versions)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["name", "shard"],
+        set_={"version": collection_versions.c.version + 1},
+    )
+    connection.execute(upsert, [
+        {"name": name, "shard": random.randrange(settings.COLLECTION_VERSION_SHARDS), "version": 1}
+        for name in names
+    ])
+
+
+def version_on(model, name: str) -> None:
+    """Incrementa a versão de `name` quando instâncias de `model` são gravadas pelo ORM."""
+    _tracked[model] = name
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_after_flush(session: Session, flush_context) -> None:
+    names = {
+        _tracked[type(instance)]
+        for instances in (session.new, session.dirty, session.deleted)
+        for instance in instances
+        if type(instance) in _tracked and (instances is not session.dirty or session.is_modified(instance))
+    }
+    bump_versions(session, names)
+
+
+def conditional(collection: str, principal: Optional[str] = None, db: str = "db", window: Optional[float] = None):
+    """Decorador de listagens GET: ETag pela versão de `collection` e 304 se não mudou.
+
+    Use abaixo de `@router.get` e acima de `@cached`. `principal` é o nome do
+    parâmetro com o usuário autenticado, para listagens que dependem dele; `db`,
+    o da sessão do banco. `window`, em segundos, renova o ETag a cada janela
+    mesmo sem nova versão. A versão é lida antes do corpo: uma escrita
+    concorrente só pode deixar o ETag mais antigo que o corpo, nunca o contrário.
+    """
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+        # O FastAPI injeta um único `Request` e um único `Response` por rota:
+        # reaproveita os da rota (ou de `@cached`) e só acrescenta os que faltam
+        existing = {param.annotation: name for name, param in signature.parameters.items()}
+        injected = {
+            annotation: name
+            for annotation, name in ((Request, _REQUEST_PARAM), (Response, _RESPONSE_PARAM))
+            if annotation not in existing
+        }
+        names = {**existing, **injected}
+
+        def take(kwargs, annotation):
+            name = names[annotation]
+            return kwargs.pop(name) if annotation in injected else kwargs[name]
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = take(kwargs, Request)
+            response: Response = take(kwargs, Response)
+            identity = getattr(kwargs.get(principal), "id", None) if principal else None
+
+            version = await collection_version(kwargs[db], collection)
+            query = sorted(request.query_params.multi_items())
+            if window:
+                version = (version, int(time.time() // window))
+            etag = make_etag(request.url.path, query, identity, collection, version)
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return not_modified(etag)
+
+            # O cache de respostas usa o ETag na chave: corpo e ETag da mesma versão
+            request.state.etag = etag
+            result = await endpoint(*args, **kwargs)
+            (result if isinstance(result, Response) else response).headers["ETag"] = etag
+            return result
+
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            *(inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=annotation)
+              for annotation, name in injected.items()),
+        ])
+        return wrapper
+
+    return decorator
+
+
+version_on(Ticket, TICKETS)
+version_on(KnowledgeArticle, KNOWLEDGE)
@@ -0,0 +1,168 @@
+"""Exportação em streaming de tickets com suas mensagens (NDJSON ou CSV).
+
+Uma única consulta (tickets LEFT JOIN mensagens, ordenada por ticket) é lida
+com cursor no servidor (`stream` + `yield_per`): o banco entrega
+`EXPORT_BATCH_SIZE` linhas por vez e as linhas consecutivas do mesmo ticket são
+agrupadas. A memória usada não depende do tamanho da tabela, só do maior
+ticket (NDJSON) ou do lote (CSV).
+
+O texto gerado é agrupado em blocos de `EXPORT_CHUNK_SIZE` bytes e, se o
+cliente aceitar, comprimido com gzip à medida que é produzido.
+"""
+import csv
+import enum
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable, List, Optional
+
+from sqlalchemy import Select, select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import Message, Ticket, TicketStatus
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+TICKET_COLUMNS = [
+    Ticket.id, Ticket.title, Ticket.description, Ticket.status, Ticket.priority, Ticket.category,
+    Ticket.customer_id, Ticket.assigned_to, Ticket.created_at, Ticket.updated_at,
+    Ticket.resolved_at, Ticket.closed_at,
+]
+MESSAGE_COLUMNS = [Message.id, Message.sender_id, Message.is_internal, Message.content, Message.created_at]
+
+TICKET_FIELDS = [column.key for column in TICKET_COLUMNS]
+MESSAGE_FIELDS = [column.key for column in MESSAGE_COLUMNS]
+CSV_HEADER = [f"ticket_{name}" for name in TICKET_FIELDS] + [f"message_{name}" for name in MESSAGE_FIELDS]
+
+
+def _utc_naive(moment: Optional[datetime]) -> Optional[datetime]:
+    # created_at é gravado em UTC sem fuso
+    if moment is not None and moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def export_query(
+    statuses: Optional[List[TicketStatus]] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> Select:
+    """Tickets do filtro unidos às mensagens, em ordem de ticket e de mensagem."""
+    query = (
+        select(*TICKET_COLUMNS, *(column.label(f"message_{column.key}") for column in MESSAGE_COLUMNS))
+        .outerjoin(Message, Message.ticket_id == Ticket.id)
+        .order_by(Ticket.id, Message.created_at, Message.id)
+    )
+    if statuses:
+        query = query.where(Ticket.status.in_(statuses))
+    if created_from is not None:
+        query = query.where(Ticket.created_at >= _utc_naive(created_from))
+    if created_to is not None:
+        query = query.where(Ticket.created_at < _utc_naive(created_to))
+    return query
+
+
+def _plain(value):
+    """Valor de coluna como tipo JSON/CSV (enums pelo valor, datas em ISO 8601)."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _split(row) -> tuple:
+    values = [_plain(value) for value in row]
+    return values[:len(TICKET_FIELDS)], values[len(TICKET_FIELDS):]
+
+
+async def _rows(query: Select) -> AsyncIterator:
+    # Sessão própria: a da dependência já foi fechada quando o corpo é enviado
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            for row in partition:
+                yield row
+
+
+async def ndjson_lines(query: Select) -> AsyncIterator[str]:
+    """Uma linha JSON por ticket, com a lista `messages`."""
+    current = None
+    async for row in _rows(query):
+        ticket, message = _split(row)
+        if current is None or current["id"] != ticket[0]:
+            if current is not None:
+                yield json.dumps(current, ensure_ascii=False) + "\n"
+            current = dict(zip(TICKET_FIELDS, ticket))
+            current["messages"] = []
+        if message[0] is not None:
+            current["messages"].append(dict(zip(MESSAGE_FIELDS, message)))
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False) + "\n"
+
+
+async def csv_lines(query: Select) -> AsyncIterator[str]:
+    """Uma linha por mensagem (colunas do ticket repetidas); ticket sem mensagens ocupa uma linha."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values: Iterable) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield line(CSV_HEADER)
+    async for row in _rows(query):
+        ticket, message = _split(row)
+        yield line(ticket + message)
+
+
+async def encode_chunks(
+    lines: AsyncIterator[str],
+    compress: bool = False,
+    chunk_size: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Agrupa as linhas em blocos de `chunk_size` bytes, comprimidos com gzip se `compress`."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    # wbits=31: formato gzip (cabeçalho e CRC), não deflate puro
+    compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    pending: List[bytes] = []
+    size = 0
+    async for text in lines:
+        data = text.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            block = b"".join(pending)
+            pending, size = [], 0
+            if compressor is not None:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    block = b"".join(pending)
+    if compressor is not None:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Se o header `Accept-Encoding` aceita gzip (ignora `gzip;q=0`)."""
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -0,0 +1,63 @@
+"""Sincronização incremental de mensagens (tickets e chats) com long-poll.
+
+O cliente informa a última mensagem que já tem (`after_id` ou `since`) e recebe
+só as novas. Com `wait > 0`, se não houver nada novo a requisição fica aberta
+até chegar um evento `message.created` no canal do broker ou o tempo acabar.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Message
+from app.services.broker import broker
+
+MAX_WAIT_SECONDS = 30
+
+
+def messages_after(
+    query: Select,
+    after_id: Optional[int],
+    since: Optional[datetime],
+    limit: Optional[int] = None,
+) -> Select:
+    """Restringe a consulta às mensagens posteriores a `after_id` e/ou `since`."""
+    if after_id is not None:
+        query = query.where(Message.id > after_id)
+    if since is not None:
+        # created_at é gravado em UTC sem fuso
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.where(Message.created_at > since)
+    return query.order_by(Message.created_at.asc(), Message.id.asc()).limit(limit)
+
+
+async def wait_for_messages(
+    db: AsyncSession,
+    query: Select,
+    channel: str,
+    wait: float,
+) -> List[Message]:
+    """Executa `query`; se vier vazia, aguarda novas mensagens por até `wait` segundos."""
+    messages = (await db.execute(query)).scalars().all()
+    if messages or wait <= 0:
+        return messages
+
+    deadline = time.monotonic() + min(wait, MAX_WAIT_SECONDS)
+    async with broker.subscribe(channel) as subscription:
+        while True:
+            # Consulta de novo já assinado: nada criado antes da assinatura se perde
+            messages = (await db.execute(query)).scalars().all()
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages
+
+            # Devolve a conexão ao pool enquanto a requisição está parada
+            await db.close()
+            try:
+                await asyncio.wait_for(anext(subscription), timeout=remaining)
+            except asyncio.TimeoutError:
+                return []
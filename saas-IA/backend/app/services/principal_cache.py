@@ -0,0 +1,188 @@
+"""Cache dos usuários autenticados (principal) resolvidos a partir do JWT.
+
+Evita um SELECT em `users` por requisição autenticada. Guarda um snapshot
+imutável e desacoplado da sessão do banco, com TTL e limite de tamanho (LRU).
+Alterações em `User` feitas pelo ORM invalidam a entrada dentro do commit da
+`AsyncSession`, antes de ele retornar.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from app.core.config import settings
+from app.models.models import User
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Snapshot somente leitura do usuário autenticado."""
+    id: int
+    email: str
+    full_name: str
+    role: str
+    is_active: bool
+    avatar_url: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        role = user.role.value if hasattr(user.role, "value") else user.role
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            role=role,
+            is_active=bool(user.is_active),
+            avatar_url=user.avatar_url,
+        )
+
+
+class InMemoryPrincipalBackend:
+    """LRU com TTL em memória (por worker)."""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisPrincipalBackend:
+    """Backend compartilhado entre workers via Redis (expiração nativa)."""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "principal:"):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+        self._client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: dict, ttl: float) -> None:
+        await self._client.set(self.prefix + key, json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+
+class PrincipalCache:
+    """Cache de principals por subject do token, com contadores de acerto."""
+
+    def __init__(self, backend, ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, subject: str) -> Optional[UserPrincipal]:
+        value = await self.backend.get(subject)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return UserPrincipal(**value)
+
+    async def set(self, principal: UserPrincipal) -> None:
+        await self.backend.set(principal.email, asdict(principal), self.ttl)
+
+    async def invalidate(self, subject: str) -> None:
+        await self.backend.delete(subject)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def create_principal_cache(backend: Optional[str] = None) -> PrincipalCache:
+    """Cria o cache configurado em `settings.PRINCIPAL_CACHE_BACKEND`."""
+    backend = backend or settings.PRINCIPAL_CACHE_BACKEND
+    if backend == "redis":
+        store = RedisPrincipalBackend(settings.REDIS_URL)
+    elif backend == "memory":
+        store = InMemoryPrincipalBackend(settings.PRINCIPAL_CACHE_MAX_SIZE)
+    else:
+        raise ValueError(f"Backend de cache desconhecido: {backend}")
+    return PrincipalCache(store, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+principal_cache = create_principal_cache()
+
+
+# ===== Invalidação =====
+# Usuários alterados/removidos são anotados na sessão e invalidados após gravar,
+# antes de o commit retornar: a próxima requisição (de qualquer worker, com o
+# Redis) já lê o usuário do banco, ex.: um usuário desativado é recusado.
+
+_PENDING_KEY = "principal_cache_invalidations"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_changed(mapper, connection, target: User) -> None:
+    session = Session.object_session(target)
+    if session is None:
+        return
+    emails = session.info.setdefault(_PENDING_KEY, set())
+    emails.add(target.email)
+    # Email alterado: invalidar também o subject antigo
+    emails.update(email for email in inspect(target).attrs.email.history.deleted if email)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    emails = session.info.pop(_PENDING_KEY, None)
+    if not emails:
+        return
+    if not in_greenlet():
+        # Sessão síncrona (scripts): o TTL limita a defasagem
+        return
+    # Commit de AsyncSession: roda num greenlet, então dá para aguardar aqui
+    for email in emails:
+        try:
+            await_only(principal_cache.invalidate(email))
+        except Exception:
+            # Os dados já foram gravados: não transformar a escrita em erro
+            logger.warning("Falha ao invalidar o cache do usuário %s", email, exc_info=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
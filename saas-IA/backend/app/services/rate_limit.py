@@ -0,0 +1,158 @@
+"""Limite de taxa (token bucket) para login, registro e rotas de escrita.
+
+Cada limite é configurado em `settings.RATE_LIMITS` como `"<requisições>/<período>"`
+(`second`, `minute` ou `hour`): o balde comporta esse número de requisições e
+é reabastecido continuamente ao longo do período, então rajadas até o limite
+passam e o ritmo sustentado fica limitado à média. Sem fichas, a requisição
+é recusada com 429 e `Retry-After` com os segundos até a próxima ficha.
+
+Backends:
+- `memory`: dicionário por worker (LRU limitado a `RATE_LIMIT_MAX_KEYS`
+  chaves); com N workers o limite efetivo é até N vezes maior;
+- `redis`: balde compartilhado em `REDIS_URL`, atualizado atomicamente por um
+  script Lua (uma ida e volta por requisição, relógio do próprio Redis).
+
+Se o Redis estiver indisponível a requisição é aceita: o limitador não deve
+derrubar o login. Cada aceite sem verificação gera um aviso no log e conta em
+`rate_limit_fail_open_total`, para alertar enquanto os limites estão desligados. A dependência das rotas é `app.api.deps.rate_limit`.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_FAIL_OPEN, RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0}
+
+
+class RateLimit(NamedTuple):
+    capacity: int
+    period: float  # segundos para reabastecer o balde inteiro
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(spec: str) -> RateLimit:
+    """Converte `"10/minute"` em `RateLimit(10, 60.0)`."""
+    count, _, period = spec.partition("/")
+    try:
+        limit = RateLimit(int(count), PERIODS[period.strip()])
+    except (KeyError, ValueError):
+        raise ValueError(f"Limite de taxa inválido: {spec!r} (use '<n>/second|minute|hour')")
+    if limit.capacity < 1:
+        raise ValueError(f"Limite de taxa inválido: {spec!r}")
+    return limit
+
+
+class InMemoryRateLimitBackend:
+    """Baldes em memória (por worker): `{chave: (fichas, instante)}` com LRU."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+        tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / limit.refill_rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # Chave descartada equivale a balde cheio: na dúvida, a favor do cliente
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# KEYS[1]: balde; ARGV: capacidade, fichas por segundo. Retorna a espera em ms (0: aceita).
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated_at, 0) * rate)
+local wait_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait_ms = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return wait_ms
+"""
+
+
+class RedisRateLimitBackend:
+    """Baldes compartilhados entre workers via Redis (script Lua atômico)."""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "ratelimit:"):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+        self._client = client
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+        self.prefix = prefix
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        wait_ms = await self._script(keys=[self.prefix + key], args=[limit.capacity, limit.refill_rate])
+        return int(wait_ms) / 1000
+
+
+class RateLimiter:
+    """Aplica limites por chave sobre um backend de baldes."""
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    async def hit(self, name: str, identity: str, limit: RateLimit) -> float:
+        """Consome uma ficha de `name` para `identity`; retorna os segundos de espera (0: aceita)."""
+        if not self.enabled:
+            return 0.0
+        try:
+            retry_after = await self.backend.acquire(f"{name}:{identity}", limit)
+        except Exception:
+            RATE_LIMIT_FAIL_OPEN.labels(limit=name).inc()
+            logger.warning("Limitador de taxa indisponível; requisição %s aceita sem limite", name, exc_info=True)
+            return 0.0
+        if retry_after:
+            RATE_LIMITED.labels(limit=name).inc()
+        return retry_after
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def create_rate_limiter(backend: Optional[str] = None) -> RateLimiter:
+    """Cria o limitador configurado em `settings.RATE_LIMIT_BACKEND`."""
+    backend = backend or settings.RATE_LIMIT_BACKEND
+    if backend == "redis":
+        store = RedisRateLimitBackend(settings.REDIS_URL)
+    elif backend == "memory":
+        store = InMemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    else:
+        raise ValueError(f"Backend de limite de taxa desconhecido: {backend}")
+    return RateLimiter(store, enabled=settings.RATE_LIMIT_ENABLED)
+
+
+rate_limiter = create_rate_limiter()
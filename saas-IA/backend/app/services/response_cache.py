@@ -0,0 +1,262 @@
+"""Cache de respostas de rotas GET, com invalidação por tag.
+
+`@cached("knowledge")` guarda o corpo JSON já serializado da rota, com chave
+derivada do caminho, da query string (em ordem canônica) e, se indicado, do
+usuário autenticado. Acertos devolvem os bytes sem tocar no banco nem validar
+o `response_model` de novo.
+
+Invalidação por tag: cada tag tem um número de versão que entra na chave.
+Invalidar a tag incrementa a versão; as entradas antigas deixam de ser
+encontradas e expiram pelo TTL/LRU, sem varrer chaves. Alterações pelo ORM nos
+modelos registrados com `invalidate_on` invalidam as tags dentro do commit da
+`AsyncSession`, antes de ele retornar; escritas em lote fora do ORM chamam
+`response_cache.invalidate` diretamente.
+
+Faltas simultâneas da mesma chave passam pelo single-flight: só uma executa a
+rota e grava o cache, as demais recebem o mesmo corpo.
+
+Backends: `memory` (LRU por worker) ou `redis` (compartilhado, `REDIS_URL`).
+Acertos e faltas por rota vão para `response_cache_requests_total`.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from sqlalchemy import event, inspect as inspect_instance
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+from app.core.config import settings
+from app.core.metrics import RESPONSE_CACHE_REQUESTS
+from app.models.models import KnowledgeArticle
+from app.services.single_flight import record, serialize_response, single_flight
+
+logger = logging.getLogger(__name__)
+
+CACHE_HEADER = "X-Cache"
+
+# Parâmetro acrescentado à assinatura da rota para o FastAPI injetar a requisição
+_REQUEST_PARAM = "response_cache_request"
+
+
+class InMemoryResponseBackend:
+    """Respostas em LRU com TTL e versões de tag em memória (por worker)."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    async def set(self, key: str, body: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def tag_versions(self, tags: Iterable[str]) -> List[int]:
+        return [self._versions.get(tag, 0) for tag in tags]
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisResponseBackend:
+    """Respostas e versões de tag compartilhadas entre workers via Redis."""
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = "response:"):
+        if client is None:
+            import redis.asyncio as redis
+
+            client = redis.from_url(url or settings.REDIS_URL)
+        self._client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, body: bytes, ttl: float) -> None:
+        await self._client.set(self.prefix + key, body, px=int(ttl * 1000))
+
+    async def tag_versions(self, tags: Iterable[str]) -> List[int]:
+        tags = list(tags)
+        if not tags:
+            return []
+        values = await self._client.mget([f"{self.prefix}tag:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def bump(self, tags: Iterable[str]) -> None:
+        async with self._client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{self.prefix}tag:{tag}")
+            await pipe.execute()
+
+
+class ResponseCache:
+    """Chaves versionadas por tag sobre um backend de respostas."""
+
+    def __init__(self, backend, ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def key(self, request: Request, tags: Iterable[str], identity=None) -> str:
+        tags = sorted(tags)
+        versions = await self.backend.tag_versions(tags)
+        query = urlencode(sorted(request.query_params.multi_items()))
+        # Com @conditional, o ETag (versão da coleção no banco) também entra na chave
+        etag = getattr(request.state, "etag", None)
+        raw = json.dumps([request.url.path, query, identity, list(zip(tags, versions)), etag])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.backend.get(key)
+
+    async def set(self, key: str, body: bytes, ttl: Optional[float] = None) -> None:
+        await self.backend.set(key, body, self.ttl if ttl is None else ttl)
+
+    async def invalidate(self, *tags: str) -> None:
+        """Descarta todas as respostas guardadas com alguma das tags."""
+        if tags:
+            await self.backend.bump(tags)
+
+
+def create_response_cache(backend: Optional[str] = None) -> ResponseCache:
+    """Cria o cache configurado em `settings.RESPONSE_CACHE_BACKEND`."""
+    backend = backend or settings.RESPONSE_CACHE_BACKEND
+    if backend == "redis":
+        store = RedisResponseBackend(settings.REDIS_URL)
+    elif backend == "memory":
+        store = InMemoryResponseBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+    else:
+        raise ValueError(f"Backend de cache desconhecido: {backend}")
+    return ResponseCache(store, ttl=settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+response_cache = create_response_cache()
+
+
+def cached(*tags: str, ttl: Optional[float] = None, principal: Optional[str] = None):
+    """Decorador de rotas GET que guarda a resposta JSON sob as `tags`.
+
+    Use abaixo de `@router.get`. `principal` é o nome do parâmetro da rota com
+    o usuário autenticado: a chave passa a incluir o seu `id`. Dependências da
+    rota (autenticação, orçamento de consultas) continuam rodando nos acertos.
+    """
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            route = getattr(request.scope.get("route"), "path", request.url.path)
+            identity = getattr(kwargs.get(principal), "id", None) if principal else None
+
+            key = await response_cache.key(request, tags, identity)
+            body = await response_cache.get(key)
+            if body is not None:
+                RESPONSE_CACHE_REQUESTS.labels(route=route, result="hit").inc()
+                return Response(body, media_type="application/json", headers={CACHE_HEADER: "HIT"})
+
+            RESPONSE_CACHE_REQUESTS.labels(route=route, result="miss").inc()
+
+            async def produce():
+                result = await endpoint(*args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+                body = serialize_response(request, result)
+                await response_cache.set(key, body, ttl)
+                return body
+
+            body, shared = await single_flight.do(key, produce)
+            record(request, shared)
+            if isinstance(body, Response):
+                return body
+            return Response(body, media_type="application/json", headers={CACHE_HEADER: "MISS"})
+
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+        return wrapper
+
+    return decorator
+
+
+# ===== Invalidação =====
+# Modelos alterados são anotados na sessão e suas tags invalidadas após gravar,
+# antes de o commit retornar: a resposta da escrita só sai com o cache já
+# invalidado, e uma leitura concorrente que começou antes grava sob a versão
+# antiga da tag, onde ninguém mais procura.
+
+_PENDING_KEY = "response_cache_invalidations"
+
+
+def invalidate_on(model, *tags: str, ignore: Iterable[str] = ()) -> None:
+    """Invalida `tags` quando instâncias de `model` são criadas, alteradas ou apagadas.
+
+    Alterações que só mexem nos atributos de `ignore` (ex.: contadores) não invalidam.
+    """
+    ignore = set(ignore)
+
+    def mark(session: Optional[Session]) -> None:
+        if session is not None:
+            session.info.setdefault(_PENDING_KEY, set()).update(tags)
+
+    @event.listens_for(model, "after_insert")
+    @event.listens_for(model, "after_delete")
+    def _changed(mapper, connection, target) -> None:
+        mark(Session.object_session(target))
+
+    @event.listens_for(model, "after_update")
+    def _updated(mapper, connection, target) -> None:
+        state = inspect_instance(target)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        if changed - ignore:
+            mark(Session.object_session(target))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    tags = session.info.pop(_PENDING_KEY, None)
+    if not tags:
+        return
+    if not in_greenlet():
+        # Sessão síncrona (scripts): o TTL limita a defasagem
+        return
+    # Commit de AsyncSession: roda num greenlet, então dá para aguardar aqui
+    try:
+        await_only(response_cache.invalidate(*tags))
+    except Exception:
+        # Os dados já foram gravados: não transformar a escrita em erro
+        logger.warning("Falha ao invalidar o cache de respostas (%s)", ", ".join(sorted(tags)), exc_info=True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+invalidate_on(KnowledgeArticle, "knowledge", ignore=("view_count", "helpful_count"))
@@ -0,0 +1,177 @@
+"""Busca textual ranqueada na base de conhecimento.
+
+PostgreSQL: coluna gerada `search_vector` (tsvector em português, sem acentos)
+com índice GIN, ordenada por `ts_rank_cd`. SQLite: tabela virtual FTS5 mantida
+por triggers, ordenada por BM25. Em ambos, o índice é atualizado pelo próprio
+banco a cada insert/update/delete de `KnowledgeArticle`.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import column, func, literal_column, or_, select, table
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import KnowledgeArticle
+from app.services.tags import filter_by_tags
+
+PG_TS_CONFIG = "pt_unaccent"
+FTS_TABLE = "knowledge_articles_fts"
+SEARCH_VECTOR_COLUMN = "search_vector"
+SEARCH_INDEX = "ix_knowledge_articles_search_vector"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+_PG_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{PG_TS_CONFIG}') THEN
+            CREATE TEXT SEARCH CONFIGURATION {PG_TS_CONFIG} (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION {PG_TS_CONFIG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END
+    $$
+    """,
+    f"""
+    ALTER TABLE knowledge_articles ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(tags, '')), 'B') ||
+            setweight(to_tsvector('{PG_TS_CONFIG}', coalesce(content, '')), 'C')
+        ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} "
+    f"ON knowledge_articles USING GIN ({SEARCH_VECTOR_COLUMN})",
+]
+
+# Tabela FTS5 com conteúdo externo: guarda só o índice, os textos ficam na tabela original
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, tags,
+        content='knowledge_articles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS knowledge_articles_fts_ai AFTER INSERT ON knowledge_articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS knowledge_articles_fts_ad AFTER DELETE ON knowledge_articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS knowledge_articles_fts_au AFTER UPDATE OF title, content, tags
+    ON knowledge_articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, title, content, tags)
+        VALUES (new.id, new.title, new.content, new.tags);
+    END
+    """,
+]
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+
+def ensure_search_index(connection: Connection) -> None:
+    """Cria (de forma idempotente) as estruturas de busca do dialeto atual."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in _PG_DDL:
+            connection.exec_driver_sql(statement)
+    elif dialect == "sqlite":
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first()
+        for statement in _SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            # Indexar artigos já existentes
+            connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts5_query(term: str) -> Optional[str]:
+    """Converte o texto do usuário em consulta FTS5 segura (AND com prefixo no último termo)."""
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+    quoted = [f'"{word}"' for word in words]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+async def search_articles(
+    db: AsyncSession,
+    term: str,
+    published_only: bool = True,
+    category: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    tags: Optional[List[str]] = None,
+    match_all_tags: bool = True,
+) -> List[Tuple[KnowledgeArticle, float, Optional[str]]]:
+    """Busca artigos por relevância; retorna `(artigo, score, trecho destacado)`.
+
+    Quanto maior o score, mais relevante o artigo.
+    """
+    dialect = db.bind.dialect.name
+    
+    if dialect == "postgresql":
+        search_vector = literal_column(f"knowledge_articles.{SEARCH_VECTOR_COLUMN}")
+        ts_query = func.websearch_to_tsquery(literal_column(f"'{PG_TS_CONFIG}'::regconfig"), term)
+        score = func.ts_rank_cd(search_vector, ts_query)
+        snippet = func.ts_headline(
+            literal_column(f"'{PG_TS_CONFIG}'::regconfig"),
+            KnowledgeArticle.content,
+            ts_query,
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=35, MinWords=15",
+        )
+        query = select(KnowledgeArticle, score, snippet).where(search_vector.op("@@")(ts_query))
+        order = score.desc()
+    elif dialect == "sqlite":
+        match = _fts5_query(term)
+        if match is None:
+            return []
+        fts = literal_column(FTS_TABLE)
+        # bm25 é menor quanto mais relevante; pesos: título, conteúdo, tags
+        rank = func.bm25(fts, 10.0, 1.0, 5.0)
+        score = -rank
+        snippet = func.snippet(fts, 1, HIGHLIGHT_START, HIGHLIGHT_STOP, "…", 24)
+        query = (
+            select(KnowledgeArticle, score, snippet)
+            .join(_fts, _fts.c.rowid == KnowledgeArticle.id)
+            .where(fts.op("MATCH")(match))
+        )
+        order = rank.asc()
+    else:
+        # Sem índice textual: busca por substring, ordenada por popularidade
+        search_term = f"%{term}%"
+        query = select(KnowledgeArticle, literal_column("0.0"), literal_column("NULL")).where(
+            or_(
+                KnowledgeArticle.title.ilike(search_term),
+                KnowledgeArticle.content.ilike(search_term),
+                KnowledgeArticle.tags.ilike(search_term),
+            )
+        )
+        order = KnowledgeArticle.view_count.desc()
+    
+    if published_only:
+        query = query.where(KnowledgeArticle.is_published == True)
+    if category:
+        query = query.where(KnowledgeArticle.category == category)
+    if tags:
+        query = filter_by_tags(query, tags, match_all=match_all_tags)
+    
+    result = await db.execute(
+        query.order_by(order, KnowledgeArticle.id).offset(skip).limit(limit)
+    )
+    return [(article, float(score or 0.0), snippet) for article, score, snippet in result.all()]
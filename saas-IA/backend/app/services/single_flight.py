@@ -0,0 +1,133 @@
+"""Single-flight: leituras idênticas simultâneas compartilham uma única execução.
+
+Em picos, centenas de requisições iguais (ex.: `GET /knowledge/categories/list`)
+chegam antes de a primeira terminar e repetiriam a mesma consulta. Com
+`single_flight.do(key, fn)` a primeira chamada de uma chave executa `fn`
+(`leader`) e as que chegam enquanto ela está em andamento aguardam o mesmo
+resultado (`coalesced`), inclusive exceções. Nada é guardado depois: a chave
+some quando a execução termina. Para reaproveitar entre requisições, use
+`@cached`, que já agrupa suas faltas por aqui.
+
+`@coalesced()` aplica isso a rotas GET: a chave é o caminho, a query string e,
+se indicado, o usuário; o corpo JSON é serializado uma vez e entregue a todos.
+Escopo por worker; contagens em `single_flight_requests_total`.
+"""
+import asyncio
+import functools
+import inspect
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.metrics import SINGLE_FLIGHT_REQUESTS
+
+# Parâmetro acrescentado à assinatura da rota para o FastAPI injetar a requisição
+_REQUEST_PARAM = "single_flight_request"
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+class SingleFlight:
+    """Execuções em andamento por chave, compartilhadas entre chamadas concorrentes."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Executa `fn` ou aguarda a execução em andamento da mesma chave.
+
+        Retorna `(resultado, compartilhado)`. Se a execução líder for cancelada
+        (cliente desconectou), quem aguardava tenta de novo em vez de falhar.
+        """
+        if not self.enabled:
+            return await fn(), False
+
+        while key in self._calls:
+            call = self._calls[key]
+            try:
+                # shield: cancelar quem aguarda não cancela a execução compartilhada
+                return await asyncio.shield(call), True
+            except asyncio.CancelledError:
+                if not call.cancelled():
+                    raise
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as exc:
+            call.set_exception(exc)
+            # Marca a exceção como lida: sem ninguém aguardando, o asyncio a registraria no log
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+single_flight = SingleFlight(enabled=settings.SINGLE_FLIGHT_ENABLED)
+
+
+def serialize_response(request: Request, result) -> bytes:
+    """Serializa `result` como o FastAPI faria, pelo `response_model` da rota."""
+    model = getattr(request.scope.get("route"), "response_model", None)
+    if model is None:
+        return json.dumps(jsonable_encoder(result), ensure_ascii=False).encode()
+    adapter = _adapters.get(model)
+    if adapter is None:
+        adapter = _adapters[model] = TypeAdapter(model)
+    return adapter.dump_json(adapter.validate_python(result, from_attributes=True), by_alias=True)
+
+
+def record(request: Request, shared: bool) -> None:
+    route = getattr(request.scope.get("route"), "path", request.url.path)
+    SINGLE_FLIGHT_REQUESTS.labels(route=route, result="coalesced" if shared else "leader").inc()
+
+
+def coalesced(principal: Optional[str] = None):
+    """Decorador de rotas GET que agrupa requisições idênticas simultâneas.
+
+    Use abaixo de `@router.get` (e de `@conditional`). `principal` é o nome do
+    parâmetro com o usuário autenticado, para rotas cuja resposta depende dele.
+    Dependências da rota continuam rodando em todas as requisições.
+    """
+
+    def decorator(endpoint):
+        signature = inspect.signature(endpoint)
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            identity = getattr(kwargs.get(principal), "id", None) if principal else None
+            key = (request.url.path, tuple(sorted(request.query_params.multi_items())), identity)
+
+            async def produce():
+                result = await endpoint(*args, **kwargs)
+                return result if isinstance(result, Response) else serialize_response(request, result)
+
+            body, shared = await single_flight.do(key, produce)
+            record(request, shared)
+            if isinstance(body, Response):
+                return body
+            return Response(body, media_type="application/json")
+
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+        return wrapper
+
+    return decorator
@@ -0,0 +1,339 @@
+"""Prazos de SLA dos tickets e agendador de violações em memória.
+
+Cada ticket novo ganha uma linha em `ticket_slas` com os prazos de primeira
+resposta e de resolução da sua prioridade (`SLA_*_MINUTES`). A coluna indexada
+`due_at` guarda o próximo prazo ainda pendente e é recalculada quando o ticket
+muda de prioridade ou status e quando um agente responde.
+
+O agendador mantém os prazos pendentes num heap: agendar custa O(log n) e a
+tarefa de fundo dorme até o prazo mais próximo, sem varrer a tabela de tickets.
+Na inicialização ele é recarregado de `due_at`, então prazos vencidos com o
+servidor parado disparam assim que ele volta.
+
+O banco é a fonte da verdade: ao vencer, o prazo só é registrado como violado
+se a linha ainda tiver o mesmo `due_at` (com a linha travada). Entradas
+desatualizadas (prazo alterado em outro worker) e disparos repetidos por vários
+workers não registram nada e são reagendadas para o `due_at` do banco.
+
+Prazos recalculados fora da API (reavaliação do backlog em `scripts/triage.py`)
+chegam aos agendadores dos workers pelo broker (`announce_deadlines`).
+"""
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import SLA_BREACHES
+from app.db.session import AsyncSessionLocal
+from app.models.models import Ticket, TicketPriority, TicketSLA, TicketStatus
+from app.services.broker import BrokerError, broker, sla_channel, sla_schedule_channel
+
+logger = logging.getLogger(__name__)
+
+FIRST_RESPONSE = "first_response"
+RESOLUTION = "resolution"
+
+# Status em que o prazo de resolução deixa de correr
+FINISHED_STATUSES = {TicketStatus.RESOLVED, TicketStatus.CLOSED}
+
+
+def _status(ticket_status) -> TicketStatus:
+    return TicketStatus(getattr(ticket_status, "value", ticket_status))
+
+
+def sla_deadlines(priority, created_at: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Prazos (primeira resposta, resolução) de um ticket aberto em `created_at`."""
+    key = TicketPriority(getattr(priority, "value", priority)).value
+    first_response = settings.SLA_FIRST_RESPONSE_MINUTES.get(key)
+    resolution = settings.SLA_RESOLUTION_MINUTES.get(key)
+    return (
+        created_at + timedelta(minutes=first_response) if first_response else None,
+        created_at + timedelta(minutes=resolution) if resolution else None,
+    )
+
+
+def pending_deadlines(sla: TicketSLA, ticket_status) -> List[Tuple[str, datetime]]:
+    """Prazos ainda não cumpridos nem violados."""
+    if _status(ticket_status) in FINISHED_STATUSES:
+        return []
+    pending = []
+    if sla.first_response_due_at and sla.first_response_at is None and sla.first_response_breached_at is None:
+        pending.append((FIRST_RESPONSE, sla.first_response_due_at))
+    if sla.resolution_due_at and sla.resolution_breached_at is None:
+        pending.append((RESOLUTION, sla.resolution_due_at))
+    return pending
+
+
+def next_due(sla: TicketSLA, ticket_status) -> Optional[datetime]:
+    return min((due for _, due in pending_deadlines(sla, ticket_status)), default=None)
+
+
+async def start_sla(db: AsyncSession, ticket: Ticket) -> Optional[datetime]:
+    """Cria os prazos de um ticket recém-inserido (após o flush); retorna o próximo prazo.
+
+    Agende o retorno com `sla_scheduler.schedule` depois do commit.
+    """
+    first_response_due_at, resolution_due_at = sla_deadlines(ticket.priority, ticket.created_at)
+    sla = TicketSLA(
+        ticket_id=ticket.id,
+        first_response_due_at=first_response_due_at,
+        resolution_due_at=resolution_due_at,
+    )
+    sla.due_at = next_due(sla, ticket.status)
+    db.add(sla)
+    return sla.due_at
+
+
+async def update_sla(
+    db: AsyncSession,
+    ticket: Ticket,
+    priority_changed: bool = False,
+    responded: bool = False,
+) -> Optional[datetime]:
+    """Recalcula o próximo prazo após mudança de prioridade/status ou resposta de agente.
+
+    Com nova prioridade os prazos são refeitos a partir da abertura do ticket.
+    Tickets anteriores ao SLA (sem linha em `ticket_slas`) são ignorados.
+    Agende o retorno com `sla_scheduler.schedule` depois do commit.
+    """
+    sla = await db.get(TicketSLA, ticket.id)
+    if sla is None:
+        return None
+    if priority_changed:
+        sla.first_response_due_at, sla.resolution_due_at = sla_deadlines(ticket.priority, ticket.created_at)
+    if responded and sla.first_response_at is None:
+        sla.first_response_at = datetime.utcnow()
+    sla.due_at = next_due(sla, ticket.status)
+    return sla.due_at
+
+
+def reprioritize_slas(session: Session, ticket_ids: Iterable[int]) -> List[Tuple[int, Optional[datetime]]]:
+    """Em lote e com sessão síncrona (scripts), o mesmo que `update_sla(priority_changed=True)`.
+
+    Chame depois de gravar as novas prioridades e antes do commit. Retorna
+    `[(ticket_id, próximo prazo)]`; publique com `announce_deadlines` depois do commit.
+    """
+    rows = session.execute(
+        select(TicketSLA, Ticket.priority, Ticket.created_at, Ticket.status)
+        .join(Ticket, Ticket.id == TicketSLA.ticket_id)
+        .where(TicketSLA.ticket_id.in_(list(ticket_ids)))
+        .with_for_update(of=TicketSLA)
+    ).all()
+    rescheduled = []
+    for sla, priority, created_at, ticket_status in rows:
+        sla.first_response_due_at, sla.resolution_due_at = sla_deadlines(priority, created_at)
+        sla.due_at = next_due(sla, ticket_status)
+        rescheduled.append((sla.ticket_id, sla.due_at))
+    return rescheduled
+
+
+async def announce_deadlines(entries: List[Tuple[int, Optional[datetime]]], batch_size: int = 1000) -> None:
+    """Publica `[(ticket_id, próximo prazo)]` para os agendadores de todos os workers.
+
+    Só alcança outros processos com o broker do Redis (`CHAT_BROKER=redis`).
+    """
+    for start in range(0, len(entries), batch_size):
+        data = [
+            {"ticket_id": ticket_id, "due_at": due_at.isoformat() if due_at else None}
+            for ticket_id, due_at in entries[start:start + batch_size]
+        ]
+        await broker.publish(sla_schedule_channel(), {"event": "sla.rescheduled", "data": data})
+
+
+async def drop_sla(db: AsyncSession, ticket_id: int) -> None:
+    """Remove os prazos de um ticket que será apagado."""
+    await db.execute(delete(TicketSLA).where(TicketSLA.ticket_id == ticket_id))
+
+
+async def record_breaches(entries: List[Tuple[int, datetime]]) -> List[Tuple[int, Optional[datetime]]]:
+    """Registra como violados os prazos vencidos de `[(ticket_id, due_at)]`.
+
+    Só considera tickets cujo `due_at` ainda é o agendado. Publica um evento
+    `sla.breached` por prazo violado e retorna `[(ticket_id, próximo prazo)]`
+    para reagendar.
+    """
+    expected = dict(entries)
+    now = datetime.utcnow()
+    events = []
+    rescheduled = []
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(TicketSLA, Ticket.status, Ticket.priority)
+            .join(Ticket, Ticket.id == TicketSLA.ticket_id)
+            .where(TicketSLA.ticket_id.in_(list(expected)))
+            .with_for_update(of=TicketSLA)
+        )
+        for sla, ticket_status, priority in result.all():
+            if sla.due_at != expected[sla.ticket_id]:
+                # Prazo alterado ou já tratado por outro worker: segue o do banco
+                rescheduled.append((sla.ticket_id, sla.due_at))
+                continue
+            for kind, due in pending_deadlines(sla, ticket_status):
+                if due > now:
+                    continue
+                setattr(sla, f"{kind}_breached_at", now)
+                events.append({
+                    "ticket_id": sla.ticket_id,
+                    "kind": kind,
+                    "priority": priority.value,
+                    "due_at": due.isoformat(),
+                })
+            sla.due_at = next_due(sla, ticket_status)
+            rescheduled.append((sla.ticket_id, sla.due_at))
+        await db.commit()
+
+    for event in events:
+        SLA_BREACHES.labels(kind=event["kind"], priority=event["priority"]).inc()
+        logger.warning("SLA violado: ticket %(ticket_id)s, %(kind)s (prazo %(due_at)s)", event)
+        await broker.publish(sla_channel(), {"event": "sla.breached", "data": event})
+    return rescheduled
+
+
+class SLAScheduler:
+    """Heap de `(acordar_em, ticket_id, due_at)` com uma tarefa que dispara os vencidos.
+
+    `acordar_em` é o próprio prazo, ou o instante da nova tentativa quando o
+    registro da violação falhou; `due_at` é sempre o prazo gravado no banco,
+    que é o que `record_breaches` compara. Reagendar um ticket não remove a
+    entrada antiga do heap: `_due` guarda o prazo atual de cada ticket e
+    entradas que não batem são ignoradas ao sair do heap (remoção preguiçosa).
+    O heap é compactado quando as entradas descartadas passam a ser maioria.
+    """
+
+    # Espera antes de tentar de novo registrar violações que falharam
+    RETRY_SECONDS = 5.0
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, datetime]] = []
+        self._due: Dict[int, datetime] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def _push(self, wake_at: datetime, ticket_id: int, due_at: datetime) -> None:
+        heapq.heappush(self._heap, (wake_at, ticket_id, due_at))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [entry for entry in self._heap if self._due.get(entry[1]) == entry[2]]
+            heapq.heapify(self._heap)
+        # Novo instante mais próximo: acorda a tarefa para recalcular a espera
+        if self._wakeup is not None and self._heap[0] == (wake_at, ticket_id, due_at):
+            self._wakeup.set()
+
+    def schedule(self, ticket_id: int, due_at: Optional[datetime]) -> None:
+        """Agenda (ou substitui) o prazo do ticket; `None` cancela."""
+        if due_at is None:
+            self._due.pop(ticket_id, None)
+            return
+        if self._due.get(ticket_id) == due_at:
+            return
+        self._due[ticket_id] = due_at
+        self._push(due_at, ticket_id, due_at)
+
+    def retry(self, entries: List[Tuple[int, datetime]], wake_at: datetime) -> None:
+        """Devolve prazos retirados por `pop_due` para nova tentativa em `wake_at`.
+
+        O prazo continua o original; tickets reagendados nesse meio-tempo
+        ficam com o prazo novo.
+        """
+        for ticket_id, due_at in entries:
+            if self._due.setdefault(ticket_id, due_at) == due_at:
+                self._push(wake_at, ticket_id, due_at)
+
+    def pop_due(self, now: datetime) -> List[Tuple[int, datetime]]:
+        """Retira do heap os prazos vencidos até `now`: `[(ticket_id, due_at)]`."""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            _, ticket_id, due_at = heapq.heappop(self._heap)
+            if self._due.get(ticket_id) != due_at:
+                continue  # entrada substituída ou cancelada
+            del self._due[ticket_id]
+            expired.append((ticket_id, due_at))
+        return expired
+
+    def next_due(self) -> Optional[datetime]:
+        """Próximo instante em que a tarefa precisa acordar."""
+        return self._heap[0][0] if self._heap else None
+
+    async def load(self) -> int:
+        """Recarrega os prazos pendentes do banco (índice de `due_at`)."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(TicketSLA.ticket_id, TicketSLA.due_at).where(TicketSLA.due_at.isnot(None))
+            )
+            self._due = dict(result.all())
+        self._heap = [(due, ticket_id, due) for ticket_id, due in self._due.items()]
+        heapq.heapify(self._heap)
+        return len(self._due)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            upcoming = self.next_due()
+            timeout = None if upcoming is None else max((upcoming - datetime.utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            expired = self.pop_due(datetime.utcnow())
+            if not expired:
+                continue
+            try:
+                for ticket_id, due_at in await record_breaches(expired):
+                    self.schedule(ticket_id, due_at)
+            except Exception:
+                logger.exception("Falha ao registrar violações de SLA")
+                self.retry(expired, datetime.utcnow() + timedelta(seconds=self.RETRY_SECONDS))
+
+    async def _listen(self) -> None:
+        """Aplica os prazos publicados por `announce_deadlines`."""
+        while True:
+            try:
+                async with broker.subscribe(sla_schedule_channel()) as subscription:
+                    async for message in subscription:
+                        for item in message["data"]:
+                            due_at = item["due_at"] and datetime.fromisoformat(item["due_at"])
+                            self.schedule(item["ticket_id"], due_at)
+            except BrokerError:
+                logger.warning("Assinatura de prazos de SLA interrompida", exc_info=True)
+            await asyncio.sleep(self.RETRY_SECONDS)
+            # Anúncios feitos sem assinatura se perderam: o banco tem os prazos atuais
+            try:
+                await self.load()
+                self._wakeup.set()
+            except Exception:
+                logger.exception("Falha ao recarregar os prazos de SLA")
+
+    async def start(self) -> None:
+        """Carrega os prazos do banco e inicia as tarefas em segundo plano."""
+        if self._task is not None:
+            return
+        count = await self.load()
+        logger.info("Agendador de SLA iniciado com %d prazos", count)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        for task in (self._task, self._listener):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._listener = None
+        self._wakeup = None
+
+
+sla_scheduler = SLAScheduler()
@@ -0,0 +1,342 @@
+"""Sugestão de artigos para novos tickets (deflexão), sem chamadas de rede.
+
+Cada artigo publicado vira um vetor TF-IDF de n-gramas com hashing (palavras,
+pares de palavras e trigramas de caracteres, sem acentos) com
+`SUGGEST_DIMENSIONS` posições. Título e tags pesam mais que o conteúdo. A
+consulta é o texto do ticket vetorizado do mesmo jeito; o ranking é o cosseno,
+calculado com um único produto matriz-vetor do NumPy.
+
+Os vetores ficam em arquivos `.npy` em `SUGGEST_INDEX_DIR`, abertos com
+memory-map: todos os workers compartilham as mesmas páginas do sistema de
+arquivos. Criar, editar ou despublicar um artigo altera só a linha dele, sob
+um lock de arquivo. O IDF é recalculado por uma reconstrução completa, feita
+na inicialização e sempre que as alterações desde a última passam de
+`SUGGEST_REBUILD_RATIO` do índice. Reconstruções e crescimento gravam uma nova
+versão dos arquivos e trocam `meta.json` de forma atômica, então quem está
+lendo nunca vê um índice pela metade.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.models import KnowledgeArticle
+from app.services.text_features import hashed_counts
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos (use um único worker)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 3.0
+TAGS_WEIGHT = 2.0
+CONTENT_WEIGHT = 1.0
+
+
+def article_fields(title: str, tags: Optional[str], content: str) -> List[Tuple[str, float]]:
+    """Campos do artigo com seus pesos, no formato aceito por `SuggestionIndex`."""
+    return [(title, TITLE_WEIGHT), (tags or "", TAGS_WEIGHT), (content, CONTENT_WEIGHT)]
+
+
+class SuggestionIndex:
+    """Índice vetorial em disco (memory-mapped) dos artigos publicados."""
+
+    def __init__(self, directory: str, dimensions: int, rebuild_ratio: float = 0.2):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.rebuild_ratio = rebuild_ratio
+        # (meta, vetores, ids, idf) trocados juntos: leitores nunca misturam versões
+        self._state: Optional[Tuple[dict, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._meta_key: Optional[Tuple[int, int, int]] = None
+
+    # ----- arquivos -----
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _path(self, name: str, version: int) -> str:
+        return os.path.join(self.directory, f"{name}-{version}.npy")
+
+    @contextmanager
+    def _lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self._meta_path) as handle:
+                return json.load(handle)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, meta: dict) -> None:
+        temporary = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(meta, handle)
+        os.replace(temporary, self._meta_path)
+
+    def _refresh(self) -> Optional[Tuple[dict, np.ndarray, np.ndarray, np.ndarray]]:
+        """Estado atual do índice, reabrindo os arquivos se outro processo os alterou."""
+        try:
+            stat = os.stat(self._meta_path)
+        except FileNotFoundError:
+            self._state = None
+            return None
+        # os.replace cria um novo arquivo: inode, mtime e tamanho identificam a versão
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._meta_key and self._state is not None:
+            return self._state
+        meta = self._read_meta()
+        if meta is None or meta["dimensions"] != self.dimensions:
+            self._state = None
+            return None
+        state = self._state
+        if state is None or meta["version"] != state[0]["version"]:
+            version = meta["version"]
+            state = (
+                meta,
+                np.load(self._path("vectors", version), mmap_mode="r"),
+                np.load(self._path("ids", version), mmap_mode="r"),
+                np.load(self._path("idf", version)),
+            )
+        else:
+            state = (meta,) + state[1:]
+        self._state, self._meta_key = state, key
+        return state
+
+    def _publish(self, vectors: np.ndarray, ids: np.ndarray, idf: np.ndarray, meta: dict) -> None:
+        """Grava uma nova versão completa dos arquivos e aponta `meta.json` para ela."""
+        previous = self._read_meta()
+        version = (previous["version"] + 1) if previous else 1
+        for name, array in (("vectors", vectors), ("ids", ids), ("idf", idf)):
+            np.save(self._path(name, version), array)
+        self._write_meta({**meta, "version": version, "dimensions": self.dimensions})
+        # Quem ainda tem a versão anterior mapeada continua lendo o arquivo removido
+        if previous:
+            for name in ("vectors", "ids", "idf"):
+                try:
+                    os.remove(self._path(name, previous["version"]))
+                except FileNotFoundError:
+                    pass
+
+    # ----- vetorização -----
+
+    def _term_frequencies(self, fields: Iterable[Tuple[str, float]]) -> np.ndarray:
+        counts = np.zeros(self.dimensions, dtype=np.float32)
+        for index, weight in hashed_counts(fields, self.dimensions).items():
+            counts[index] = weight
+        # TF sublinear: repetir um termo muitas vezes não domina o vetor
+        return np.log1p(counts, out=counts)
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _embed(self, fields: Iterable[Tuple[str, float]], idf: np.ndarray) -> np.ndarray:
+        return self._normalize(self._term_frequencies(fields) * idf)
+
+    # ----- operações -----
+
+    def needs_rebuild(self) -> bool:
+        state = self._refresh()
+        if state is None:
+            return True
+        meta = state[0]
+        return meta["changes"] > max(10, self.rebuild_ratio * meta["built_count"])
+
+    def rebuild(self, documents: Iterable[Tuple[int, List[Tuple[str, float]]]]) -> int:
+        """Reconstrói o índice (e o IDF) a partir de `(article_id, campos)`."""
+        documents = list(documents)
+        frequencies = np.zeros((len(documents), self.dimensions), dtype=np.float32)
+        for row, (_, fields) in enumerate(documents):
+            frequencies[row] = self._term_frequencies(fields)
+
+        document_frequency = np.count_nonzero(frequencies, axis=0)
+        idf = (np.log((1 + len(documents)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        capacity = max(64, 1 << math.ceil(math.log2(max(len(documents), 1) * 1.25)))
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        ids = np.zeros(capacity, dtype=np.int64)
+        if documents:
+            weighted = frequencies * idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            vectors[: len(documents)] = weighted / np.where(norms == 0, 1, norms)
+            ids[: len(documents)] = [article_id for article_id, _ in documents]
+
+        with self._lock():
+            self._publish(vectors, ids, idf, {"changes": 0, "built_count": len(documents)})
+        self._refresh()
+        return len(documents)
+
+    def _writable(self, meta: dict) -> Tuple[np.ndarray, np.ndarray]:
+        version = meta["version"]
+        vectors = np.load(self._path("vectors", version), mmap_mode="r+")
+        ids = np.load(self._path("ids", version), mmap_mode="r+")
+        return vectors, ids
+
+    def upsert(self, article_id: int, fields: List[Tuple[str, float]]) -> None:
+        """Grava (ou substitui) o vetor de um artigo usando o IDF atual."""
+        self.upsert_many([(article_id, fields)])
+
+    def upsert_many(self, documents: Iterable[Tuple[int, List[Tuple[str, float]]]]) -> None:
+        """Grava (ou substitui) os vetores de `(article_id, campos)` com um só bloqueio e uma só gravação."""
+        documents = dict(documents)
+        if not documents:
+            return
+        with self._lock():
+            state = self._refresh()
+            if state is None:
+                return
+            meta, _, _, idf = state
+            changed = {**meta, "changes": meta["changes"] + len(documents)}
+            vectors, ids = self._writable(meta)
+            present = np.flatnonzero(np.isin(ids, list(documents)))
+            rows = {int(ids[row]): int(row) for row in present}
+            missing = [article_id for article_id in documents if article_id not in rows]
+            free = np.flatnonzero(ids == 0).tolist()
+            grown = len(missing) > len(free)
+            if grown:
+                # Sem linhas livres suficientes: nova versão com capacidade dobrada até caber
+                capacity = len(ids)
+                target = capacity * 2
+                while target - capacity + len(free) < len(missing):
+                    target *= 2
+                vectors = np.concatenate([vectors, np.zeros((target - capacity, self.dimensions), dtype=vectors.dtype)])
+                ids = np.concatenate([ids, np.zeros(target - capacity, dtype=ids.dtype)])
+                free += range(capacity, target)
+            rows.update(zip(missing, free))
+            for article_id, fields in documents.items():
+                row = rows[article_id]
+                vectors[row] = self._embed(fields, idf)
+                ids[row] = article_id
+            if grown:
+                self._publish(vectors, ids, idf, changed)
+                return
+            vectors.flush()
+            ids.flush()
+            self._write_meta(changed)
+
+    def remove(self, article_id: int) -> None:
+        with self._lock():
+            state = self._refresh()
+            if state is None:
+                return
+            meta = state[0]
+            vectors, ids = self._writable(meta)
+            rows = np.flatnonzero(ids == article_id)
+            if rows.size == 0:
+                return
+            ids[rows] = 0
+            vectors[rows] = 0
+            ids.flush()
+            vectors.flush()
+            self._write_meta({**meta, "changes": meta["changes"] + 1})
+
+    def query(self, text: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Artigos mais parecidos com `text`: lista de `(article_id, cosseno)`."""
+        state = self._refresh()
+        if state is None:
+            return []
+        _, vectors, ids, idf = state
+        query_vector = self._embed([(text, 1.0)], idf)
+        if not query_vector.any():
+            return []
+        scores = vectors @ query_vector
+        scores[ids == 0] = -1.0
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(ids[row]), float(scores[row]))
+            for row in top
+            if scores[row] > min_score
+        ]
+
+
+suggestion_index = SuggestionIndex(
+    settings.SUGGEST_INDEX_DIR,
+    settings.SUGGEST_DIMENSIONS,
+    settings.SUGGEST_REBUILD_RATIO,
+)
+
+
+async def rebuild_suggestion_index() -> int:
+    """Reconstrói o índice com todos os artigos publicados."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                KnowledgeArticle.id,
+                KnowledgeArticle.title,
+                KnowledgeArticle.tags,
+                KnowledgeArticle.content,
+            ).where(KnowledgeArticle.is_published == True)
+        )
+        documents = [
+            (article_id, article_fields(title, tags, content))
+            for article_id, title, tags, content in result.all()
+        ]
+    count = await asyncio.to_thread(suggestion_index.rebuild, documents)
+    logger.info("Índice de sugestões reconstruído com %d artigos", count)
+    return count
+
+
+async def ensure_suggestion_index() -> None:
+    """Reconstrói o índice se ele não existe ou acumulou alterações demais."""
+    if await asyncio.to_thread(suggestion_index.needs_rebuild):
+        await rebuild_suggestion_index()
+
+
+async def index_article(article: KnowledgeArticle) -> None:
+    """Atualiza a linha do artigo após criar/editar: indexa se publicado, senão remove."""
+    if article.is_published:
+        fields = article_fields(article.title, article.tags, article.content)
+        await asyncio.to_thread(suggestion_index.upsert, article.id, fields)
+    else:
+        await asyncio.to_thread(suggestion_index.remove, article.id)
+    await ensure_suggestion_index()
+
+
+async def unindex_article(article_id: int) -> None:
+    await asyncio.to_thread(suggestion_index.remove, article_id)
+
+
+async def suggest_articles(
+    db: AsyncSession, text: str, limit: int = 5
+) -> List[Tuple[KnowledgeArticle, float]]:
+    """Artigos publicados mais parecidos com `text`, do mais para o menos relevante."""
+    matches = await asyncio.to_thread(
+        suggestion_index.query, text, limit, settings.SUGGEST_MIN_SCORE
+    )
+    if not matches:
+        return []
+    result = await db.execute(
+        select(KnowledgeArticle)
+        .where(KnowledgeArticle.id.in_([article_id for article_id, _ in matches]))
+        .where(KnowledgeArticle.is_published == True)
+    )
+    articles = {article.id: article for article in result.scalars()}
+    return [
+        (articles[article_id], score)
+        for article_id, score in matches
+        if article_id in articles
+    ]
@@ -0,0 +1,115 @@
+"""Índice normalizado de tags dos artigos da base de conhecimento.
+
+`KnowledgeArticle.tags` continua sendo a string exibida pela API; a cada
+gravação ela é normalizada para a tabela `tags` e a associação
+`knowledge_article_tags`, que é o que os filtros e a nuvem de tags consultam.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Select, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import KnowledgeArticle, Tag, knowledge_article_tags
+
+
+def normalize_tag(name: str) -> str:
+    """Minúsculas e espaços internos colapsados: `" Senha  Nova"` -> `"senha nova"`."""
+    return " ".join(name.lower().split())
+
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """Tags normalizadas de uma string separada por vírgulas, sem repetição."""
+    if not value:
+        return []
+    names = (normalize_tag(part) for part in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _get_or_create_tags(session: Session, names: List[str]) -> List[int]:
+    existing = dict(session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+    for name in names:
+        if name in existing:
+            continue
+        # Outra transação pode criar a mesma tag ao mesmo tempo: o índice único decide
+        try:
+            with session.begin_nested():
+                existing[name] = session.execute(
+                    insert(Tag).values(name=name).returning(Tag.id)
+                ).scalar_one()
+        except IntegrityError:
+            existing[name] = session.execute(select(Tag.id).where(Tag.name == name)).scalar_one()
+    return [existing[name] for name in names]
+
+
+def set_article_tags(session: Session, article_id: int, tags: Optional[str]) -> List[str]:
+    """Substitui as tags normalizadas do artigo pelas da string `tags`.
+
+    Síncrona para servir também a scripts; nas rotas use `db.run_sync(...)`.
+    """
+    names = parse_tags(tags)
+    session.execute(
+        delete(knowledge_article_tags).where(knowledge_article_tags.c.article_id == article_id)
+    )
+    if names:
+        tag_ids = _get_or_create_tags(session, names)
+        session.execute(
+            insert(knowledge_article_tags),
+            [{"article_id": article_id, "tag_id": tag_id} for tag_id in tag_ids],
+        )
+    return names
+
+
+def add_articles_tags(session: Session, tags_by_article: Dict[int, Optional[str]]) -> None:
+    """Associa as tags de vários artigos novos (ainda sem tags) com uma consulta por etapa.
+
+    Usada na importação em lote: as tags de todo o lote são resolvidas juntas e
+    as associações gravadas num único `executemany`.
+    """
+    names_by_article = {article_id: parse_tags(tags) for article_id, tags in tags_by_article.items()}
+    names = list(dict.fromkeys(name for names in names_by_article.values() for name in names))
+    if not names:
+        return
+    tag_ids = dict(zip(names, _get_or_create_tags(session, names)))
+    session.execute(
+        insert(knowledge_article_tags),
+        [
+            {"article_id": article_id, "tag_id": tag_ids[name]}
+            for article_id, article_names in names_by_article.items()
+            for name in article_names
+        ],
+    )
+
+
+def filter_by_tags(query: Select, names: Iterable[str], match_all: bool = True) -> Select:
+    """Restringe `query` aos artigos com todas (`match_all`) ou alguma das tags (já normalizadas)."""
+    names = list(names)
+    if not names:
+        return query
+    tagged = (
+        select(knowledge_article_tags.c.article_id)
+        .join(Tag, Tag.id == knowledge_article_tags.c.tag_id)
+        .where(Tag.name.in_(names))
+    )
+    if match_all:
+        tagged = tagged.group_by(knowledge_article_tags.c.article_id).having(
+            func.count(knowledge_article_tags.c.tag_id) == len(names)
+        )
+    return query.where(KnowledgeArticle.id.in_(tagged))
+
+
+def tag_cloud_query(published_only: bool = True, limit: Optional[int] = None) -> Select:
+    """Tags com o número de artigos de cada uma, das mais usadas para as menos."""
+    article_count = func.count(knowledge_article_tags.c.article_id).label("count")
+    query = (
+        select(Tag.name, article_count)
+        .join(knowledge_article_tags, knowledge_article_tags.c.tag_id == Tag.id)
+        .group_by(Tag.id, Tag.name)
+        .order_by(article_count.desc(), Tag.name)
+        .limit(limit)
+    )
+    if published_only:
+        query = query.join(
+            KnowledgeArticle, KnowledgeArticle.id == knowledge_article_tags.c.article_id
+        ).where(KnowledgeArticle.is_published == True)
+    return query
@@ -0,0 +1,51 @@
+"""Extração de atributos de texto com hashing, compartilhada pelos modelos locais.
+
+Palavras, pares de palavras e trigramas de caracteres, em minúsculas e sem
+acentos, mapeados para `dimensions` posições por CRC32 (sem vocabulário para
+guardar ou sincronizar entre workers).
+"""
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, Tuple
+
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela "
+    "para pra com sem e ou que se nao não mas como ao aos ja já meu minha eu "
+    "ele ela isso esta está este essa esse foi ser ter tem the and to of".split()
+)
+
+
+def fold(text: str) -> str:
+    """Minúsculas e sem acentos."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def features(text: str) -> Iterable[str]:
+    words = [word for word in _WORD.findall(fold(text)) if word not in _STOPWORDS]
+    yield from words
+    for first, second in zip(words, words[1:]):
+        yield f"{first} {second}"
+    for word in words:
+        padded = f"<{word}>"
+        for start in range(len(padded) - 2):
+            yield "#" + padded[start:start + 3]
+
+
+@lru_cache(maxsize=1 << 18)
+def feature_hash(feature: str) -> int:
+    # Os mesmos termos se repetem muito entre documentos: o cache evita refazer o CRC
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def hashed_counts(fields: Iterable[Tuple[str, float]], dimensions: int) -> Dict[int, float]:
+    """Contagens ponderadas por posição: `{índice: soma dos pesos}`."""
+    counts: Dict[int, float] = {}
+    for text, weight in fields:
+        for feature in features(text):
+            index = feature_hash(feature) % dimensions
+            counts[index] = counts.get(index, 0.0) + weight
+    return counts
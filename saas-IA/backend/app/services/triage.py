@@ -0,0 +1,388 @@
+"""Triagem automática de tickets: prioridade e categoria previstas a partir do texto.
+
+Dois classificadores lineares (regressão logística multinomial) sobre atributos
+de texto com hashing em matriz esparsa (SciPy), treinados com os tickets já
+tratados por agentes. Treino e reavaliação do backlog rodam em lote, fora da
+API (`scripts/triage.py`); a API só carrega o modelo salvo em
+`TRIAGE_MODEL_PATH` e pontua um ticket por vez em `create_ticket`, em menos de
+um milissegundo. O modelo é recarregado quando o arquivo muda.
+
+O SciPy é importado só quando usado (atributos e treino): a importação custa
+centenas de milissegundos e ficaria na inicialização de todo worker, mesmo sem
+modelo treinado.
+"""
+import logging
+import os
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import Ticket, TicketPriority, TicketStatus
+from app.services.dashboard import TICKET_CATEGORY, TICKET_PRIORITY, apply_deltas, counter_deltas
+from app.services.etag import TICKETS, bump_versions
+from app.services.sla import reprioritize_slas
+from app.services.text_features import hashed_counts
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+class TriagePrediction(NamedTuple):
+    priority: Optional[str]
+    priority_confidence: float
+    category: Optional[str]
+    category_confidence: float
+
+
+def normalize_category(category: Optional[str]) -> Optional[str]:
+    """Chave de comparação da categoria: `" Técnico "` e `"técnico"` são a mesma."""
+    if not category:
+        return None
+    return " ".join(category.lower().split()) or None
+
+
+def featurize(tickets: Sequence[Tuple[str, str]], dimensions: int) -> "sparse.csr_matrix":
+    """Matriz esparsa (tickets x dimensions) de `(título, descrição)`, linhas com norma 1."""
+    from scipy import sparse
+
+    indptr = [0]
+    indices: List[int] = []
+    values: List[float] = []
+    for title, description in tickets:
+        counts = hashed_counts(
+            [(title or "", TITLE_WEIGHT), (description or "", DESCRIPTION_WEIGHT)], dimensions
+        )
+        indices.extend(counts.keys())
+        values.extend(counts.values())
+        indptr.append(len(indices))
+
+    data = np.log1p(np.asarray(values, dtype=np.float32))
+    matrix = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(tickets), dimensions),
+    )
+    row_lengths = np.diff(matrix.indptr)
+    norms = np.sqrt(np.add.reduceat(matrix.data ** 2, matrix.indptr[:-1][row_lengths > 0]))
+    matrix.data /= np.repeat(norms, row_lengths[row_lengths > 0])
+    return matrix
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+class LinearClassifier:
+    """Regressão logística multinomial com regularização L2, treinada por L-BFGS."""
+
+    def __init__(self, labels: List[str], weights: np.ndarray, bias: np.ndarray):
+        self.labels = labels
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def train(
+        cls,
+        features: "sparse.csr_matrix",
+        labels: Sequence[str],
+        l2: float = 1e-4,
+        max_iterations: int = 200,
+    ) -> "LinearClassifier":
+        from scipy import optimize
+
+        classes = sorted(set(labels))
+        index = {label: position for position, label in enumerate(classes)}
+        targets = np.fromiter((index[label] for label in labels), dtype=np.int64, count=len(labels))
+        rows, dimensions, count = features.shape[0], features.shape[1], len(classes)
+
+        # Classes raras (ex.: "urgent") pesam o mesmo que as comuns no total
+        class_counts = np.bincount(targets, minlength=count)
+        sample_weights = (rows / (count * class_counts))[targets] / rows
+        transposed = features.T.tocsr()
+
+        def loss_and_gradient(parameters: np.ndarray) -> Tuple[float, np.ndarray]:
+            weights = parameters[:-count].reshape(dimensions, count)
+            bias = parameters[-count:]
+            probabilities = _softmax(features @ weights + bias)
+            loss = -np.dot(sample_weights, np.log(probabilities[np.arange(rows), targets] + 1e-12))
+            loss += 0.5 * l2 * np.dot(parameters[:-count], parameters[:-count])
+
+            probabilities[np.arange(rows), targets] -= 1.0
+            probabilities *= sample_weights[:, None]
+            gradient = np.empty_like(parameters)
+            gradient[:-count] = (transposed @ probabilities + l2 * weights).ravel()
+            gradient[-count:] = probabilities.sum(axis=0)
+            return loss, gradient
+
+        result = optimize.minimize(
+            loss_and_gradient,
+            np.zeros(dimensions * count + count),
+            jac=True,
+            method="L-BFGS-B",
+            options={"maxiter": max_iterations},
+        )
+        weights = result.x[:-count].reshape(dimensions, count).astype(np.float32)
+        return cls(classes, weights, result.x[-count:].astype(np.float32))
+
+    def predict_proba(self, features: "sparse.csr_matrix") -> np.ndarray:
+        return _softmax(np.asarray(features @ self.weights) + self.bias)
+
+    def predict(self, features: "sparse.csr_matrix") -> Tuple[List[str], np.ndarray]:
+        """Classe mais provável de cada linha e sua probabilidade."""
+        probabilities = self.predict_proba(features)
+        best = probabilities.argmax(axis=1)
+        return [self.labels[position] for position in best], probabilities[np.arange(len(best)), best]
+
+
+class TriageModel:
+    """Par de classificadores (prioridade e categoria) com o mesmo espaço de atributos."""
+
+    def __init__(
+        self,
+        dimensions: int,
+        priority: Optional[LinearClassifier] = None,
+        category: Optional[LinearClassifier] = None,
+    ):
+        self.dimensions = dimensions
+        self.priority = priority
+        self.category = category
+
+    def predict(self, tickets: Sequence[Tuple[str, str]]) -> List[TriagePrediction]:
+        """Previsões vetorizadas para um lote de `(título, descrição)`."""
+        if not tickets:
+            return []
+        features = featurize(tickets, self.dimensions)
+        empty = ([None] * len(tickets), np.zeros(len(tickets)))
+        priorities, priority_confidence = self.priority.predict(features) if self.priority else empty
+        categories, category_confidence = self.category.predict(features) if self.category else empty
+        return [
+            TriagePrediction(*values)
+            for values in zip(
+                priorities,
+                priority_confidence.tolist(),
+                categories,
+                category_confidence.tolist(),
+            )
+        ]
+
+    def save(self, path: str) -> None:
+        """Grava o modelo em `.npz`; a troca do arquivo é atômica para os workers."""
+        arrays = {"dimensions": np.array(self.dimensions)}
+        for name in ("priority", "category"):
+            classifier = getattr(self, name)
+            if classifier is not None:
+                arrays[f"{name}_labels"] = np.array(classifier.labels)
+                arrays[f"{name}_weights"] = classifier.weights
+                arrays[f"{name}_bias"] = classifier.bias
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as handle:
+            np.savez(handle, **arrays)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TriageModel":
+        with np.load(path) as arrays:
+            classifiers = {}
+            for name in ("priority", "category"):
+                if f"{name}_labels" in arrays:
+                    classifiers[name] = LinearClassifier(
+                        arrays[f"{name}_labels"].tolist(),
+                        arrays[f"{name}_weights"],
+                        arrays[f"{name}_bias"],
+                    )
+            return cls(int(arrays["dimensions"]), **classifiers)
+
+
+class TriageModelLoader:
+    """Modelo em uso pela API: carregado sob demanda e recarregado quando o arquivo muda."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._model: Optional[TriageModel] = None
+        self._mtime: Optional[int] = None
+
+    def current(self) -> Optional[TriageModel]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._model = self._mtime = None
+            return None
+        if mtime != self._mtime:
+            try:
+                self._model = TriageModel.load(self.path)
+            except (OSError, ValueError, KeyError):
+                logger.exception("Modelo de triagem inválido em %s", self.path)
+                self._model = None
+            self._mtime = mtime
+        return self._model
+
+    def predict(self, title: str, description: str) -> Optional[TriagePrediction]:
+        """Previsão de um único ticket, ou `None` se ainda não há modelo treinado."""
+        model = self.current()
+        if model is None:
+            return None
+        return model.predict([(title, description)])[0]
+
+
+ticket_triage = TriageModelLoader(settings.TRIAGE_MODEL_PATH)
+
+
+def apply_triage(
+    ticket: Ticket,
+    prediction: Optional[TriagePrediction],
+    set_priority: bool = True,
+    set_category: bool = True,
+    min_confidence: Optional[float] = None,
+) -> bool:
+    """Preenche prioridade/categoria do ticket com a previsão, se confiante o bastante."""
+    if prediction is None:
+        return False
+    threshold = settings.TRIAGE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    changed = False
+    if set_priority and prediction.priority and prediction.priority_confidence >= threshold:
+        priority = TicketPriority(prediction.priority)
+        changed = changed or priority != ticket.priority
+        ticket.priority = priority
+    if set_category and prediction.category and prediction.category_confidence >= threshold:
+        changed = changed or prediction.category != ticket.category
+        ticket.category = prediction.category
+    return changed
+
+
+# ----- treino e reavaliação em lote (scripts) -----
+
+def training_tickets(session: Session, batch_size: int = 5000) -> Iterable[Ticket]:
+    """Tickets já tratados por agentes (atribuídos, resolvidos ou fechados)."""
+    handled = or_(
+        Ticket.assigned_to.isnot(None),
+        Ticket.status.in_([TicketStatus.RESOLVED, TicketStatus.CLOSED]),
+    )
+    query = select(Ticket.id, Ticket.title, Ticket.description, Ticket.priority, Ticket.category)
+    last_id = 0
+    while True:
+        rows = session.execute(
+            query.where(handled, Ticket.id > last_id).order_by(Ticket.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1].id
+
+
+def train_model(
+    rows: Sequence,
+    dimensions: Optional[int] = None,
+    min_category_count: Optional[int] = None,
+    **training_options,
+) -> TriageModel:
+    """Treina os dois classificadores a partir de linhas com title/description/priority/category."""
+    dimensions = dimensions or settings.TRIAGE_DIMENSIONS
+    min_category_count = min_category_count or settings.TRIAGE_MIN_CATEGORY_COUNT
+    features = featurize([(row.title, row.description) for row in rows], dimensions)
+
+    priorities = [TicketPriority(row.priority).value for row in rows]
+    priority = None
+    if len(set(priorities)) > 1:
+        priority = LinearClassifier.train(features, priorities, **training_options)
+
+    # Categoria é texto livre: agrupa grafias equivalentes e usa a mais comum como rótulo
+    spellings: Dict[str, Counter] = defaultdict(Counter)
+    for row in rows:
+        key = normalize_category(row.category)
+        if key:
+            spellings[key][row.category.strip()] += 1
+    labels = {
+        key: counts.most_common(1)[0][0]
+        for key, counts in spellings.items()
+        if sum(counts.values()) >= min_category_count
+    }
+    positions = [
+        position for position, row in enumerate(rows) if normalize_category(row.category) in labels
+    ]
+    category = None
+    if len(labels) > 1:
+        category = LinearClassifier.train(
+            features[positions],
+            [labels[normalize_category(rows[position].category)] for position in positions],
+            **training_options,
+        )
+
+    return TriageModel(dimensions, priority, category)
+
+
+def rescore_backlog(
+    session: Session,
+    model: TriageModel,
+    batch_size: int = 1000,
+    apply: bool = False,
+    min_confidence: Optional[float] = None,
+    on_rescheduled: Optional[Callable[[List[Tuple[int, Optional[datetime]]]], None]] = None,
+) -> Dict[str, int]:
+    """Reavalia os tickets abertos ainda não atribuídos, em lotes vetorizados.
+
+    Só altera o que o cliente deixou no padrão: prioridade `medium` e categoria vazia.
+    Com `apply=False` apenas conta o que mudaria. Nova prioridade refaz os prazos
+    de SLA; após cada commit, `on_rescheduled` recebe `[(ticket_id, próximo prazo)]`
+    para anunciar aos agendadores (`announce_deadlines`).
+    """
+    stats = {"scored": 0, "priority": 0, "category": 0}
+    query = (
+        select(Ticket.id, Ticket.title, Ticket.description, Ticket.priority, Ticket.category)
+        .where(Ticket.status == TicketStatus.OPEN, Ticket.assigned_to.is_(None))
+        .order_by(Ticket.id)
+        .limit(batch_size)
+    )
+    last_id = 0
+    while True:
+        rows = session.execute(query.where(Ticket.id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        predictions = model.predict([(row.title, row.description) for row in rows])
+
+        changes = []
+        reprioritized = []
+        deltas = Counter()
+        for row, prediction in zip(rows, predictions):
+            draft = Ticket(priority=row.priority, category=row.category)
+            priority_changed = apply_triage(
+                draft, prediction, set_category=False, min_confidence=min_confidence
+            ) if row.priority == TicketPriority.MEDIUM else False
+            category_changed = apply_triage(
+                draft, prediction, set_priority=False, min_confidence=min_confidence
+            ) if not row.category else False
+            stats["priority"] += priority_changed
+            stats["category"] += category_changed
+            if priority_changed:
+                reprioritized.append(row.id)
+            if priority_changed or category_changed:
+                changes.append({"id": row.id, "priority": draft.priority, "category": draft.category})
+                deltas.update(counter_deltas(
+                    {TICKET_PRIORITY: row.priority.value, TICKET_CATEGORY: row.category or ""},
+                    {TICKET_PRIORITY: draft.priority.value, TICKET_CATEGORY: draft.category or ""},
+                ))
+
+        stats["scored"] += len(rows)
+        if apply and changes:
+            session.execute(update(Ticket), changes)
+            rescheduled = reprioritize_slas(session, reprioritized) if reprioritized else []
+            apply_deltas(session, {counter: delta for counter, delta in deltas.items() if delta})
+            bump_versions(session, [TICKETS])
+            session.commit()
+            if rescheduled and on_rescheduled is not None:
+                on_rescheduled(rescheduled)
+    return stats
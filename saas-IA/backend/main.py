@@ -1,12 +1,41 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, metrics_response, runtime_monitor
+from app.core.security import PasswordHasherBusy
 from app.api.v1.router import api_router
-from app.db.session import engine
-from app.models.models import Base
+from app.db.instrumentation import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, QueryStatsMiddleware
+from app.db.pagination import NEXT_CURSOR_HEADER
+from app.db.init_db import init_db
+from app.db.session import async_engine, engine
+from app.services.broker import broker
+from app.services.counters import article_counters
+from app.services.principal_cache import principal_cache
+from app.services.sla import sla_scheduler
+from app.services.suggestions import ensure_suggestion_index
 
-# Criar tabelas do banco
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida da aplicação."""
+    # Banco preparado aqui, não na importação: importar `main` não abre conexão
+    await init_db()
+    article_counters.start()
+    runtime_monitor.add_engine("async", async_engine)
+    runtime_monitor.add_engine("sync", engine)
+    runtime_monitor.start()
+    # Índice de sugestões compartilhado em disco: só reconstrói se faltar ou estiver defasado
+    await ensure_suggestion_index()
+    # Prazos de SLA pendentes recarregados do banco para o heap do agendador
+    await sla_scheduler.start()
+    yield
+    await sla_scheduler.stop()
+    # Gravar contadores pendentes e encerrar conexões do broker de tempo real
+    await article_counters.stop()
+    await broker.close()
+    await runtime_monitor.stop()
 
 # Criar aplicação FastAPI
 app = FastAPI(
@@ -21,7 +50,8 @@ app = FastAPI(
     """,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
+    openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -31,12 +61,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, QUERY_COUNT_HEADER, QUERY_TIME_HEADER, "Retry-After", "ETag"],
 )
 
+# Contagem, tempo e detecção de N+1 das consultas SQL de cada requisição
+app.add_middleware(QueryStatsMiddleware)
+
+# Métricas Prometheus (latência por rota, requisições em andamento)
+app.add_middleware(MetricsMiddleware)
+
 # Incluir routers
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    """Fila de hashing cheia: pedir ao cliente que tente novamente."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Serviço de autenticação sobrecarregado, tente novamente"},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/")
 async def root():
     """Endpoint raiz."""
@@ -53,10 +100,17 @@ async def health_check():
     return {
         "status": "healthy",
         "service": settings.APP_NAME,
-        "version": settings.APP_VERSION
+        "version": settings.APP_VERSION,
+        "principal_cache": principal_cache.stats(),
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato de exposição do Prometheus."""
+    return metrics_response()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
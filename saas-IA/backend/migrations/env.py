@@ -6,6 +6,7 @@ from alembic import context
 # Import Base and settings
 from app.models.models import Base
 from app.core.config import settings
+from app.services.search import FTS_TABLE, SEARCH_INDEX, SEARCH_VECTOR_COLUMN
 
 # this is the Alembic Config object
 config = context.config
@@ -21,6 +22,18 @@ config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Ignore full-text search structures created outside the models (app.services.search)."""
+    if reflected and compare_to is None:
+        if type_ == "table" and name.startswith(FTS_TABLE):
+            return False
+        if type_ == "column" and name == SEARCH_VECTOR_COLUMN:
+            return False
+        if type_ == "index" and name == SEARCH_INDEX:
+            return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
@@ -29,6 +42,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -46,7 +60,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
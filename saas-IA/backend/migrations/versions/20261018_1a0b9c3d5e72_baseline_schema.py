@@ -0,0 +1,202 @@
+"""Esquema inicial
+
+Todas as tabelas dos modelos, com os índices de coluna única que existiam antes
+dos índices compostos (revisão seguinte). Num banco vazio, `alembic upgrade
+head` cria o esquema completo; bancos já criados pelo `create_all` da aplicação
+mantêm suas tabelas (cada uma só é criada se faltar) e seguem para as próximas
+revisões.
+
+As estruturas de busca textual (`knowledge_articles_fts` no SQLite, coluna
+`search_vector` no PostgreSQL) continuam a cargo de `ensure_search_index`, na
+inicialização da aplicação.
+
+Revision ID: 1a0b9c3d5e72
+Revises:
+Create Date: 2026-10-18 08:00:00
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "1a0b9c3d5e72"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ENUMS = ["userrole", "chatstatus", "ticketstatus", "ticketpriority"]
+
+
+def _create_table(name, *elements) -> None:
+    """Cria a tabela (com os `sa.Index` de `elements`), a menos que ela já exista."""
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *elements)
+
+
+def _tables():
+    """Tabelas na ordem das chaves estrangeiras."""
+    return [
+        ("collection_versions", [
+            sa.Column("name", sa.String(length=32), nullable=False),
+            sa.Column("shard", sa.SmallInteger(), nullable=False),
+            sa.Column("version", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+            sa.PrimaryKeyConstraint("name", "shard"),
+        ]),
+        ("dashboard_counters", [
+            sa.Column("dimension", sa.String(length=32), nullable=False),
+            sa.Column("key", sa.String(), nullable=False),
+            sa.Column("shard", sa.SmallInteger(), nullable=False),
+            sa.Column("count", sa.Integer(), server_default=sa.text("0"), nullable=False),
+            sa.PrimaryKeyConstraint("dimension", "key", "shard"),
+        ]),
+        ("tags", [
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+            sa.Index("ix_tags_id", "id"),
+        ]),
+        ("users", [
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("full_name", sa.String(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+            sa.Column("role", sa.Enum("ADMIN", "AGENT", "CUSTOMER", name="userrole"), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.Column("is_online", sa.Boolean(), nullable=True),
+            sa.Column("avatar_url", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.Index("ix_users_email", "email", unique=True),
+            sa.Index("ix_users_id", "id"),
+        ]),
+        ("chat_sessions", [
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("status", sa.Enum("ACTIVE", "WAITING", "ENDED", name="chatstatus"), nullable=False),
+            sa.Column("customer_id", sa.Integer(), nullable=False),
+            sa.Column("agent_id", sa.Integer(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("ended_at", sa.DateTime(), nullable=True),
+            sa.Column("rating", sa.Integer(), nullable=True),
+            sa.Column("feedback", sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(["agent_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["customer_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.Index("ix_chat_sessions_id", "id"),
+            sa.Index("ix_chat_sessions_status", "status"),
+        ]),
+        ("knowledge_articles", [
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("category", sa.String(), nullable=True),
+            sa.Column("tags", sa.String(), nullable=True),
+            sa.Column("author_id", sa.Integer(), nullable=False),
+            sa.Column("is_published", sa.Boolean(), nullable=True),
+            sa.Column("view_count", sa.Integer(), nullable=True),
+            sa.Column("helpful_count", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("published_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["author_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.Index("ix_knowledge_articles_category", "category"),
+            sa.Index("ix_knowledge_articles_id", "id"),
+            sa.Index("ix_knowledge_articles_title", "title"),
+        ]),
+        ("tickets", [
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(), nullable=False),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("OPEN", "IN_PROGRESS", "WAITING", "RESOLVED", "CLOSED", name="ticketstatus"),
+                nullable=False,
+            ),
+            sa.Column("priority", sa.Enum("LOW", "MEDIUM", "HIGH", "URGENT", name="ticketpriority"), nullable=False),
+            sa.Column("category", sa.String(), nullable=True),
+            sa.Column("customer_id", sa.Integer(), nullable=False),
+            sa.Column("assigned_to", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.Column("resolved_at", sa.DateTime(), nullable=True),
+            sa.Column("closed_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["assigned_to"], ["users.id"]),
+            sa.ForeignKeyConstraint(["customer_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.Index("ix_tickets_category", "category"),
+            sa.Index("ix_tickets_created_at", "created_at"),
+            sa.Index("ix_tickets_id", "id"),
+            sa.Index("ix_tickets_status", "status"),
+            sa.Index("ix_tickets_title", "title"),
+        ]),
+        ("knowledge_article_tags", [
+            sa.Column("article_id", sa.Integer(), nullable=False),
+            sa.Column("tag_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["article_id"], ["knowledge_articles.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["tag_id"], ["tags.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("article_id", "tag_id"),
+            sa.Index("ix_knowledge_article_tags_tag_id_article_id", "tag_id", "article_id"),
+        ]),
+        ("messages", [
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("is_internal", sa.Boolean(), nullable=True),
+            sa.Column("ticket_id", sa.Integer(), nullable=True),
+            sa.Column("chat_session_id", sa.Integer(), nullable=True),
+            sa.Column("sender_id", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("read_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["chat_session_id"], ["chat_sessions.id"]),
+            sa.ForeignKeyConstraint(["sender_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.Index("ix_messages_created_at", "created_at"),
+            sa.Index("ix_messages_id", "id"),
+        ]),
+        ("ticket_lsh_buckets", [
+            sa.Column("band", sa.SmallInteger(), nullable=False),
+            sa.Column("bucket", sa.BigInteger(), nullable=False),
+            sa.Column("ticket_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("band", "bucket", "ticket_id"),
+            sa.Index("ix_ticket_lsh_buckets_ticket_id", "ticket_id"),
+        ]),
+        ("ticket_signatures", [
+            sa.Column("ticket_id", sa.Integer(), nullable=False),
+            sa.Column("signature", sa.LargeBinary(), nullable=False),
+            sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("ticket_id"),
+        ]),
+        ("ticket_slas", [
+            sa.Column("ticket_id", sa.Integer(), nullable=False),
+            sa.Column("first_response_due_at", sa.DateTime(), nullable=True),
+            sa.Column("first_response_at", sa.DateTime(), nullable=True),
+            sa.Column("first_response_breached_at", sa.DateTime(), nullable=True),
+            sa.Column("resolution_due_at", sa.DateTime(), nullable=True),
+            sa.Column("resolution_breached_at", sa.DateTime(), nullable=True),
+            sa.Column("due_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("ticket_id"),
+            sa.Index("ix_ticket_slas_due_at", "due_at"),
+        ]),
+    ]
+
+
+def upgrade() -> None:
+    for name, elements in _tables():
+        _create_table(name, *elements)
+
+
+def downgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == "sqlite":
+        # Índice FTS5 criado por ensure_search_index (seus gatilhos caem com a tabela)
+        op.execute("DROP TABLE IF EXISTS knowledge_articles_fts")
+    for name, _ in reversed(_tables()):
+        op.drop_table(name)
+    if dialect == "postgresql":
+        for name in ENUMS:
+            op.execute(f"DROP TYPE IF EXISTS {name}")
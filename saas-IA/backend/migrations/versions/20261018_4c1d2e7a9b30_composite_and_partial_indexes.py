@@ -0,0 +1,80 @@
+"""Índices compostos e parciais das listagens
+
+O esquema inicial (e bancos criados pelo `create_all` antes destes índices)
+só tem os índices de coluna única: o `create_all` cria tabelas novas, mas não
+índices novos em tabelas existentes. Esta revisão cria os índices compostos da
+paginação keyset (tickets, mensagens, chats), os novos índices por status e os
+parciais dos artigos publicados, e remove os índices de coluna única que
+viraram prefixo de um composto. Tudo é idempotente, então também roda sobre
+bancos que o `create_all` atual já criou com os índices novos.
+
+No PostgreSQL os índices são criados com CONCURRENTLY (sem bloquear escritas),
+fora da transação da migration.
+
+Revision ID: 4c1d2e7a9b30
+Revises: 1a0b9c3d5e72
+Create Date: 2026-10-18 09:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4c1d2e7a9b30"
+down_revision = "1a0b9c3d5e72"
+branch_labels = None
+depends_on = None
+
+
+def _published():
+    return sa.column("is_published", sa.Boolean()) == sa.true()
+
+
+# (nome, tabela, colunas, predicado do índice parcial)
+INDEXES = [
+    ("ix_tickets_created_at_id", "tickets", ["created_at", "id"], None),
+    ("ix_tickets_customer_id_created_at_id", "tickets", ["customer_id", "created_at", "id"], None),
+    ("ix_tickets_status_created_at_id", "tickets", ["status", "created_at", "id"], None),
+    ("ix_messages_ticket_id_created_at_id", "messages", ["ticket_id", "created_at", "id"], None),
+    ("ix_messages_chat_session_id_created_at_id", "messages", ["chat_session_id", "created_at", "id"], None),
+    ("ix_chat_sessions_started_at_id", "chat_sessions", ["started_at", "id"], None),
+    ("ix_chat_sessions_customer_id_started_at_id", "chat_sessions", ["customer_id", "started_at", "id"], None),
+    ("ix_chat_sessions_status_started_at_id", "chat_sessions", ["status", "started_at", "id"], None),
+    ("ix_chat_sessions_waiting_queue", "chat_sessions", ["started_at", "id"], lambda: sa.text("status = 'WAITING'")),
+    ("ix_knowledge_articles_published_view_count", "knowledge_articles", ["view_count", "id"], _published),
+    ("ix_knowledge_articles_published_category_view_count", "knowledge_articles", ["category", "view_count"], _published),
+]
+
+# Índices de coluna única cobertos pelo prefixo de um composto acima
+REDUNDANT = [
+    ("ix_tickets_status", "tickets", ["status"]),
+    ("ix_tickets_created_at", "tickets", ["created_at"]),
+    ("ix_chat_sessions_status", "chat_sessions", ["status"]),
+]
+
+
+def _create(name, table, columns, where=None) -> None:
+    kwargs = {}
+    if where is not None:
+        kwargs = {"postgresql_where": where(), "sqlite_where": where()}
+    op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True, **kwargs)
+
+
+def _drop(name, table) -> None:
+    op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            _create(name, table, columns, where)
+        for name, table, _ in REDUNDANT:
+            _drop(name, table)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in REDUNDANT:
+            _create(name, table, columns)
+        for name, table, _, _ in reversed(INDEXES):
+            _drop(name, table)
@@ -0,0 +1,76 @@
+"""Preenche o índice normalizado de tags dos artigos
+
+Migração de dados: normaliza `knowledge_articles.tags` de cada artigo para
+`tags` e `knowledge_article_tags` (tabelas do esquema inicial), em lotes. As
+associações de cada artigo são substituídas, então repetir não duplica nada.
+Artigos gravados depois disso já são indexados pela aplicação
+(`app.services.tags.set_article_tags`).
+
+Só roda online: com `--sql` não há dados para ler e nada é gerado.
+
+Revision ID: 7e2f4a1c9d58
+Revises: 4c1d2e7a9b30
+Create Date: 2026-10-18 10:00:00
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7e2f4a1c9d58"
+down_revision = "4c1d2e7a9b30"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+articles = sa.table("knowledge_articles", sa.column("id", sa.Integer), sa.column("tags", sa.String))
+tags = sa.table("tags", sa.column("id", sa.Integer), sa.column("name", sa.String))
+article_tags = sa.table("knowledge_article_tags", sa.column("article_id", sa.Integer), sa.column("tag_id", sa.Integer))
+
+
+def parse_tags(value):
+    """Mesma normalização de `app.services.tags.parse_tags`, fixada nesta revisão."""
+    if not value:
+        return []
+    names = (" ".join(part.lower().split()) for part in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        return
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(articles.c.id, articles.c.tags)
+            .where(articles.c.id > last_id)
+            .order_by(articles.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        names_by_article = {row.id: parse_tags(row.tags) for row in rows}
+        names = list(dict.fromkeys(name for names in names_by_article.values() for name in names))
+        tag_ids = dict(bind.execute(sa.select(tags.c.name, tags.c.id).where(tags.c.name.in_(names))).all())
+        missing = [name for name in names if name not in tag_ids]
+        if missing:
+            bind.execute(tags.insert(), [{"name": name} for name in missing])
+            tag_ids.update(bind.execute(sa.select(tags.c.name, tags.c.id).where(tags.c.name.in_(missing))).all())
+
+        bind.execute(article_tags.delete().where(article_tags.c.article_id.in_(list(names_by_article))))
+        associations = [
+            {"article_id": article_id, "tag_id": tag_ids[name]}
+            for article_id, article_names in names_by_article.items()
+            for name in article_names
+        ]
+        if associations:
+            bind.execute(article_tags.insert(), associations)
+
+
+def downgrade() -> None:
+    # As associações são derivadas de `knowledge_articles.tags`; as tabelas são do esquema inicial
+    pass
@@ -0,0 +1,155 @@
+"""Benchmark de throughput concorrente nas rotas de tickets e chats.
+
+Dispara requisições concorrentes contra a aplicação em processo (ASGI) e mede
+requisições por segundo, latências e a latência de `/health` durante a carga,
+que revela quanto o event loop fica bloqueado por consultas ao banco.
+
+Usa apenas a API HTTP, então o mesmo script roda em versões anteriores do
+backend para comparar o caminho síncrono com o assíncrono:
+
+    cd saas-IA/backend
+    DATABASE_URL=sqlite:///./bench.db python scripts/bench_concurrency.py --db-latency-ms 5
+
+`--db-latency-ms` simula a latência de ida e volta do banco (somente SQLite):
+cada comando SQL dorme na thread que o executa, como faria um servidor remoto.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Mede a aplicação, não o limite de taxa (todas as requisições vêm do mesmo IP)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+
+
+def install_db_latency(latency_ms: float) -> None:
+    """Adiciona latência artificial a cada comando SQL nas engines SQLite."""
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+
+    from app.db import session
+
+    delay = latency_ms / 1000
+
+    def sleep(_statement):
+        time.sleep(delay)
+
+    @event.listens_for(session.engine, "connect")
+    def sync_connect(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(sleep)
+
+    session.engine.dispose()
+
+    async_engine = getattr(session, "async_engine", None)
+    if async_engine is not None:
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def async_connect(dbapi_connection, connection_record):
+            await_only(dbapi_connection.driver_connection.set_trace_callback(sleep))
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def seed(client, tickets: int):
+    """Cria cliente, agente, tickets e uma sessão de chat com mensagens."""
+    suffix = uuid.uuid4().hex[:8]
+    headers = {}
+    for role in ("customer", "agent"):
+        email = f"bench-{role}-{suffix}@example.com"
+        await client.post("/api/v1/auth/register", json={
+            "email": email, "full_name": f"Bench {role}", "password": "benchmark123", "role": role,
+        })
+        response = await client.post("/api/v1/auth/login", data={"username": email, "password": "benchmark123"})
+        headers[role] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(tickets):
+        await client.post("/api/v1/tickets/", headers=headers["customer"], json={
+            "title": f"Ticket de benchmark {i}", "description": "Descrição gerada pelo benchmark",
+        })
+
+    chat = (await client.post("/api/v1/chats/", headers=headers["customer"])).json()
+    await client.post(f"/api/v1/chats/{chat['id']}/accept", headers=headers["agent"])
+    for i in range(20):
+        await client.post(f"/api/v1/chats/{chat['id']}/messages", headers=headers["agent"], json={
+            "content": f"Mensagem {i}",
+        })
+    return headers, chat["id"]
+
+
+async def run_load(client, paths, headers, total: int, concurrency: int):
+    """Executa `total` requisições com no máximo `concurrency` simultâneas."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    health_latencies = []
+    done = asyncio.Event()
+
+    async def request(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(paths[i % len(paths)], headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    async def probe_health():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/health")
+            health_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    probe = asyncio.create_task(probe_health())
+    start = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe
+    return elapsed, latencies, health_latencies
+
+
+async def main(args) -> None:
+    import httpx
+
+    if args.db_latency_ms:
+        install_db_latency(args.db_latency_ms)
+
+    from app.db.init_db import init_db
+    from main import app
+
+    # Importar `main` não toca no banco: cria as tabelas como a inicialização faria
+    await init_db()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers, chat_id = await seed(client, args.tickets)
+        routes = {
+            "tickets": ["/api/v1/tickets/?limit=20", "/api/v1/tickets/?limit=20&skip=20"],
+            "chats": ["/api/v1/chats/", f"/api/v1/chats/{chat_id}/messages"],
+        }
+        print(f"requisições={args.requests} concorrência={args.concurrency} latência_db={args.db_latency_ms}ms")
+        for name, paths in routes.items():
+            elapsed, latencies, health = await run_load(
+                client, paths, headers["agent"], args.requests, args.concurrency
+            )
+            print(
+                f"{name:8s} {args.requests / elapsed:8.1f} req/s  "
+                f"p50={percentile(latencies, 50) * 1000:7.1f}ms  "
+                f"p95={percentile(latencies, 95) * 1000:7.1f}ms  "
+                f"/health p95={percentile(health, 95) * 1000 if health else 0:7.1f}ms "
+                f"(média {statistics.mean(health) * 1000 if health else 0:.1f}ms)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--tickets", type=int, default=100)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
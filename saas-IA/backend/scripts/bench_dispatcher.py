@@ -0,0 +1,114 @@
+"""Benchmark de contenção na fila de atendimento de chats.
+
+Cria uma fila de sessões aguardando e coloca vários agentes simulados para
+esvaziá-la ao mesmo tempo, em dois modos:
+
+- `next`: cada agente chama `POST /chats/next` até a fila acabar;
+- `accept`: o fluxo antigo, que lista `GET /chats/waiting` e tenta
+  `POST /chats/{id}/accept` no primeiro da lista.
+
+Ao final confere se algum chat foi entregue a mais de um agente e mostra
+vazão, conflitos (HTTP 400) e latências:
+
+    cd saas-IA/backend
+    DATABASE_URL=sqlite:///./bench.db python scripts/bench_dispatcher.py --agents 32 --chats 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Mede a aplicação, não o limite de taxa (todas as requisições vêm do mesmo IP)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+
+from bench_concurrency import install_db_latency, percentile  # noqa: E402
+
+
+async def login(client, role: str, suffix: str) -> dict:
+    email = f"dispatch-{role}-{suffix}@example.com"
+    await client.post("/api/v1/auth/register", json={
+        "email": email, "full_name": f"Dispatch {role}", "password": "benchmark123", "role": role,
+    })
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": "benchmark123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_agents(client, mode: str, agents):
+    """Agentes concorrentes esvaziam a fila; devolve reservas por chat e latências."""
+    claims = Counter()
+    conflicts = 0
+    latencies = []
+
+    async def agent(headers):
+        nonlocal conflicts
+        while True:
+            start = time.perf_counter()
+            if mode == "next":
+                response = await client.post("/api/v1/chats/next", headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code == 204:
+                    return
+                response.raise_for_status()
+                claims[response.json()["id"]] += 1
+            else:
+                waiting = (await client.get("/api/v1/chats/waiting", headers=headers)).json()
+                if not waiting:
+                    return
+                response = await client.post(f"/api/v1/chats/{waiting[0]['id']}/accept", headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code == 400:
+                    conflicts += 1
+                    continue
+                response.raise_for_status()
+                claims[response.json()["id"]] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(agent(headers) for headers in agents))
+    return time.perf_counter() - start, claims, conflicts, latencies
+
+
+async def main(args) -> None:
+    import httpx
+
+    if args.db_latency_ms:
+        install_db_latency(args.db_latency_ms)
+
+    from app.db.init_db import init_db
+    from main import app
+
+    # Importar `main` não toca no banco: cria as tabelas como a inicialização faria
+    await init_db()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        suffix = uuid.uuid4().hex[:8]
+        agents = [await login(client, "agent", f"{suffix}-{i}") for i in range(args.agents)]
+
+        print(f"agentes={args.agents} chats={args.chats} latência_db={args.db_latency_ms}ms")
+        for mode in args.modes:
+            # Cliente novo por modo: chats já atendidos fariam POST /chats/ reutilizar a sessão ativa
+            customer = await login(client, "customer", f"{suffix}-{mode}")
+            for _ in range(args.chats):
+                await client.post("/api/v1/chats/", headers=customer)
+
+            elapsed, claims, conflicts, latencies = await run_agents(client, mode, agents)
+            duplicated = sum(1 for count in claims.values() if count > 1)
+            print(
+                f"{mode:7s} {sum(claims.values()) / elapsed:8.1f} reservas/s  "
+                f"chats={len(claims)} duplicados={duplicated} conflitos={conflicts}  "
+                f"p50={percentile(latencies, 50) * 1000:7.1f}ms  "
+                f"p95={percentile(latencies, 95) * 1000:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=32)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--modes", nargs="+", choices=["next", "accept"], default=["next", "accept"])
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""Benchmark de login sob carga concorrente.
+
+Dispara logins simultâneos (bcrypt) e, em paralelo, mede a latência de
+`/health`, que mostra se o event loop continua atendendo outras requisições
+enquanto as senhas são verificadas. Reporta percentis de ambos.
+
+    cd saas-IA/backend
+    DATABASE_URL=sqlite:///./bench.db python scripts/bench_login.py --logins 64 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Mede a aplicação, não o limite de taxa (todas as requisições vêm do mesmo IP)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+
+from bench_concurrency import percentile  # noqa: E402
+
+
+def summary(name: str, values) -> str:
+    return (
+        f"{name:8s} n={len(values):4d}  "
+        f"p50={percentile(values, 50) * 1000:8.1f}ms  "
+        f"p95={percentile(values, 95) * 1000:8.1f}ms  "
+        f"p99={percentile(values, 99) * 1000:8.1f}ms"
+    )
+
+
+async def main(args) -> None:
+    import httpx
+
+    from app.db.init_db import init_db
+    from main import app
+
+    # Importar `main` não toca no banco: cria as tabelas como a inicialização faria
+    await init_db()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        email = f"bench-login-{uuid.uuid4().hex[:8]}@example.com"
+        await client.post("/api/v1/auth/register", json={
+            "email": email, "full_name": "Bench login", "password": "benchmark123",
+        })
+        credentials = {"username": email, "password": "benchmark123"}
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        login_latencies = []
+        health_latencies = []
+        statuses = {}
+        done = asyncio.Event()
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/auth/login", data=credentials)
+                    outcome = response.status_code
+                except Exception as exc:
+                    outcome = type(exc).__name__
+                login_latencies.append(time.perf_counter() - start)
+                statuses[outcome] = statuses.get(outcome, 0) + 1
+
+        async def probe_health():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe = asyncio.create_task(probe_health())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe
+
+    print(f"logins={args.logins} concorrência={args.concurrency} tempo={elapsed:.2f}s status={statuses}")
+    print(summary("login", login_latencies))
+    print(summary("/health", health_latencies))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
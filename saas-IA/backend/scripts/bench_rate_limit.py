@@ -0,0 +1,76 @@
+"""Micro-benchmark do limite de taxa.
+
+Mede o custo de `acquire` no backend (muitas chaves, como IPs distintos) e o
+custo por requisição da dependência `rate_limit`, comparando uma rota vazia com
+e sem o limite, chamada em processo (ASGI). Com `--backend redis` usa o Redis
+de `REDIS_URL` (inclui a ida e volta de rede).
+
+    cd saas-IA/backend
+    python scripts/bench_rate_limit.py --requests 20000 --keys 1000
+    REDIS_URL=redis://localhost:6379/0 python scripts/bench_rate_limit.py --backend redis
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def bench_backend(backend, requests: int, keys: int) -> float:
+    from app.services.rate_limit import RateLimit
+
+    # Limite alto: mede o caminho comum, em que a requisição é aceita
+    limit = RateLimit(1000000, 60.0)
+    start = time.perf_counter()
+    for i in range(requests):
+        await backend.acquire(f"bench:ip:{i % keys}", limit)
+    return (time.perf_counter() - start) / requests
+
+
+async def bench_route(limited: bool, requests: int) -> float:
+    import httpx
+    from fastapi import Depends, FastAPI
+
+    from app.api.deps import rate_limit
+
+    app = FastAPI()
+    dependencies = [Depends(rate_limit("auth.login"))] if limited else []
+
+    @app.post("/ping", dependencies=dependencies)
+    async def ping():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/ping")
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.post("/ping")
+        return (time.perf_counter() - start) / requests
+
+
+async def main(args) -> None:
+    # Antes de importar a aplicação; limite folgado: todas as requisições vêm do mesmo IP
+    os.environ["RATE_LIMITS"] = '{"auth.login": "1000000000/second"}'
+    os.environ["RATE_LIMIT_BACKEND"] = args.backend
+    from app.services.rate_limit import rate_limiter
+
+    per_acquire = await bench_backend(rate_limiter.backend, args.requests, args.keys)
+    print(f"backend={args.backend} acquire: {per_acquire * 1e6:.2f}µs por chamada ({args.keys} chaves)")
+
+    route_requests = max(args.requests // 10, 100)
+    plain = await bench_route(False, route_requests)
+    limited = await bench_route(True, route_requests)
+    print(f"rota sem limite: {plain * 1e6:8.1f}µs por requisição")
+    print(f"rota com limite: {limited * 1e6:8.1f}µs por requisição")
+    print(f"custo do limite: {(limited - plain) * 1e6:+8.1f}µs ({(limited - plain) / plain:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--keys", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
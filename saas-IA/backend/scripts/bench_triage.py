@@ -0,0 +1,101 @@
+"""Benchmark do classificador de triagem de tickets (sem banco de dados).
+
+Gera tickets sintéticos com vocabulário por categoria e prioridade, e mede:
+extração de atributos, treino, pontuação em lote (caminho do `rescore`) e
+latência de um único ticket (caminho do `create_ticket`).
+
+    cd saas-IA/backend
+    python scripts/bench_triage.py --tickets 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_concurrency import percentile  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.models.models import TicketPriority  # noqa: E402
+from app.services.triage import featurize, train_model  # noqa: E402
+
+CATEGORIES = {
+    "Conta": "senha login acesso conta email bloqueada redefinir cadastro usuário",
+    "Pagamento": "cobrança cartão fatura boleto reembolso pagamento valor duplicada plano",
+    "Técnico": "erro página carregando lento aplicativo travando integração api falha",
+    "Relatórios": "relatório exportar pdf planilha gráfico dados painel filtro período",
+}
+PRIORITY_WORDS = {
+    TicketPriority.LOW: "dúvida sugestão quando possível curiosidade",
+    TicketPriority.MEDIUM: "problema preciso ajuda verificar",
+    TicketPriority.HIGH: "não funciona clientes afetados importante hoje",
+    TicketPriority.URGENT: "urgente parado produção fora do ar todos imediatamente",
+}
+FILLER = "olá bom dia equipe obrigado por favor sistema vocês conseguem ver isso aqui".split()
+
+
+def synthetic_tickets(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    priorities = list(PRIORITY_WORDS)
+    rows = []
+    for _ in range(count):
+        category = rng.choice(list(CATEGORIES))
+        priority = rng.choices(priorities, weights=[2, 6, 3, 1])[0]
+        topic = CATEGORIES[category].split()
+        urgency = PRIORITY_WORDS[priority].split()
+        words = rng.choices(topic, k=6) + rng.choices(urgency, k=2) + rng.choices(FILLER, k=12)
+        rng.shuffle(words)
+        rows.append(SimpleNamespace(
+            title=" ".join(rng.choices(topic, k=3)),
+            description=" ".join(words),
+            priority=priority,
+            category=category,
+        ))
+    return rows
+
+
+def main(tickets: int, iterations: int, single: int) -> None:
+    rows = synthetic_tickets(tickets)
+    validation = synthetic_tickets(max(tickets // 10, 100), seed=1)
+    pairs = [(row.title, row.description) for row in rows]
+
+    start = time.perf_counter()
+    featurize(pairs, settings.TRIAGE_DIMENSIONS)
+    elapsed = time.perf_counter() - start
+    print(f"atributos:  {tickets / elapsed:9.0f} tickets/s")
+
+    start = time.perf_counter()
+    model = train_model(rows, max_iterations=iterations)
+    elapsed = time.perf_counter() - start
+    print(f"treino:     {tickets / elapsed:9.0f} tickets/s ({elapsed:.1f}s, até {iterations} iterações)")
+
+    start = time.perf_counter()
+    predictions = model.predict([(row.title, row.description) for row in validation])
+    elapsed = time.perf_counter() - start
+    print(f"lote:       {len(validation) / elapsed:9.0f} tickets/s")
+
+    priority_hits = sum(p.priority == row.priority.value for p, row in zip(predictions, validation))
+    category_hits = sum(p.category == row.category for p, row in zip(predictions, validation))
+    print(f"acurácia:   prioridade {priority_hits / len(validation):.1%}, categoria {category_hits / len(validation):.1%}")
+
+    latencies = []
+    for row in validation[:single]:
+        start = time.perf_counter()
+        model.predict([(row.title, row.description)])
+        latencies.append(time.perf_counter() - start)
+    print(
+        f"um ticket:  p50 {percentile(latencies, 50) * 1000:.2f} ms, "
+        f"p95 {percentile(latencies, 95) * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--single", type=int, default=1000, help="tickets pontuados um a um")
+    arguments = parser.parse_args()
+    main(arguments.tickets, arguments.iterations, arguments.single)
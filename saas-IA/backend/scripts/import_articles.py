@@ -0,0 +1,76 @@
+"""Importa artigos da base de conhecimento em lote (CSV, JSONL ou Markdown).
+
+Mesmo processamento de `POST /knowledge/import`, sem limite de tamanho de
+upload: o arquivo é lido em streaming e gravado em lotes de `--batch-size`
+linhas, cada lote confirmado separadamente. Erros por linha vão para a saída;
+use `--skip-existing` para retomar uma importação interrompida.
+
+    cd saas-IA/backend
+    python scripts/import_articles.py faq.csv --author admin@empresa.com --publish
+    python scripts/import_articles.py artigos.zip --author admin@empresa.com --skip-existing
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.models import User  # noqa: E402
+from app.services.article_import import IMPORT_FORMATS, detect_format, import_file  # noqa: E402
+from app.services.response_cache import response_cache  # noqa: E402
+from app.services.suggestions import ensure_suggestion_index  # noqa: E402
+
+
+def main(arguments: argparse.Namespace) -> int:
+    import_format = arguments.format or detect_format(arguments.path)
+    if import_format is None:
+        print("formato não reconhecido: use --format", file=sys.stderr)
+        return 2
+
+    with SessionLocal() as session:
+        author_id = session.execute(select(User.id).where(User.email == arguments.author)).scalar_one_or_none()
+    if author_id is None:
+        print(f"usuário não encontrado: {arguments.author}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    with open(arguments.path, "rb") as stream:
+        report = import_file(
+            stream,
+            import_format,
+            author_id,
+            filename=os.path.basename(arguments.path),
+            publish=arguments.publish,
+            skip_existing=arguments.skip_existing,
+            batch_size=arguments.batch_size,
+        )
+    elapsed = time.perf_counter() - start
+    asyncio.run(ensure_suggestion_index())
+    # Com RESPONSE_CACHE_BACKEND=redis, as listagens da API veem os artigos novos
+    asyncio.run(response_cache.invalidate("knowledge"))
+
+    for error in report.errors:
+        print(json.dumps(error, ensure_ascii=False))
+    rate = report.total / elapsed if elapsed else 0
+    print(
+        f"concluído: {report.imported} importados, {report.skipped} ignorados, "
+        f"{report.failed} com erro de {report.total} linhas em {elapsed:.1f}s ({rate:.0f} linhas/s)"
+    )
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--author", required=True, help="email do agente/admin registrado como autor")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="padrão: pela extensão do arquivo")
+    parser.add_argument("--publish", action="store_true", help="publicar as linhas sem is_published")
+    parser.add_argument("--skip-existing", action="store_true", help="ignorar títulos já existentes")
+    parser.add_argument("--batch-size", type=int, default=None, help="padrão: IMPORT_BATCH_SIZE")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,39 @@
+"""Reconstrói o índice MinHash/LSH de tickets duplicados a partir da tabela `tickets`.
+
+Percorre os tickets em lotes por id (a memória não depende do tamanho da
+tabela), recalcula assinatura e buckets de cada um e confirma lote a lote; no
+fim remove entradas de tickets apagados. Use após mudar `DUPLICATE_*` nas
+configurações ou para preencher o índice de tickets antigos. Pode ser
+executado com a API no ar.
+
+    cd saas-IA/backend
+    python scripts/rebuild_duplicate_index.py --batch-size 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.models import TicketSignature, ticket_lsh_buckets  # noqa: E402
+from app.services.duplicates import rebuild_index  # noqa: E402
+
+
+def rebuild(batch_size: int) -> None:
+    TicketSignature.__table__.create(bind=engine, checkfirst=True)
+    ticket_lsh_buckets.create(bind=engine, checkfirst=True)
+
+    start = time.perf_counter()
+    with SessionLocal() as session:
+        processed = rebuild_index(session, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed else 0
+    print(f"concluído: {processed} tickets em {elapsed:.1f}s ({rate:.0f} tickets/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    rebuild(parser.parse_args().batch_size)
@@ -0,0 +1,45 @@
+"""Reconcilia os contadores do painel (`/stats`) com as tabelas de tickets e chats.
+
+Recalcula as contagens com `COUNT(*) GROUP BY`, mostra cada contador que
+divergia (valor gravado x valor real) e regrava a tabela `dashboard_counters`.
+Com `--check` só compara, sem gravar. Termina com código 1 se houver
+divergência, para uso em cron/monitoramento. Pode ser executado com a API no ar.
+
+    cd saas-IA/backend
+    python scripts/reconcile_dashboard.py
+    python scripts/reconcile_dashboard.py --check
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.models import dashboard_counters  # noqa: E402
+from app.services.dashboard import reconcile  # noqa: E402
+
+
+def main(check: bool) -> int:
+    dashboard_counters.create(bind=engine, checkfirst=True)
+
+    start = time.perf_counter()
+    with SessionLocal() as session:
+        drift = reconcile(session, apply=not check)
+    elapsed = time.perf_counter() - start
+
+    for item in drift:
+        print(
+            f"{item.dimension:16} {item.key or '(vazio)':24} "
+            f"gravado {item.stored:8}  real {item.actual:8}  diferença {item.stored - item.actual:+d}"
+        )
+    action = "verificados" if check else "reconstruídos"
+    print(f"contadores {action} em {elapsed:.2f}s: {len(drift)} divergentes")
+    return 1 if drift else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="apenas comparar, sem regravar")
+    sys.exit(main(parser.parse_args().check))
@@ -0,0 +1,126 @@
+"""Treino do modelo de triagem de tickets e reavaliação do backlog.
+
+`train` usa os tickets já tratados por agentes (atribuídos, resolvidos ou
+fechados), separa uma amostra para validação, mostra a acurácia e grava o
+modelo em `TRIAGE_MODEL_PATH` (os workers da API o recarregam sozinhos).
+`rescore` pontua em lote os tickets abertos e não atribuídos; sem `--apply`
+só mostra quantos mudariam. Os prazos de SLA refeitos pelas novas prioridades
+são anunciados aos workers da API pelo broker (com `CHAT_BROKER=redis`).
+
+    cd saas-IA/backend
+    python scripts/triage.py train --holdout 0.1
+    python scripts/triage.py rescore --apply
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.services.broker import broker  # noqa: E402
+from app.services.sla import announce_deadlines  # noqa: E402
+from app.services.triage import (  # noqa: E402
+    TriageModel,
+    normalize_category,
+    rescore_backlog,
+    train_model,
+    training_tickets,
+)
+
+
+def accuracy(model: TriageModel, rows) -> None:
+    predictions = model.predict([(row.title, row.description) for row in rows])
+    if model.priority is not None:
+        hits = [prediction.priority == row.priority.value for row, prediction in zip(rows, predictions)]
+        print(f"  prioridade: {np.mean(hits):.1%} de {len(hits)}")
+    if model.category is not None:
+        known = {normalize_category(label) for label in model.category.labels}
+        hits = [
+            normalize_category(prediction.category) == normalize_category(row.category)
+            for row, prediction in zip(rows, predictions)
+            if normalize_category(row.category) in known
+        ]
+        if hits:
+            print(f"  categoria: {np.mean(hits):.1%} de {len(hits)}")
+
+
+def train(args) -> None:
+    with SessionLocal() as session:
+        rows = list(training_tickets(session))
+    if not rows:
+        print("nenhum ticket tratado para treinar")
+        return
+
+    order = np.random.default_rng(0).permutation(len(rows))
+    holdout = int(len(rows) * args.holdout)
+    validation = [rows[position] for position in order[:holdout]]
+    training = [rows[position] for position in order[holdout:]]
+
+    start = time.perf_counter()
+    model = train_model(training, max_iterations=args.iterations)
+    elapsed = time.perf_counter() - start
+    print(f"treinado com {len(training)} tickets em {elapsed:.1f}s ({len(training) / elapsed:.0f} tickets/s)")
+    if validation:
+        print("validação:")
+        accuracy(model, validation)
+
+    if args.holdout:
+        # O modelo gravado aproveita também a amostra de validação
+        model = train_model(rows, max_iterations=args.iterations)
+    model.save(args.output)
+    print(f"modelo gravado em {args.output}")
+
+
+async def announce(rescheduled) -> None:
+    try:
+        await announce_deadlines(rescheduled)
+    finally:
+        await broker.close()
+
+
+def rescore(args) -> None:
+    model = TriageModel.load(args.model)
+    start = time.perf_counter()
+    rescheduled = []
+    with SessionLocal() as session:
+        stats = rescore_backlog(
+            session, model, batch_size=args.batch_size, apply=args.apply, min_confidence=args.min_confidence,
+            on_rescheduled=rescheduled.extend,
+        )
+    elapsed = time.perf_counter() - start
+    verb = "alterados" if args.apply else "seriam alterados"
+    print(
+        f"{stats['scored']} tickets pontuados em {elapsed:.1f}s; {verb}: "
+        f"{stats['priority']} prioridades, {stats['category']} categorias"
+    )
+    if rescheduled:
+        asyncio.run(announce(rescheduled))
+        if settings.CHAT_BROKER != "redis":
+            print(f"{len(rescheduled)} prazos de SLA refeitos; reinicie a API para que o agendador os carregue")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="treinar e gravar o modelo")
+    train_parser.add_argument("--holdout", type=float, default=0.1, help="fração usada na validação")
+    train_parser.add_argument("--iterations", type=int, default=200, help="iterações do L-BFGS")
+    train_parser.add_argument("--output", default=settings.TRIAGE_MODEL_PATH)
+    train_parser.set_defaults(handler=train)
+
+    rescore_parser = commands.add_parser("rescore", help="reavaliar tickets abertos")
+    rescore_parser.add_argument("--model", default=settings.TRIAGE_MODEL_PATH)
+    rescore_parser.add_argument("--batch-size", type=int, default=1000)
+    rescore_parser.add_argument("--min-confidence", type=float, default=None)
+    rescore_parser.add_argument("--apply", action="store_true", help="gravar as alterações")
+    rescore_parser.set_defaults(handler=rescore)
+
+    arguments = parser.parse_args()
+    arguments.handler(arguments)
@@ -0,0 +1,107 @@
+"""Configuração comum dos testes do backend.
+
+O ambiente é definido antes de importar a aplicação: banco SQLite e índices
+em um diretório temporário, limite de taxa desligado (os testes do limitador
+criam os seus) e orçamentos de consultas exigidos, então uma rota que
+ultrapassa o seu `query_budget` faz o teste falhar.
+
+A aplicação sobe uma vez por sessão (`client`); os testes criam os próprios
+usuários e dados com nomes únicos em vez de depender de um banco vazio. Código
+assíncrono que usa o banco roda no event loop da aplicação, via
+`client.portal.call(...)`.
+"""
+import os
+import tempfile
+import uuid
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="saas-ia-testes-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_DATA_DIR}/app.db",
+    "DEBUG": "False",
+    "CHAT_BROKER": "memory",
+    "RATE_LIMIT_ENABLED": "False",
+    "SQL_ENFORCE_QUERY_BUDGETS": "True",
+    "SQL_STATS_HEADERS": "True",
+    "SUGGEST_INDEX_DIR": os.path.join(_DATA_DIR, "suggest_index"),
+    "TRIAGE_MODEL_PATH": os.path.join(_DATA_DIR, "triage_model.npz"),
+})
+
+PASSWORD = "senha-dos-testes"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def make_user(client):
+    """Registra um usuário novo e retorna os cabeçalhos de autenticação."""
+
+    def make(role: str = "customer") -> dict:
+        email = f"{role}-{uuid.uuid4().hex[:12]}@example.com"
+        response = client.post("/api/v1/auth/register", json={
+            "email": email, "full_name": f"Teste {role}", "password": PASSWORD, "role": role,
+        })
+        assert response.status_code == 201, response.text
+        response = client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def agent(make_user):
+    return make_user("agent")
+
+
+@pytest.fixture(scope="session")
+def customer(make_user):
+    return make_user("customer")
+
+
+@pytest.fixture(scope="session")
+def make_article(client, agent):
+    """Cria (e publica) um artigo como agente; retorna o JSON da resposta."""
+
+    def make(category: str, title: str = "Como redefinir a senha da conta", published: bool = True, **fields) -> dict:
+        response = client.post("/api/v1/knowledge/", headers=agent, json={
+            "title": title,
+            "content": "Passo a passo para acessar a conta e alterar a senha cadastrada.",
+            "category": category,
+            **fields,
+        })
+        assert response.status_code == 201, response.text
+        if published:
+            response = client.patch(
+                f"/api/v1/knowledge/{response.json()['id']}", headers=agent, json={"is_published": True}
+            )
+            assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def make_ticket(client):
+    """Abre um ticket com os cabeçalhos do cliente dado; retorna o JSON da resposta."""
+
+    def make(headers: dict, title: str = "Não consigo acessar minha conta", **fields) -> dict:
+        response = client.post("/api/v1/tickets/", headers=headers, json={
+            "title": title,
+            "description": "Ao entrar com minha senha aparece uma mensagem de erro.",
+            **fields,
+        })
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make
@@ -0,0 +1,114 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import fakeredis
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.api.v1 import chats
+from app.services.broker import Broker, BrokerError, InMemoryBroker, RedisBroker, Subscription
+
+
+def test_broker_is_abstract():
+    with pytest.raises(TypeError):
+        Broker()
+
+
+async def test_in_memory_fan_out_and_unsubscribe():
+    broker = InMemoryBroker()
+    async with broker.subscribe("chat:1") as first, broker.subscribe("chat:1") as second:
+        assert broker.subscriber_count("chat:1") == 2
+        await broker.publish("chat:1", {"event": "message.created", "id": 1})
+        await broker.publish("chat:2", {"event": "message.created", "id": 2})
+        assert await anext(first) == {"event": "message.created", "id": 1}
+        assert await anext(second) == {"event": "message.created", "id": 1}
+    assert broker.subscriber_count("chat:1") == 0
+
+
+async def test_in_memory_slow_subscriber_drops_oldest():
+    broker = InMemoryBroker(max_queue_size=2)
+    async with broker.subscribe("chat:1") as subscription:
+        for number in range(3):
+            await broker.publish("chat:1", {"n": number})
+        assert [await anext(subscription), await anext(subscription)] == [{"n": 1}, {"n": 2}]
+
+
+async def test_redis_broker_delivers_between_instances():
+    server = fakeredis.FakeServer()
+    publisher = RedisBroker(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    subscriber = RedisBroker(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    async with subscriber.subscribe("chat:1") as subscription:
+        await publisher.publish("chat:1", {"event": "message.created", "id": 7})
+        assert await asyncio.wait_for(anext(subscription), 1) == {"event": "message.created", "id": 7}
+    await publisher.close()
+    await subscriber.close()
+
+
+class _BrokenPubSub:
+    """Pub/Sub cuja conexão cai logo depois de assinar."""
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        raise ConnectionError("conexão perdida")
+        yield  # pragma: no cover
+
+    async def unsubscribe(self, channel):
+        raise ConnectionError("conexão perdida")
+
+    async def aclose(self):
+        pass
+
+
+class _BrokenRedis:
+    def pubsub(self):
+        return _BrokenPubSub()
+
+
+async def test_redis_reader_failure_reaches_the_subscriber():
+    broker = RedisBroker(client=_BrokenRedis())
+    async with broker.subscribe("chat:1") as subscription:
+        with pytest.raises(BrokerError) as error:
+            await asyncio.wait_for(anext(subscription), 1)
+        assert isinstance(error.value.__cause__, ConnectionError)
+        # Continua falhando em vez de voltar a esperar
+        with pytest.raises(BrokerError):
+            await asyncio.wait_for(anext(subscription), 1)
+
+
+def _token(headers: dict) -> str:
+    return headers["Authorization"].removeprefix("Bearer ")
+
+
+def test_websocket_receives_new_messages(client, make_user):
+    customer = make_user("customer")
+    session_id = client.post("/api/v1/chats/", headers=customer).json()["id"]
+    with client.websocket_connect(f"/api/v1/chats/{session_id}/ws?token={_token(customer)}") as websocket:
+        response = client.post(
+            f"/api/v1/chats/{session_id}/messages", json={"content": "Olá"}, headers=customer
+        )
+        assert response.status_code == 201, response.text
+        event = websocket.receive_json()
+    assert event["event"] == "message.created"
+    assert event["data"]["content"] == "Olá"
+
+
+class _FailingBroker(InMemoryBroker):
+    """Broker cujas assinaturas falham logo depois de abertas."""
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        queue = asyncio.Queue()
+        queue.put_nowait(BrokerError("broker indisponível"))
+        yield Subscription(queue)
+
+
+def test_websocket_closes_when_broker_fails(client, make_user, monkeypatch):
+    customer = make_user("customer")
+    session_id = client.post("/api/v1/chats/", headers=customer).json()["id"]
+    monkeypatch.setattr(chats, "broker", _FailingBroker())
+    with client.websocket_connect(f"/api/v1/chats/{session_id}/ws?token={_token(customer)}") as websocket:
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1011
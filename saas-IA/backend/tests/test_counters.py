@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.models import KnowledgeArticle
+from app.services import etag
+from app.services.counters import article_counters
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio fixo para a janela do ETag das listagens."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(etag, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_counter_flush_keeps_list_etag_until_the_window_ends(client, agent, make_article, clock):
+    article = make_article("contadores-etag")
+    url = "/api/v1/knowledge/?category=contadores-etag"
+    first = client.get(url)
+    assert first.json()[0]["helpful_count"] == 0
+
+    assert client.post(f"/api/v1/knowledge/{article['id']}/helpful").status_code == 200
+    client.portal.call(article_counters.flush)
+    # Contadores não invalidam ETag nem cache: a defasagem fica limitada à janela
+    assert client.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    cached = client.get(url)
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.json()[0]["helpful_count"] == 0
+
+    clock.now += settings.RESPONSE_CACHE_TTL_SECONDS
+    refreshed = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert refreshed.status_code == 200
+    assert refreshed.json()[0]["helpful_count"] == 1
+
+
+def test_edit_changes_list_etag(client, agent, make_article, clock):
+    article = make_article("contadores-edicao")
+    url = "/api/v1/knowledge/?category=contadores-edicao"
+    first = client.get(url)
+
+    response = client.patch(f"/api/v1/knowledge/{article['id']}", json={"title": "Revisado"}, headers=agent)
+    assert response.status_code == 200, response.text
+    edited = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert edited.status_code == 200
+    assert edited.headers["ETag"] != first.headers["ETag"]
+    assert edited.json()[0]["title"] == "Revisado"
+
+
+def test_counter_flush_keeps_updated_at(client, make_article):
+    article = make_article("contadores-updated-at")
+    with SessionLocal() as session:
+        updated_at = session.get(KnowledgeArticle, article["id"]).updated_at
+
+    assert client.get(f"/api/v1/knowledge/{article['id']}").status_code == 200
+    assert client.post(f"/api/v1/knowledge/{article['id']}/helpful").status_code == 200
+    assert client.portal.call(article_counters.flush) >= 1
+
+    with SessionLocal() as session:
+        stored = session.get(KnowledgeArticle, article["id"])
+        assert (stored.view_count, stored.helpful_count) == (1, 1)
+        assert stored.updated_at == updated_at
+
+
+def test_counter_flush_keeps_article_etag(client, make_article):
+    article = make_article("contadores-item")
+    url = f"/api/v1/knowledge/{article['id']}"
+    first = client.get(url)
+    client.portal.call(article_counters.flush)
+
+    revalidated = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
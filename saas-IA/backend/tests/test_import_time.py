@@ -0,0 +1,66 @@
+"""Orçamento de tempo de importação de `main` (python -X importtime).
+
+Importa `main` num processo novo, como um worker do uvicorn faria, com o banco
+num diretório que não existe: se a importação abrir conexão ou criar tabelas,
+ela falha. O orçamento (`IMPORT_TIME_BUDGET_MS`, padrão 2000) vale para a mais
+rápida de três execuções; ao estourar, a falha lista os pacotes mais pesados
+para achar a dependência que voltou a ser carregada cedo demais (ex.: scipy,
+usado só no treino da triagem).
+"""
+import os
+import re
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 2000))
+RUNS = 3
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _import_main(tmp_path):
+    """Módulos importados por `import main`: `[(nome, cumulativo em µs, profundidade)]`."""
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path}/nao-existe/app.db"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, f"importar `main` falhou (abre conexão ou cria tabelas?):\n{result.stderr[-2000:]}"
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(2)), len(match.group(3)) // 2))
+    return modules
+
+
+def _heaviest_packages(modules, top: int = 15) -> str:
+    # Cada módulo importado por outro pacote conta uma vez, com seus submódulos
+    # (o -X importtime lista os filhos antes do pai)
+    packages = {}
+    parents = []
+    for name, cumulative, depth in reversed(modules):
+        del parents[depth:]
+        root = name.split(".")[0]
+        if parents and parents[-1] != root:
+            packages[root] = packages.get(root, 0) + cumulative
+        parents.append(root)
+    packages.pop("main", None)
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return "\n".join(f"{cumulative / 1000:8.1f} ms  {name}" for name, cumulative in heaviest)
+
+
+def test_import_main_is_fast_and_side_effect_free(tmp_path):
+    best = None
+    for _ in range(RUNS):
+        modules = _import_main(tmp_path)
+        total = next(cumulative for name, cumulative, depth in modules if name == "main" and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, modules)
+
+    total, modules = best
+    assert not (tmp_path / "nao-existe").exists()
+    assert total / 1000 <= BUDGET_MS, (
+        f"import main: {total / 1000:.0f} ms (orçamento {BUDGET_MS:.0f} ms)\n{_heaviest_packages(modules)}"
+    )
@@ -0,0 +1,48 @@
+"""Histórico de mensagens de tickets e chats: paginado por cursor, nunca inteiro."""
+from app.db.pagination import NEXT_CURSOR_HEADER
+from app.db.session import AsyncSessionLocal
+from app.models.models import Message
+
+
+def _add_messages(client, count, sender_id, **target):
+    async def add():
+        async with AsyncSessionLocal() as db:
+            db.add_all(Message(content=f"Mensagem {number}", sender_id=sender_id, **target) for number in range(count))
+            await db.commit()
+
+    client.portal.call(add)
+
+
+def _read_history(client, path, headers):
+    pages, cursor = [], None
+    while True:
+        response = client.get(path, headers=headers, params={"cursor": cursor} if cursor else None)
+        assert response.status_code == 200, response.text
+        pages.append([message["id"] for message in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+def test_ticket_history_is_paged_by_default(client, customer, make_ticket):
+    ticket = make_ticket(customer)
+    _add_messages(client, 60, ticket["customer_id"], ticket_id=ticket["id"])
+    pages = _read_history(client, f"/api/v1/tickets/{ticket['id']}/messages", customer)
+    assert [len(page) for page in pages] == [50, 10]
+    ids = [id for page in pages for id in page]
+    assert ids == sorted(set(ids))
+
+
+def test_chat_history_is_paged_by_default(client, customer):
+    session = client.post("/api/v1/chats/", headers=customer).json()
+    _add_messages(client, 60, session["customer_id"], chat_session_id=session["id"])
+    pages = _read_history(client, f"/api/v1/chats/{session['id']}/messages", customer)
+    assert [len(page) for page in pages] == [50, 10]
+    ids = [id for page in pages for id in page]
+    assert ids == sorted(set(ids))
+
+
+def test_history_page_size_is_bounded(client, customer, make_ticket):
+    ticket = make_ticket(customer)
+    response = client.get(f"/api/v1/tickets/{ticket['id']}/messages?limit=500", headers=customer)
+    assert response.status_code == 422
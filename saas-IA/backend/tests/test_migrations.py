@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _alembic(database: str, *args: str) -> subprocess.CompletedProcess:
+    # Processo próprio: o env.py reconfigura o logging a partir do alembic.ini
+    return subprocess.run(
+        [sys.executable, "-m", "alembic", *args],
+        cwd=BACKEND, env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+        capture_output=True, text=True,
+    )
+
+
+def test_migrations_build_the_models_schema_from_an_empty_database(tmp_path):
+    database = tmp_path / "vazio.db"
+    for args in (["upgrade", "head"], ["check"], ["downgrade", "base"], ["upgrade", "head"], ["check"]):
+        result = _alembic(database, *args)
+        assert result.returncode == 0, f"alembic {' '.join(args)}:\n{result.stdout}{result.stderr}"
+
+
+def test_tag_backfill_migration_normalizes_existing_articles(tmp_path):
+    database = tmp_path / "artigos.db"
+    assert _alembic(database, "upgrade", "4c1d2e7a9b30").returncode == 0
+    with sqlite3.connect(database) as connection:
+        connection.execute(
+            "INSERT INTO users (id, email, full_name, hashed_password, role) VALUES (1, 'a@b.c', 'A', 'x', 'AGENT')"
+        )
+        connection.executemany(
+            "INSERT INTO knowledge_articles (id, title, content, author_id, tags) VALUES (?, 't', 'c', 1, ?)",
+            [(1, " Senha,  Login Social ,senha"), (2, "login social"), (3, None)],
+        )
+
+    result = _alembic(database, "upgrade", "head")
+    assert result.returncode == 0, result.stderr
+    with sqlite3.connect(database) as connection:
+        rows = connection.execute(
+            "SELECT article_id, name FROM knowledge_article_tags JOIN tags ON tags.id = tag_id ORDER BY article_id, name"
+        ).fetchall()
+    assert rows == [(1, "login social"), (1, "senha"), (2, "login social")]
+
+
+_STARTUP = """
+from fastapi.testclient import TestClient
+from main import app
+with TestClient(app) as client:
+    assert client.get("/api/v1/knowledge/").status_code == 200
+"""
+
+
+def test_app_starts_on_migrated_database_without_create_all(tmp_path):
+    database = tmp_path / "producao.db"
+    assert _alembic(database, "upgrade", "head").returncode == 0
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{database}",
+        "DB_CREATE_TABLES": "False",
+        "SUGGEST_INDEX_DIR": str(tmp_path / "suggest_index"),
+    }
+    result = subprocess.run([sys.executable, "-c", _STARTUP], cwd=BACKEND, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
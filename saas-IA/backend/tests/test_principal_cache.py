@@ -0,0 +1,35 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.core.security import decode_access_token
+from app.db.session import AsyncSessionLocal
+from app.models.models import User
+from app.services.principal_cache import InMemoryPrincipalBackend, principal_cache
+
+
+class _SlowBackend(InMemoryPrincipalBackend):
+    """Backend cuja remoção leva uma ida e volta, como no Redis."""
+
+    async def delete(self, key):
+        await asyncio.sleep(0.05)
+        await super().delete(key)
+
+
+def test_deactivated_user_is_rejected_on_the_next_request(client, make_user, monkeypatch):
+    monkeypatch.setattr(principal_cache, "backend", _SlowBackend())
+    headers = make_user("customer")
+    email = decode_access_token(headers["Authorization"].removeprefix("Bearer "))["sub"]
+    assert client.get("/api/v1/tickets/?limit=1", headers=headers).status_code == 200
+    assert client.portal.call(principal_cache.get, email) is not None
+
+    async def deactivate():
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.email == email))).scalar_one()
+            user.is_active = False
+            await db.commit()
+
+    client.portal.call(deactivate)
+    response = client.get("/api/v1/tickets/?limit=1", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Usuário inativo"
@@ -0,0 +1,113 @@
+"""Orçamentos de consultas (`query_budget`) das rotas, com `SQL_ENFORCE_QUERY_BUDGETS` ligado.
+
+Cada rota com orçamento é chamada sobre vários registros (um N+1 estouraria o
+orçamento) e com um usuário recém-criado, para que a busca do usuário
+autenticado também conte. Estourar o orçamento levanta `QueryBudgetExceeded`
+no middleware, e o `TestClient` repassa a exceção ao teste.
+"""
+import importlib
+import pkgutil
+import uuid
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.api import v1 as api_v1
+from app.db.instrumentation import (
+    QUERY_COUNT_HEADER,
+    QueryBudgetExceeded,
+    QueryStatsMiddleware,
+    capture_queries,
+    query_budget,
+)
+from app.db.session import engine
+from main import app
+
+# (rota, papel, método, caminho, corpo); `{category}` é a categoria dos artigos criados
+BUDGETED = [
+    ("/api/v1/stats/", "agent", "GET", "/api/v1/stats/", None),
+    ("/api/v1/tickets/", "agent", "GET", "/api/v1/tickets/?limit=20", None),
+    ("/api/v1/tickets/", "customer", "GET", "/api/v1/tickets/?limit=20", None),
+    ("/api/v1/tickets/duplicates", "agent", "GET", "/api/v1/tickets/duplicates", None),
+    ("/api/v1/tickets/suggestions", "customer", "POST", "/api/v1/tickets/suggestions",
+     {"title": "Senha da conta", "description": "Não consigo alterar a senha"}),
+    ("/api/v1/chats/", "agent", "GET", "/api/v1/chats/?limit=20", None),
+    ("/api/v1/chats/", "customer", "GET", "/api/v1/chats/?limit=20", None),
+    ("/api/v1/knowledge/", "customer", "GET", "/api/v1/knowledge/?limit=20&category={category}", None),
+    ("/api/v1/knowledge/search", "customer", "GET", "/api/v1/knowledge/search?q=senha&category={category}", None),
+    ("/api/v1/knowledge/suggest", "customer", "GET", "/api/v1/knowledge/suggest?q=alterar+a+senha+{category}", None),
+]
+
+
+def _has_budget(dependant) -> bool:
+    return any(
+        getattr(dependency.call, "__qualname__", "").startswith(query_budget.__qualname__) or _has_budget(dependency)
+        for dependency in dependant.dependencies
+    )
+
+
+def _budgeted_routes():
+    """Caminhos completos das rotas com orçamento, lidos dos routers de cada módulo da API.
+
+    Não depende de como o FastAPI guarda os routers incluídos: o caminho vem de
+    `url_path_for` (nome da rota), que passa pelos prefixos de cada inclusão.
+    """
+    for module_info in pkgutil.iter_modules(api_v1.__path__):
+        router = getattr(importlib.import_module(f"{api_v1.__name__}.{module_info.name}"), "router", None)
+        for route in getattr(router, "routes", ()):
+            if isinstance(route, APIRoute) and _has_budget(route.dependant):
+                yield app.url_path_for(route.name)
+
+
+@pytest.fixture(scope="module")
+def category(client, agent, make_user, make_article, make_ticket):
+    """Artigos, tickets com mensagens e chats suficientes para expor um N+1."""
+    category = f"orcamento-{uuid.uuid4().hex[:8]}"
+    for number in range(5):
+        make_article(category, title=f"Como alterar a senha {number}", tags="senha,conta")
+    for _ in range(3):
+        customer = make_user("customer")
+        for number in range(2):
+            ticket = make_ticket(customer, title=f"Erro ao alterar a senha {number}", category=category)
+            client.post(f"/api/v1/tickets/{ticket['id']}/messages", headers=customer, json={"content": "Alguma novidade?"})
+        session = client.post("/api/v1/chats/", headers=customer).json()
+        client.post(f"/api/v1/chats/{session['id']}/messages", headers=customer, json={"content": "Olá"})
+    return category
+
+
+def test_every_budgeted_route_is_covered():
+    assert set(_budgeted_routes()) == {route for route, *_ in BUDGETED}
+
+
+@pytest.mark.parametrize("route, role, method, path, body", BUDGETED, ids=[f"{case[2]} {case[0]} ({case[1]})" for case in BUDGETED])
+def test_route_stays_within_budget(client, make_user, category, route, role, method, path, body):
+    response = client.request(method, path.format(category=category), headers=make_user(role), json=body)
+    assert response.status_code == 200, response.text
+    assert int(response.headers[QUERY_COUNT_HEADER]) > 0
+
+
+def test_exceeding_the_budget_fails_in_test_mode():
+    probe = FastAPI()
+    probe.add_middleware(QueryStatsMiddleware)
+
+    @probe.get("/duas-consultas", dependencies=[Depends(query_budget(1))])
+    async def two_queries():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {}
+
+    with pytest.raises(QueryBudgetExceeded, match="2 consultas, orçamento 1"):
+        TestClient(probe).get("/duas-consultas")
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one():
+    with capture_queries() as stats, engine.connect() as connection:
+        for article_id in range(6):
+            connection.execute(text("SELECT id FROM knowledge_articles WHERE id = :id"), {"id": article_id})
+    assert stats.count == 6
+    [(shape, count)] = stats.repeated(threshold=5)
+    assert count == 6 and shape.startswith("SELECT id FROM knowledge_articles")
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+import fakeredis
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.rate_limit import (
+    InMemoryRateLimitBackend,
+    RateLimiter,
+    RedisRateLimitBackend,
+    parse_rate,
+)
+
+
+def _redis_limiter(server: fakeredis.FakeServer) -> RateLimiter:
+    # O script Lua do balde exige o fakeredis com Lua (`fakeredis[lua]`)
+    return RateLimiter(RedisRateLimitBackend(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)))
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request) -> RateLimiter:
+    if request.param == "memory":
+        return RateLimiter(InMemoryRateLimitBackend())
+    return _redis_limiter(fakeredis.FakeServer())
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60.0)
+    with pytest.raises(ValueError):
+        parse_rate("10/day")
+
+
+async def test_burst_up_to_capacity(limiter):
+    limit = parse_rate("3/minute")
+    assert [await limiter.hit("auth.login", "10.0.0.1", limit) for _ in range(3)] == [0, 0, 0]
+    retry_after = await limiter.hit("auth.login", "10.0.0.1", limit)
+    assert 0 < retry_after <= 20
+    # Baldes independentes por identidade
+    assert await limiter.hit("auth.login", "10.0.0.2", limit) == 0
+
+
+async def test_bucket_refills_over_time(limiter):
+    limit = parse_rate("20/second")
+    for _ in range(20):
+        assert await limiter.hit("tickets.create", "7", limit) == 0
+    assert await limiter.hit("tickets.create", "7", limit) > 0
+    await asyncio.sleep(0.15)  # ~3 fichas
+    assert await limiter.hit("tickets.create", "7", limit) == 0
+
+
+async def test_redis_bucket_is_shared_between_limiters():
+    server = fakeredis.FakeServer()
+    first, second = _redis_limiter(server), _redis_limiter(server)
+    limit = parse_rate("2/minute")
+    assert await first.hit("auth.register", "10.0.0.1", limit) == 0
+    assert await second.hit("auth.register", "10.0.0.1", limit) == 0
+    assert await first.hit("auth.register", "10.0.0.1", limit) > 0
+    assert await second.hit("auth.register", "10.0.0.1", limit) > 0
+
+
+class _BrokenBackend:
+    async def acquire(self, key, limit):
+        raise ConnectionError("Redis indisponível")
+
+
+async def test_backend_failure_fails_open_with_warning_and_metric(caplog):
+    def fail_open_count():
+        return REGISTRY.get_sample_value("rate_limit_fail_open_total", {"limit": "auth.login"}) or 0
+
+    before = fail_open_count()
+    with caplog.at_level(logging.WARNING, logger="app.services.rate_limit"):
+        assert await RateLimiter(_BrokenBackend()).hit("auth.login", "10.0.0.1", parse_rate("1/minute")) == 0
+    assert fail_open_count() == before + 1
+    assert "auth.login" in caplog.text
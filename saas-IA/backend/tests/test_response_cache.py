@@ -0,0 +1,94 @@
+import asyncio
+
+from sqlalchemy import update
+from starlette.requests import Request
+
+from app.db.session import AsyncSessionLocal
+from app.models.models import KnowledgeArticle
+from app.services.response_cache import InMemoryResponseBackend, ResponseCache, response_cache
+
+
+def _request(path: str, query: str = "") -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "headers": []})
+
+
+async def test_in_memory_hit_miss_and_expiry():
+    backend = InMemoryResponseBackend()
+    assert await backend.get("chave") is None
+    await backend.set("chave", b"[]", ttl=60)
+    assert await backend.get("chave") == b"[]"
+    await backend.set("curta", b"{}", ttl=0.01)
+    await asyncio.sleep(0.02)
+    assert await backend.get("curta") is None
+    assert len(backend) == 1
+
+
+async def test_in_memory_evicts_least_recently_used():
+    backend = InMemoryResponseBackend(max_entries=2)
+    await backend.set("a", b"1", ttl=60)
+    await backend.set("b", b"2", ttl=60)
+    await backend.get("a")
+    await backend.set("c", b"3", ttl=60)
+    assert await backend.get("b") is None
+    assert [await backend.get("a"), await backend.get("c")] == [b"1", b"3"]
+
+
+async def test_invalidate_changes_the_keys_of_the_tag():
+    cache = ResponseCache(InMemoryResponseBackend())
+    key = await cache.key(_request("/api/v1/knowledge/", "b=2&a=1"), ["knowledge"])
+    # Query string em ordem canônica
+    assert key == await cache.key(_request("/api/v1/knowledge/", "a=1&b=2"), ["knowledge"])
+    await cache.set(key, b"[]")
+    assert await cache.get(key) == b"[]"
+
+    await cache.invalidate("tickets")
+    assert await cache.key(_request("/api/v1/knowledge/", "a=1&b=2"), ["knowledge"]) == key
+    await cache.invalidate("knowledge")
+    new_key = await cache.key(_request("/api/v1/knowledge/", "a=1&b=2"), ["knowledge"])
+    assert new_key != key
+    assert await cache.get(new_key) is None
+
+
+class _SlowBackend(InMemoryResponseBackend):
+    """Backend cuja invalidação leva uma ida e volta, como no Redis."""
+
+    async def bump(self, tags):
+        await asyncio.sleep(0.05)
+        await super().bump(tags)
+
+
+def test_commit_returns_with_the_cache_already_invalidated(client, make_article, monkeypatch):
+    article = make_article("cache-commit")
+    monkeypatch.setattr(response_cache, "backend", _SlowBackend())
+
+    async def versions_after_commit():
+        before = await response_cache.backend.tag_versions(["knowledge"])
+        async with AsyncSessionLocal() as db:
+            stored = await db.get(KnowledgeArticle, article["id"])
+            stored.title = "Título revisado"
+            await db.commit()
+            after_commit = await response_cache.backend.tag_versions(["knowledge"])
+            # Contadores (`ignore`) não invalidam
+            await db.execute(
+                update(KnowledgeArticle).where(KnowledgeArticle.id == article["id"]).values(view_count=10)
+            )
+            stored.helpful_count = 3
+            await db.commit()
+        return before, after_commit, await response_cache.backend.tag_versions(["knowledge"])
+
+    before, after_commit, after_counters = client.portal.call(versions_after_commit)
+    assert after_commit == [before[0] + 1]
+    assert after_counters == after_commit
+
+
+def test_cached_list_is_refreshed_after_an_edit(client, agent, make_article):
+    article = make_article("cache-lista")
+    url = "/api/v1/knowledge/?category=cache-lista"
+    assert client.get(url).headers["X-Cache"] == "MISS"
+    assert client.get(url).headers["X-Cache"] == "HIT"
+
+    response = client.patch(f"/api/v1/knowledge/{article['id']}", json={"title": "Novo título"}, headers=agent)
+    assert response.status_code == 200, response.text
+    response = client.get(url)
+    assert response.headers["X-Cache"] == "MISS"
+    assert [item["title"] for item in response.json()] == ["Novo título"]
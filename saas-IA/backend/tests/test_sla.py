@@ -0,0 +1,123 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models.models import Ticket, TicketSLA
+from app.services import sla
+from app.services.sla import SLAScheduler, announce_deadlines, sla_scheduler
+from app.services.triage import TriagePrediction, rescore_backlog
+
+
+def test_retry_keeps_the_original_deadline():
+    scheduler = SLAScheduler()
+    now = datetime.utcnow()
+    due = now - timedelta(minutes=1)
+    scheduler.schedule(1, due)
+    expired = scheduler.pop_due(now)
+    assert expired == [(1, due)]
+
+    scheduler.retry(expired, now + timedelta(seconds=5))
+    assert scheduler.next_due() == now + timedelta(seconds=5)
+    assert scheduler.pop_due(now + timedelta(seconds=4)) == []
+    # Ao acordar, entrega o prazo gravado no banco, não o instante da nova tentativa
+    assert scheduler.pop_due(now + timedelta(seconds=5)) == [(1, due)]
+
+
+def test_retry_does_not_override_a_newer_deadline():
+    scheduler = SLAScheduler()
+    now = datetime.utcnow()
+    old_due, new_due = now - timedelta(minutes=1), now + timedelta(minutes=30)
+    scheduler.schedule(1, old_due)
+    expired = scheduler.pop_due(now)
+    scheduler.schedule(1, new_due)  # prioridade alterada enquanto o registro falhava
+
+    scheduler.retry(expired, now + timedelta(seconds=5))
+    assert scheduler.pop_due(now + timedelta(minutes=1)) == []
+    assert scheduler.pop_due(new_due) == [(1, new_due)]
+
+
+def test_breach_is_recorded_after_a_failed_attempt(client, customer, make_ticket, monkeypatch):
+    ticket_id = make_ticket(customer)["id"]
+    due = datetime.utcnow() - timedelta(minutes=1)
+    attempts = []
+    recorded = []
+    record_breaches = sla.record_breaches
+
+    async def flaky_record_breaches(entries):
+        attempts.append(entries)
+        if len(attempts) == 1:
+            raise ConnectionError("banco indisponível")
+        rescheduled = await record_breaches(entries)
+        recorded.append(entries)
+        return rescheduled
+
+    monkeypatch.setattr(sla, "record_breaches", flaky_record_breaches)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(TicketSLA)
+                .where(TicketSLA.ticket_id == ticket_id)
+                .values(first_response_due_at=due, due_at=due)
+            )
+            await db.commit()
+
+        scheduler = SLAScheduler()
+        scheduler.RETRY_SECONDS = 0.05
+        await scheduler.start()
+        try:
+            for _ in range(100):
+                if recorded:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await scheduler.stop()
+
+        async with AsyncSessionLocal() as db:
+            return await db.get(TicketSLA, ticket_id)
+
+    ticket_sla = client.portal.call(scenario)
+    assert [ticket_id, due] in [list(entry) for entries in attempts for entry in entries]
+    assert ticket_sla.first_response_breached_at is not None
+
+
+class _UrgentModel:
+    """Modelo de triagem que só reclassifica o ticket indicado, como urgente."""
+
+    def __init__(self, title):
+        self.title = title
+
+    def predict(self, tickets):
+        return [
+            TriagePrediction("urgent", 1.0, None, 0.0) if title == self.title else TriagePrediction(None, 0.0, None, 0.0)
+            for title, _ in tickets
+        ]
+
+
+def test_rescore_recalculates_and_announces_sla_deadlines(client, customer, make_ticket):
+    title = f"Sistema fora do ar {uuid.uuid4().hex}"
+    ticket = make_ticket(customer, title=title, priority="medium")
+    rescheduled = []
+    with SessionLocal() as session:
+        stats = rescore_backlog(session, _UrgentModel(title), apply=True, on_rescheduled=rescheduled.extend)
+        ticket_sla = session.get(TicketSLA, ticket["id"])
+        created_at = session.get(Ticket, ticket["id"]).created_at
+
+    assert stats["priority"] == 1
+    assert ticket_sla.first_response_due_at == created_at + timedelta(minutes=settings.SLA_FIRST_RESPONSE_MINUTES["urgent"])
+    assert ticket_sla.resolution_due_at == created_at + timedelta(minutes=settings.SLA_RESOLUTION_MINUTES["urgent"])
+    assert rescheduled == [(ticket["id"], ticket_sla.first_response_due_at)]
+
+    async def announced_due_at():
+        await announce_deadlines(rescheduled)
+        for _ in range(50):
+            if sla_scheduler._due.get(ticket["id"]) == ticket_sla.first_response_due_at:
+                break
+            await asyncio.sleep(0.01)
+        return sla_scheduler._due.get(ticket["id"])
+
+    assert client.portal.call(announced_due_at) == ticket_sla.first_response_due_at